@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+"""
+Headless games played by the autopilot, as a standard gameplay workload.
+
+Plays a seeded game for a number of updates and reports update times and
+how far the autopilot got. The game is played twice to check that the same
+seeds give the same run.
+
+    $ python3 benchmarks/autopilot.py --updates 5000 --seed 3
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from masteroids import screens
+from masteroids.game import Game
+from masteroids.detail import DetailController
+from masteroids.autopilot import Autopilot
+
+
+def play(n_updates, seed, dt=0.02):
+    random.seed(seed)
+    game = Game(DetailController(adaptive=False))
+    autopilot = Autopilot(seed)
+    times = []
+    highest_level = 0
+    deaths = 0
+    alive_on = None  # Screen the player was last seen alive on
+    for i in range(n_updates):
+        autopilot.before_update(game)
+        start = time.perf_counter()
+        if game.update(dt, autopilot):
+            game = Game(game.detail)
+        times.append(time.perf_counter() - start)
+        autopilot.tick(dt)
+
+        screen = game.current_screen
+        if isinstance(screen, screens.GameplayScreen) and game.player in screen.entities:
+            alive_on = screen
+        elif alive_on is screen:
+            deaths += 1
+            alive_on = None
+        highest_level = max(highest_level, game.level_number)
+
+    times.sort()
+    return {
+        "update_ms_median": times[len(times) // 2] * 1000,
+        "update_ms_99th": times[int(len(times) * 0.99)] * 1000,
+        "update_ms_max": times[-1] * 1000,
+        "highest_level": highest_level,
+        "deaths": deaths,
+        "score": game.player.score,
+        "state": hashlib.sha1(game.snapshot().tobytes()).hexdigest()[:12],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--updates", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = play(args.updates, args.seed)
+    repeat = play(args.updates, args.seed)
+
+    if args.json:
+        print(json.dumps(results, indent=2, sort_keys=True))
+    else:
+        for name, value in results.items():
+            print("{:<18} {}".format(name, value))
+    if repeat["state"] != results["state"]:
+        print("Same seed gave a different run", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+"""
+Collision pairs tested and skipped by layer, with and without layers.
+
+Plays the same seeded autopilot game twice: once with each entity type's
+collision layers, and once with every type colliding with everything, as
+before layers. Both runs should end in the same state.
+
+    $ python3 benchmarks/collision_layers.py --updates 5000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from masteroids import screens, entities
+from masteroids.game import Game
+from masteroids.detail import DetailController
+from masteroids.autopilot import Autopilot
+
+ENTITY_TYPES = (
+    entities.PlayerEntity, entities.AsteroidEntity,
+    entities.BulletEntity, entities.ParticleEntity,
+)
+
+
+def play(n_updates, seed):
+    random.seed(seed)
+    game = Game(DetailController(adaptive=False))
+    autopilot = Autopilot(seed)
+    played_screens = []
+    start = time.perf_counter()
+    for i in range(n_updates):
+        autopilot.before_update(game)
+        if game.update(0.02, autopilot):
+            game = Game(game.detail)
+        autopilot.tick(0.02)
+        screen = game.current_screen
+        if isinstance(screen, screens.EntityScreen) and screen not in played_screens:
+            played_screens.append(screen)
+    elapsed = time.perf_counter() - start
+
+    counts = [
+        sum(s.pairs_tested for s in played_screens),
+        sum(s.pairs_masked for s in played_screens),
+        sum(s.pair_cache.skipped for s in played_screens),
+    ]
+    return elapsed / n_updates, counts, game.snapshot().tobytes()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--updates", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    layered_time, layered_counts, layered_state = play(args.updates, args.seed)
+
+    layers = [(cls, cls.layer, cls.mask) for cls in ENTITY_TYPES]
+    for cls in ENTITY_TYPES:
+        cls.layer = cls.mask = entities.LAYER_ALL
+    try:
+        flat_time, flat_counts, flat_state = play(args.updates, args.seed)
+    finally:
+        for cls, layer, mask in layers:
+            cls.layer, cls.mask = layer, mask
+
+    print("{:<14} {:>10} {:>12} {:>14} {:>12}".format(
+        "", "tested", "by layer", "by pair cache", "ms/update"
+    ))
+    for name, counts, elapsed in (
+        ("with layers", layered_counts, layered_time),
+        ("without", flat_counts, flat_time),
+    ):
+        print("{:<14} {:>10} {:>12} {:>14} {:>12.3f}".format(
+            name, *counts, elapsed*1000
+        ))
+    if layered_state != flat_state:
+        print("Runs ended in different states")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+"""
+Accuracy and speed of the bounding circle collision tests.
+
+`Shape.check_collision` rules pairs out by bounding circle first, and for
+asteroids smaller than `AsteroidEntity.CIRCLE_SIZE`, takes overlapping
+inner circles as a hit before trying the exact test. Every pair from a
+seeded, crowded set of asteroids, fragments and bullets is tested both that
+way and with the exact polygon tests, and the answers compared.
+
+Exits with status 1 if pairs with a circle in them have more false
+positives than MAX_FALSE_POSITIVES of their hits, or any false negatives,
+or if any other pair's answer changed.
+
+    $ python3 benchmarks/collision_proxies.py --asteroids 20 --bullets 100
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from itertools import combinations, product
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from masteroids import entities, shapes
+
+MAX_FALSE_POSITIVES = 0.01  # Fraction of the true hits
+
+
+def generate(n_asteroids, n_bullets, spread):
+    """Asteroids and every fragment they split into, plus bullets."""
+    polygons = []
+    asteroids = [entities.AsteroidEntity(1) for i in range(n_asteroids)]
+    while asteroids:
+        asteroid = asteroids.pop()
+        polygons.append(asteroid.shape)
+        if asteroid.size >= 0.25:
+            asteroids.extend(asteroid.split(None))
+    for polygon in polygons:
+        polygon.translate(
+            random.uniform(-spread, spread) - polygon.x,
+            random.uniform(-spread, spread) - polygon.y,
+        )
+        polygon.rotate(random.uniform(0, 360))
+    points = [
+        shapes.PointShape(random.uniform(-spread, spread), random.uniform(-spread, spread))
+        for i in range(n_bullets)
+    ]
+    return polygons, points
+
+def exact(shape1, shape2):
+    if isinstance(shape2, shapes.PointShape):
+        return shapes._collision_polygon_point(shape1, shape2)
+    return shapes._collision_polygon_polygon(shape1, shape2)
+
+def is_circle(shape):
+    return isinstance(shape, shapes.PolygonShape) and shape.circle
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--asteroids", type=int, default=10)
+    parser.add_argument("--bullets", type=int, default=200)
+    parser.add_argument("--spread", type=float, default=0.3,
+                        help="Shapes are placed within this distance of the center on each axis")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    polygons, points = generate(args.asteroids, args.bullets, args.spread)
+    pairs = list(combinations(polygons, 2)) + list(product(polygons, points))
+
+    start = time.perf_counter()
+    exact_hits = [bool(exact(a, b)) for a, b in pairs]
+    exact_time = time.perf_counter() - start
+    start = time.perf_counter()
+    fast_hits = [bool(a.check_collision(b)) for a, b in pairs]
+    fast_time = time.perf_counter() - start
+
+    # (pairs, hits, false positives, false negatives) by test used
+    counts = {"exact": [0, 0, 0, 0], "circle": [0, 0, 0, 0]}
+    for (a, b), exact_hit, fast_hit in zip(pairs, exact_hits, fast_hits):
+        row = counts["circle" if is_circle(a) or is_circle(b) else "exact"]
+        row[0] += 1
+        row[1] += exact_hit
+        row[2] += fast_hit and not exact_hit
+        row[3] += exact_hit and not fast_hit
+
+    n_circles = sum(is_circle(p) for p in polygons)
+    print("{} polygons ({} collide as circles), {} bullets, {} pairs".format(
+        len(polygons), n_circles, len(points), len(pairs)
+    ))
+    print("{:<8} {:>8} {:>8} {:>10} {:>10}".format(
+        "test", "pairs", "hits", "false +", "false -"
+    ))
+    for name, row in counts.items():
+        print("{:<8} {:>8} {:>8} {:>10} {:>10}".format(name, *row))
+    print("exact polygon tests  {:.2f} us/pair".format(exact_time / len(pairs) * 1e6))
+    print("with circles         {:.2f} us/pair ({:.1f}x)".format(
+        fast_time / len(pairs) * 1e6, exact_time / fast_time
+    ))
+    failed = False
+    if counts["exact"][2] or counts["exact"][3]:
+        print("Bounding circle rejection changed an exact answer")
+        failed = True
+    pairs, hits, false_positives, false_negatives = counts["circle"]
+    if false_positives > MAX_FALSE_POSITIVES * hits:
+        print("Circles gave {} false positives, more than {:.0%} of {} hits".format(
+            false_positives, MAX_FALSE_POSITIVES, hits
+        ))
+        failed = True
+    if false_negatives:
+        print("Circles missed {} hits".format(false_negatives))
+        failed = True
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+"""
+Collision tests scheduled by time of impact, against testing every pair.
+
+A ship in the middle of a field of asteroids turns and fires, and the field
+is updated with `EntityScreen`'s own collision tests, then again from the
+same seed with an `impacts.ImpactScheduler`. Both runs must find the same
+contacts on every update.
+
+    $ python3 benchmarks/impact_scheduler.py --asteroids 200 1000 --updates 300
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from masteroids import screens, entities
+from masteroids.detail import DetailController
+from masteroids.impacts import ImpactScheduler
+from masteroids.inputstate import AgentInputState
+
+FIRE_INTERVAL = 5  # Updates between shots
+
+
+class ContactRecorder():
+    """A collision backend passing on what `find` gives, and keeping a copy."""
+
+    def __init__(self, find):
+        self.find = find
+        self.numbers = {}  # Entity -> number, in order of first contact
+        self.contacts = []  # Each update's contacts, as pairs of numbers
+
+    def find_contacts(self, entities, time):
+        found = list(self.find(entities, time))
+        numbers = self.numbers
+        self.contacts.append([
+            (numbers.setdefault(e1, len(numbers)), numbers.setdefault(e2, len(numbers)))
+            for e1, e2, point in found
+        ])
+        return found
+
+
+def run(n_asteroids, n_updates, seed, scheduler):
+    random.seed(seed)
+    screen = screens.EntityScreen((), DetailController(adaptive=False))
+    screen.add_entities([
+        entities.AsteroidEntity(random.choice((0.125, 0.25, 0.5)))
+        for i in range(n_asteroids)
+    ])
+    if scheduler is None:
+        recorder = ContactRecorder(lambda entities, time: screen.find_contacts())
+    else:
+        recorder = ContactRecorder(scheduler.find_contacts)
+    screen.collision_backend = recorder
+    shooter = entities.PlayerEntity()
+    keyboard = AgentInputState()
+
+    start = time.perf_counter()
+    for i in range(n_updates):
+        if i % FIRE_INTERVAL == 0:
+            shooter.shape.rotate(37)
+            screen.add_entity(entities.BulletEntity(shooter))
+        screen.update(0.02, keyboard)
+        keyboard.tick(0.02)
+    elapsed = time.perf_counter() - start
+    return elapsed / n_updates, recorder.contacts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--asteroids", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--updates", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print("{:>10} {:>14} {:>14} {:>10} {:>12}".format(
+        "asteroids", "all pairs ms", "scheduled ms", "tests", "predictions"
+    ))
+    mismatched = False
+    for n_asteroids in args.asteroids:
+        pairs_time, pairs_contacts = run(n_asteroids, args.updates, args.seed, None)
+        scheduler = ImpactScheduler()
+        scheduled_time, scheduled_contacts = run(
+            n_asteroids, args.updates, args.seed, scheduler
+        )
+        print("{:>10} {:>14.3f} {:>14.3f} {:>10} {:>12}".format(
+            n_asteroids, pairs_time*1000, scheduled_time*1000,
+            scheduler.tests, scheduler.predictions
+        ))
+        if scheduled_contacts != pairs_contacts:
+            print("Different contacts with {} asteroids".format(n_asteroids))
+            mismatched = True
+    if mismatched:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/python3
+"""
+Memory use per entity, peak memory of scripted runs, and the most a steady
+gameplay frame allocates.
+
+Measured with tracemalloc. The budgets for these are checked by
+tests/test_memory.py; this only reports the numbers:
+
+    $ python3 benchmarks/memory.py
+    $ python3 benchmarks/memory.py --json
+"""
+
+import gc
+import os
+import sys
+import json
+import random
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from masteroids import screens, entities
+from masteroids.game import Game
+from masteroids.detail import DetailController
+from masteroids.inputstate import AgentInputState, ACTION_FIRE, ACTION_LEFT, ACTION_THRUST
+
+N_ENTITIES = 1000
+
+
+def new_screen():
+    return screens.EntityScreen((), DetailController(adaptive=False, level=0))
+
+def make_asteroid(owner):
+    return entities.AsteroidEntity()
+
+def make_bullet(owner):
+    return entities.BulletEntity(owner)
+
+def make_particle(owner):
+    return entities.ParticleEntity(0, 0, 0.1, 0.1, (1, 1, 1))
+
+def make_player(owner):
+    return entities.PlayerEntity()
+
+def bytes_per_entity(make):
+    """Memory for each of N_ENTITIES entities added to a screen."""
+    random.seed(0)
+    owner = entities.PlayerEntity()
+    screen = new_screen()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    made = [make(owner) for i in range(N_ENTITIES)]
+    screen.add_entities(made)
+    for entity in made:
+        getattr(entity.shape, "points", None)  # Fill caches a frame would
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    return used / N_ENTITIES
+
+def peak(scenario, warm_up=True):
+    """
+    Peak memory, above what was in use at the start, of `scenario()`.
+
+    The scenario is run once first, so one-off caches (numpy's, the font's)
+    aren't counted, and the collector is off while measuring, so the number
+    doesn't depend on when collections happen to run.
+    """
+    if warm_up:
+        random.seed(0)
+        scenario()
+    random.seed(0)
+    gc.collect()
+    gc.disable()
+    try:
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        scenario()
+        used = tracemalloc.get_traced_memory()[1] - start
+        tracemalloc.stop()
+    finally:
+        gc.enable()
+    return used
+
+def asteroid_field():
+    """100 smaller asteroids under fire for 30 updates."""
+    screen = new_screen()
+    screen.add_entities(
+        [entities.AsteroidEntity(random.choice((0.25, 0.5))) for i in range(100)]
+    )
+    shooter = entities.PlayerEntity()
+    keyboard = AgentInputState()
+    for i in range(30):
+        shooter.shape.rotate(37)
+        screen.add_entity(entities.BulletEntity(shooter))
+        screen.update(0.02, keyboard)
+        keyboard.tick(0.02)
+
+def asteroids(n, n_updates):
+    """`n` asteroids with a stream of bullets, as in benchmarks/suite.py."""
+    screen = new_screen()
+    screen.add_entities([
+        entities.AsteroidEntity(random.choice((0.125, 0.25, 0.5))) for i in range(n)
+    ])
+    shooter = entities.PlayerEntity()
+    keyboard = AgentInputState()
+    for i in range(n_updates):
+        shooter.shape.rotate(37)
+        screen.add_entity(entities.BulletEntity(shooter))
+        screen.update(0.02, keyboard)
+        keyboard.tick(0.02)
+
+def particle_flood():
+    """A full particle cap, kept full for 100 updates."""
+    screen = new_screen()
+    keyboard = AgentInputState()
+    for i in range(100):
+        screen.add_entities(
+            entities.ParticleEntity(0, 0, random.uniform(-1, 1), random.uniform(-1, 1), (1, 1, 1))
+            for j in range(50)
+        )
+        screen.update(0.02, keyboard)
+        keyboard.tick(0.02)
+
+def scripted_game():
+    """500 updates of a game with a bot holding fire, turn and thrust."""
+    game = Game(DetailController(adaptive=False))
+    keyboard = AgentInputState()
+    for i in range(500):
+        if i < 5:
+            keyboard.set_actions(ACTION_FIRE)
+        else:
+            keyboard.set_actions(ACTION_FIRE | ACTION_LEFT | ACTION_THRUST*(i % 2))
+        game.update(0.02, keyboard)
+        keyboard.tick(0.02)
+
+def steady_frame_peak(n_updates=100):
+    """
+    The most memory any one update allocates at its peak, in a level with
+    the player alive and turning, once nothing is being created or removed.
+    Allocations here are what keep the garbage collector running in play.
+    """
+    random.seed(0)
+    game = Game(DetailController(adaptive=False))
+    keyboard = AgentInputState()
+    keyboard.set_actions(ACTION_FIRE)
+    while game.player not in getattr(game.current_screen, "entities", ()):
+        game.update(0.02, keyboard)
+        keyboard.tick(0.02)
+        keyboard.set_actions(0)
+
+    keyboard.set_actions(ACTION_LEFT)
+    for i in range(20):
+        game.update(0.02, keyboard)
+        keyboard.tick(0.02)
+
+    tracemalloc.start()
+    most = 0
+    for i in range(n_updates):
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        game.update(0.02, keyboard)
+        keyboard.tick(0.02)
+        most = max(most, tracemalloc.get_traced_memory()[1] - start)
+    tracemalloc.stop()
+    return most
+
+# Name -> function returning the number of bytes
+MEASUREMENTS = {
+    "asteroid": lambda: bytes_per_entity(make_asteroid),
+    "bullet": lambda: bytes_per_entity(make_bullet),
+    "particle": lambda: bytes_per_entity(make_particle),
+    "player": lambda: bytes_per_entity(make_player),
+    "asteroid_field_peak": lambda: peak(asteroid_field),
+    "particle_flood_peak": lambda: peak(particle_flood),
+    "scripted_game_peak": lambda: peak(scripted_game),
+    "asteroids_1000_peak": lambda: peak(lambda: asteroids(1000, 20)),
+    "asteroids_5000_peak": lambda: peak(lambda: asteroids(5000, 3)),
+    "steady_frame_peak": steady_frame_peak,
+}
+
+def measure():
+    return {name: measurement() for name, measurement in MEASUREMENTS.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = measure()
+    if args.json:
+        print(json.dumps(results, indent=2, sort_keys=True))
+    else:
+        print("{:<22} {:>12}".format("bytes", "used"))
+        for name, used in results.items():
+            print("{:<22} {:>12.0f}".format(name, used))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+"""
+Collision pair cache hit rate, and update time with and without it.
+
+Runs the same seeded field of asteroids and bullets twice, once testing
+every pair every update, and checks both runs end in the same state.
+
+    $ python3 benchmarks/pair_cache.py --asteroids 100 --updates 200
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from masteroids import screens, entities
+from masteroids.detail import DetailController
+from masteroids.inputstate import AgentInputState
+from masteroids.paircache import PairCache
+
+
+class NoPairCache(PairCache):
+    """Tests every pair, for comparison."""
+
+    def should_test(self, e1, e2, time):
+        self.tests += 1
+        return True
+
+
+def run(n_asteroids, n_updates, seed, cache_class):
+    random.seed(seed)
+    screen = screens.EntityScreen((), DetailController(adaptive=False))
+    screen.pair_cache = cache_class()
+    screen.add_entities(
+        [entities.AsteroidEntity(random.choice((0.25, 0.5, 1))) for i in range(n_asteroids)]
+    )
+    # A ship that never moves, as the owner of a stream of bullets
+    shooter = entities.PlayerEntity()
+    keyboard = AgentInputState()
+
+    start = time.perf_counter()
+    for i in range(n_updates):
+        if i % 5 == 0:
+            shooter.shape.rotate(37)
+            screen.add_entity(entities.BulletEntity(shooter))
+        screen.update(0.02, keyboard)
+        keyboard.tick(0.02)
+    elapsed = time.perf_counter() - start
+
+    state = sorted(
+        (round(e.x, 9), round(e.y, 9)) for e in screen.entities
+    )
+    return elapsed / n_updates, screen.pair_cache, state
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--asteroids", type=int, default=50)
+    parser.add_argument("--updates", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    cached_time, cache, cached_state = run(
+        args.asteroids, args.updates, args.seed, PairCache
+    )
+    full_time, no_cache, full_state = run(
+        args.asteroids, args.updates, args.seed, NoPairCache
+    )
+
+    print(cache.describe())
+    print("with cache    {:.2f} ms/update".format(cached_time*1000))
+    print("without cache {:.2f} ms/update".format(full_time*1000))
+    if cached_state != full_state:
+        print("Runs ended in different states")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
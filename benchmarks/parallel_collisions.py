@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""
+Update time with collisions found in this process and by a CollisionPool.
+
+Runs the same seeded field of asteroids and bullets both ways and checks
+that both runs end in the same state.
+
+    $ python3 benchmarks/parallel_collisions.py --asteroids 5000 --processes 8
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from masteroids import screens, entities
+from masteroids.detail import DetailController
+from masteroids.inputstate import AgentInputState
+from masteroids.parallel import CollisionPool
+
+
+def run(n_asteroids, n_updates, seed, backend):
+    random.seed(seed)
+    screen = screens.EntityScreen((), DetailController(adaptive=False))
+    screen.collision_backend = backend
+    screen.add_entities([
+        entities.AsteroidEntity(random.choice((0.125, 0.25, 0.5)))
+        for i in range(n_asteroids)
+    ])
+    # A ship that never moves, as the owner of a stream of bullets
+    shooter = entities.PlayerEntity()
+    keyboard = AgentInputState()
+
+    times = []
+    for i in range(n_updates):
+        shooter.shape.rotate(37)
+        screen.add_entity(entities.BulletEntity(shooter))
+        start = time.perf_counter()
+        screen.update(0.02, keyboard)
+        times.append(time.perf_counter() - start)
+        keyboard.tick(0.02)
+
+    state = [(type(e).__name__, e.x, e.y) for e in screen.entities]
+    return sorted(times)[len(times) // 2], state
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--asteroids", type=int, default=1000)
+    parser.add_argument("--updates", type=int, default=5)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--strips", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with CollisionPool(args.processes, args.strips) as pool:
+        pool_time, pool_state = run(args.asteroids, args.updates, args.seed, pool)
+        processes, strips = pool.processes, pool.strips
+    local_time, local_state = run(args.asteroids, args.updates, args.seed, None)
+
+    print("{} processes, {} strips".format(processes, strips))
+    print("in process      {:.1f} ms/update (median)".format(local_time*1000))
+    print("collision pool  {:.1f} ms/update (median)".format(pool_time*1000))
+    if pool_state != local_state:
+        print("Runs ended in different states")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+"""
+Spatial query time on EntityScreen against a linear scan of every entity.
+
+Each query is answered both ways for a seeded field of asteroids, and the
+answers are checked against each other.
+
+    $ python3 benchmarks/spatial.py --asteroids 2000 --queries 30
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from math import sqrt, sin, cos, radians
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from masteroids import screens, entities, shapes
+from masteroids.detail import DetailController
+from masteroids.inputstate import AgentInputState
+from masteroids.spatial import wrapped_delta
+
+
+def distance(entity, x, y):
+    return sqrt(wrapped_delta(entity.x, x)**2 + wrapped_delta(entity.y, y)**2)
+
+def scan_within(screen, x, y, radius):
+    found = [
+        (distance(e, x, y), e) for e in screen.entities
+        if distance(e, x, y) < radius + e.shape.radius
+    ]
+    return [e for d, e in sorted(found, key=lambda pair: pair[0])]
+
+def scan_nearest(screen, x, y):
+    return min(screen.entities, key=lambda e: distance(e, x, y))
+
+def scan_ray_cast(screen, x, y, dx, dy, max_distance):
+    """Tests the ray against all 9 wraparound copies of every polygon."""
+    end = (x + dx*max_distance, y + dy*max_distance)
+    best, best_t = None, 1
+    for entity in screen.entities:
+        for (x1, y1), (x2, y2) in entity.shape.get_lines():
+            for ox in (-2, 0, 2):
+                for oy in (-2, 0, 2):
+                    edge = ((x1 + ox, y1 + oy), (x2 + ox, y2 + oy))
+                    t_edge, t_ray = shapes._find_t_intersects(edge, ((x, y), end))
+                    if t_edge is None or not 0 <= t_edge <= 1:
+                        continue
+                    if 0 <= t_ray < best_t:
+                        best, best_t = entity, t_ray
+    return best
+
+def time_queries(func, queries):
+    start = time.perf_counter()
+    results = [func(*query) for query in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--asteroids", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    screen = screens.EntityScreen((), DetailController(adaptive=False))
+    screen.add_entities([
+        entities.AsteroidEntity(random.choice((0.125, 0.25, 0.5)))
+        for i in range(args.asteroids)
+    ])
+    # Move everything once, so the index is built after an update
+    screen.update(0.02, AgentInputState())
+
+    points = [
+        (random.uniform(-1, 1), random.uniform(-1, 1))
+        for i in range(args.queries)
+    ]
+    angles = [random.uniform(0, 360) for i in range(args.queries)]
+    rays = [
+        (x, y, cos(radians(a)), sin(radians(a)), 1.5)
+        for (x, y), a in zip(points, angles)
+    ]
+    circles = [(x, y, 0.1) for x, y in points]
+
+    failed = False
+    print("{:<10} {:>12} {:>12}".format("query (ms)", "indexed", "scan"))
+    for name, indexed, scan, queries in (
+        ("within", screen.entities_within, lambda *q: scan_within(screen, *q), circles),
+        ("nearest", screen.nearest_entity, lambda *q: scan_nearest(screen, *q), points),
+        ("ray_cast", screen.ray_cast, lambda *q: scan_ray_cast(screen, *q), rays),
+    ):
+        indexed_time, indexed_results = time_queries(indexed, queries)
+        scan_time, scan_results = time_queries(scan, queries)
+        if name == "ray_cast":
+            indexed_results = [r[0] if r else None for r in indexed_results]
+        if indexed_results != scan_results:
+            print("{} gave different answers".format(name))
+            failed = True
+        print("{:<10} {:>12.3f} {:>12.3f}".format(
+            name, indexed_time*1000, scan_time*1000
+        ))
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+"""
+Time from process start to the end of the first `Game.update`.
+
+Each run spawns a fresh interpreter, the same way a headless worker would
+start, so interpreter startup and every import are included.
+
+    $ python3 benchmarks/startup.py --runs 20
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in the child. Prints wall clock timestamps, which the parent compares
+# against its own timestamp from just before spawning the process.
+CHILD_CODE = """
+import time
+imports_start = time.time()
+from masteroids.game import Game
+from masteroids.inputstate import InputState
+game_start = time.time()
+game = Game()
+update_start = time.time()
+game.update(0, InputState())
+end = time.time()
+print(imports_start, game_start, update_start, end)
+"""
+
+
+def time_startup():
+    """Return the time, in seconds, spent in each phase of one startup."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    start = time.time()
+    output = subprocess.check_output(
+        [sys.executable, "-c", CHILD_CODE], cwd=ROOT, env=env
+    )
+    imports_start, game_start, update_start, end = map(float, output.split())
+    return {
+        "interpreter": imports_start - start,
+        "imports": game_start - imports_start,
+        "game_init": update_start - game_start,
+        "first_update": end - update_start,
+        "total": end - start,
+    }
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        "min": values[0],
+        "median": values[len(values) // 2],
+        "max": values[-1],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    runs = [time_startup() for i in range(args.runs)]
+    results = {
+        phase: summarize([run[phase] for run in runs])
+        for phase in runs[0]
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2, sort_keys=True))
+        return
+    print("{:<14} {:>9} {:>9} {:>9}".format("phase (ms)", "min", "median", "max"))
+    for phase in ("interpreter", "imports", "game_init", "first_update", "total"):
+        stats = results[phase]
+        print("{:<14} {:>9.1f} {:>9.1f} {:>9.1f}".format(
+            phase, stats["min"]*1000, stats["median"]*1000, stats["max"]*1000
+        ))
+
+if __name__ == "__main__":
+    main()
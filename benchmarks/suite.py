@@ -0,0 +1,301 @@
+#!/usr/bin/python3
+"""
+Micro and scenario benchmarks, with results saved as JSON and compared.
+
+Micro benchmarks time single calls into shapes and text. Scenario benchmarks
+time headless `EntityScreen.update` calls on seeded screens. Every benchmark
+is set up again from the same seed, so runs are comparable, run `WARM_UP`
+times untimed and then timed `REPEAT` times. The fastest time is what gets
+compared, since noise only ever adds time, and a change is only reported
+if it is also bigger than the spread of either run. Benchmarks that look
+slower are run once more before being reported, to rule out a burst of
+load on the machine.
+
+    $ python3 benchmarks/suite.py --output baseline.json
+    $ python3 benchmarks/suite.py --compare baseline.json
+    $ python3 benchmarks/suite.py --only asteroids_100 --only polygon_split
+
+The 5000 asteroid scenario tests every pair of asteroids on its first update
+and takes several minutes, so leave it out with `--only` when iterating.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from masteroids import screens, entities, shapes, text
+from masteroids.game import Game
+from masteroids.detail import DetailController
+from masteroids.autopilot import Autopilot
+from masteroids.kinematics import Kinematics
+from masteroids.impacts import ImpactScheduler
+from masteroids.inputstate import AgentInputState
+
+WARM_UP = 1
+REPEAT = 7
+ASTEROID_COUNTS = (10, 100, 1000, 5000)
+
+# Name -> function returning (function to time, calls per repeat)
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+class NullGL():
+    """
+    Stands in for OpenGL.GL, doing nothing, so drawing code can be timed
+    without a window. Only the Python side of drawing is measured.
+    """
+
+    def __getattr__(self, name):
+        return _do_nothing
+
+def _do_nothing(*args):
+    pass
+
+
+def asteroid_shape(size=1, x=0, y=0):
+    asteroid = entities.AsteroidEntity(size, x, y)
+    return asteroid.shape
+
+def new_screen(level=0):
+    return screens.EntityScreen((), DetailController(adaptive=False, level=level))
+
+def updater(screen):
+    """A function doing one 20ms update of `screen`."""
+    keyboard = AgentInputState()
+    def update():
+        screen.update(0.02, keyboard)
+        keyboard.tick(0.02)
+    return update
+
+
+# Micro benchmarks
+
+@benchmark("collision_polygon_polygon_hit")
+def bench_polygon_polygon_hit():
+    poly1, poly2 = asteroid_shape(x=0), asteroid_shape(x=0.1)
+    return lambda: shapes._collision_polygon_polygon(poly1, poly2), 1000
+
+@benchmark("collision_polygon_polygon_miss")
+def bench_polygon_polygon_miss():
+    poly1, poly2 = asteroid_shape(x=-0.5), asteroid_shape(x=0.5)
+    return lambda: shapes._collision_polygon_polygon(poly1, poly2), 1000
+
+@benchmark("collision_polygon_point_hit")
+def bench_polygon_point_hit():
+    poly, point = asteroid_shape(), shapes.PointShape(0.01, 0.01)
+    return lambda: shapes._collision_polygon_point(poly, point), 1000
+
+@benchmark("collision_polygon_point_miss")
+def bench_polygon_point_miss():
+    poly, point = asteroid_shape(), shapes.PointShape(0.5, 0.5)
+    return lambda: shapes._collision_polygon_point(poly, point), 1000
+
+@benchmark("polygon_points")
+def bench_polygon_points():
+    """Recomputing the vertexes, as after every integrate."""
+    kinematics = Kinematics()
+    shape = asteroid_shape()
+    kinematics.add(shape)
+    def points():
+        kinematics.generation += 1
+        return shape.points
+    return points, 10000
+
+@benchmark("polygon_split")
+def bench_polygon_split():
+    shape = asteroid_shape()
+    return shape.split, 100
+
+@benchmark("asteroid_split")
+def bench_asteroid_split():
+    """Splitting a hit asteroid, once its fracture is worked out."""
+    asteroid = entities.AsteroidEntity()
+    asteroid.prepare_split()
+    return lambda: asteroid.split(None), 1000
+
+@benchmark("text_draw_str")
+def bench_draw_str():
+    def draw():
+        text.draw_str("SCORE 12345\nLIVES 3", pos=(-0.9, 0.9), scale=0.5)
+    return draw, 1000
+
+
+# Scenario benchmarks, timed per update
+
+def asteroid_field(n_asteroids, backend=None):
+    def setup():
+        screen = new_screen()
+        screen.add_entities([
+            entities.AsteroidEntity(random.choice((0.125, 0.25, 0.5)))
+            for i in range(n_asteroids)
+        ])
+        if backend is not None:
+            screen.collision_backend = backend()
+        return updater(screen), max(1, 1000 // n_asteroids)
+    return setup
+
+for n in ASTEROID_COUNTS:
+    benchmark("asteroids_{}".format(n))(asteroid_field(n))
+
+# Collisions scheduled by time of impact, to compare with asteroids_1000
+benchmark("asteroids_1000_scheduled")(asteroid_field(1000, ImpactScheduler))
+
+@benchmark("bullet_storm")
+def bench_bullet_storm():
+    """A turning ship firing every update into 50 asteroids."""
+    screen = new_screen()
+    screen.add_entities([
+        entities.AsteroidEntity(random.choice((0.25, 0.5, 1))) for i in range(50)
+    ])
+    shooter = entities.PlayerEntity()
+    update = updater(screen)
+    def fire_and_update():
+        shooter.shape.rotate(37)
+        screen.add_entity(entities.BulletEntity(shooter))
+        update()
+    return fire_and_update, 50
+
+@benchmark("particle_flood")
+def bench_particle_flood():
+    """50 new particles per update, with 10 asteroids to collide with."""
+    screen = new_screen()
+    screen.add_entities([entities.AsteroidEntity() for i in range(10)])
+    update = updater(screen)
+    def flood_and_update():
+        screen.add_entities(
+            entities.ParticleEntity(
+                0, 0, random.uniform(-1, 1), random.uniform(-1, 1), (1, 1, 1)
+            )
+            for i in range(50)
+        )
+        update()
+    return flood_and_update, 50
+
+@benchmark("autopilot_game")
+def bench_autopilot_game():
+    """A whole game played by the autopilot, from the first level on."""
+    game = Game(DetailController(adaptive=False))
+    autopilot = Autopilot(0)
+    def play():
+        nonlocal game
+        autopilot.before_update(game)
+        if game.update(0.02, autopilot):
+            game = Game(game.detail)
+        autopilot.tick(0.02)
+    return play, 1000
+
+
+def run(name, seed):
+    """Return (min, median) seconds per call of benchmark `name`."""
+    random.seed(seed)
+    func, number = BENCHMARKS[name]()
+    # Scenarios are left running, so this also gets past their first update,
+    # which tests every pair of entities
+    for i in range(WARM_UP * number):
+        func()
+    times = []
+    for i in range(REPEAT):
+        start = time.perf_counter()
+        for j in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+    times.sort()
+    return times[0], times[len(times) // 2]
+
+def spread(result):
+    """How far the median is above the minimum, as a fraction."""
+    return result["median"] / result["min"] - 1
+
+def is_slower(result, before, threshold):
+    change = result["min"] / before["min"] - 1
+    return change > threshold + max(spread(result), spread(before))
+
+def compare(results, baseline, threshold):
+    """Print the change from `baseline` and return the names now slower."""
+    slower = []
+    print("{:<32} {:>12} {:>12} {:>8}".format("min (ms)", "baseline", "now", "change"))
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, now = baseline[name]["min"], result["min"]
+        change = now / before - 1
+        if is_slower(result, baseline[name], threshold):
+            slower.append(name)
+        print("{:<32} {:>12.4f} {:>12.4f} {:>+7.1f}% {}".format(
+            name, before*1000, now*1000, change*100,
+            "SLOWER" if name in slower else ""
+        ))
+    return slower
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--only", action="append", metavar="NAME",
+                        help="Only run benchmark NAME (see --list), can be repeated")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", metavar="FILE", help="Save results as JSON")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="Compare against results saved with --output")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Fraction slower than the baseline, on top of the "
+                             "runs' spread, counted as a regression")
+    parser.add_argument("--list", action="store_true", help="List benchmarks and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return
+    if args.only:
+        unknown = set(args.only) - set(BENCHMARKS)
+        if unknown:
+            parser.error("Unknown benchmark {}, see --list".format(", ".join(sorted(unknown))))
+    names = [name for name in BENCHMARKS if not args.only or name in args.only]
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    # Drawing is timed against a stand-in, and no window is ever opened
+    text.GL = NullGL()
+
+    results = {}
+    for name in names:
+        low, median = run(name, args.seed)
+        results[name] = {"min": low, "median": median}
+        if baseline is not None and name in baseline and \
+                is_slower(results[name], baseline[name], args.threshold):
+            low, median = run(name, args.seed)
+            if low < results[name]["min"]:
+                results[name] = {"min": low, "median": median}
+        if baseline is None:
+            print("{:<32} {:>12.4f} ms median {:>12.4f} ms min".format(
+                name, median*1000, low*1000
+            ), flush=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "seed": args.seed,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+
+    if baseline is not None:
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+A scripted player, for generating realistic load without anyone playing.
+
+The autopilot is an `AgentInputState`, so it plays through the same keys a
+person would. Drivers call `before_update(game)` before every update, which
+every `InputState` has, and the autopilot picks its keys there: it gets out
+of the way of asteroids closing in, otherwise turns toward the nearest
+asteroid and fires whenever the ship can. On the title, high score and game
+over screens it taps space, so a run goes on through any number of games.
+
+Its choices only depend on the game and its own seeded random numbers, so
+the same seed and game state always give the same run.
+"""
+
+import random
+from math import sqrt, atan2, degrees
+
+from masteroids import screens
+from masteroids.entities import AsteroidEntity, BulletEntity
+from masteroids.inputstate import AgentInputState, \
+    ACTION_THRUST, ACTION_LEFT, ACTION_RIGHT, ACTION_FIRE
+
+
+class Autopilot(AgentInputState):
+    DANGER_RADIUS = 0.2  # Closing asteroids nearer than this are avoided
+    AIM_TOLERANCE = 5  # Degrees off target before turning
+    FIRE_TOLERANCE = 20  # Degrees off target to still fire
+    ESCAPE_TOLERANCE = 45  # Degrees off the escape heading to still thrust
+    WOBBLE = 5  # Most degrees of random aiming error
+    WANDER_THRUST = 0.05  # Chance of thrusting each update when safe
+    MAX_SPEED = 0.3
+
+    def __init__(self, seed=None):
+        super().__init__()
+        self.random = random.Random(seed)
+
+    def before_update(self, game):
+        self.set_actions(self.choose_actions(game))
+
+    def choose_actions(self, game):
+        screen = game.current_screen
+        if not isinstance(screen, screens.GameplayScreen):
+            return self._tap(ACTION_FIRE)
+        player = screen.player
+        if player not in screen.entities:
+            return self._tap(ACTION_FIRE) if screen.game_over_time else 0
+
+        threat = self._closing_asteroid(screen, player)
+        if threat is not None:
+            # Face away from it and thrust
+            dx, dy = _offset(player, threat)
+            error = _aim_error(player, -dx, -dy)
+            actions = self._turn(error)
+            if abs(error) < self.ESCAPE_TOLERANCE:
+                actions |= ACTION_THRUST
+            return actions
+
+        actions = 0
+        target = screen.nearest_entity(player.x, player.y, kind=AsteroidEntity)
+        if target is not None:
+            # Lead the target by how far it moves while a bullet gets there.
+            # Bullets carry the ship's velocity, so only the difference counts.
+            dx, dy = _offset(player, target)
+            t = sqrt(dx*dx + dy*dy) / BulletEntity.VELOCITY
+            dx += (target.dx - player.dx) * t
+            dy += (target.dy - player.dy) * t
+            error = _aim_error(player, dx, dy)
+            error += self.random.uniform(-self.WOBBLE, self.WOBBLE)
+            actions |= self._turn(error)
+            if abs(error) < self.FIRE_TOLERANCE and player.can_fire():
+                actions |= self._tap(ACTION_FIRE)
+        speed = sqrt(player.dx**2 + player.dy**2)
+        if speed < self.MAX_SPEED and self.random.random() < self.WANDER_THRUST:
+            actions |= ACTION_THRUST
+        return actions
+
+    def _tap(self, action):
+        """`action` if it was released last update, so it counts as a press."""
+        return 0 if self.actions & action else action
+
+    def _turn(self, error):
+        if error > self.AIM_TOLERANCE:
+            return ACTION_LEFT
+        elif error < -self.AIM_TOLERANCE:
+            return ACTION_RIGHT
+        return 0
+
+    def _closing_asteroid(self, screen, player):
+        """The nearest asteroid within DANGER_RADIUS moving toward the player."""
+        nearby = screen.entities_within(
+            player.x, player.y, self.DANGER_RADIUS, kind=AsteroidEntity
+        )
+        for asteroid in nearby:
+            dx, dy = _offset(player, asteroid)
+            closing = dx*(asteroid.dx - player.dx) + dy*(asteroid.dy - player.dy)
+            if closing < 0:
+                return asteroid
+        return None
+
+
+def _offset(player, entity):
+    """Where `entity` is from `player`, the short way around."""
+    return (
+        (entity.x - player.x + 1) % 2 - 1,
+        (entity.y - player.y + 1) % 2 - 1,
+    )
+
+def _aim_error(player, dx, dy):
+    """Degrees to turn left to face along (dx, dy), from -180 to 180."""
+    # Yaw 0 points up (+y), increasing counterclockwise
+    target_yaw = degrees(atan2(-dx, dy))
+    return (target_yaw - player.yaw + 180) % 360 - 180
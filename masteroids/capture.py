@@ -0,0 +1,204 @@
+"""
+Offscreen rendering of a game into raw video frames.
+
+The game is drawn into a framebuffer object at a fixed resolution and read
+back into pixel buffer objects, so no visible window is needed. A GL context
+still has to exist first, see `create_context()`. The "osmesa" and "egl"
+backends need the `PYOPENGL_PLATFORM` environment variable set to the same
+name before OpenGL is first imported (`record.py` takes care of this).
+"""
+
+import sys
+import ctypes
+
+from OpenGL.GL import *
+
+from masteroids.game import Game
+from masteroids.interface import init_gl, render, set_viewport
+from masteroids.screens import DisplayList
+
+
+class FrameCapture():
+    """
+    Renders a game into an offscreen framebuffer and streams raw frames.
+
+    Frames are read back through two pixel buffer objects used in turn. The
+    read of frame N is queued into one buffer while frame N-1, which the GPU
+    has had a whole frame to finish, is mapped from the other. This way the
+    readback never stalls waiting for the frame that was just drawn.
+
+    Frames are written to `output` as tightly packed RGB24 rows, top row
+    first, so they can be fed straight into e.g.
+    `ffmpeg -f rawvideo -pix_fmt rgb24 -s WxH -i -`.
+    """
+
+    def __init__(self, width, height, output):
+        self.width = width
+        self.height = height
+        self.output = output
+        self.frame_size = width * height * 3
+        self.frames_written = 0
+        self._next_pbo = 0
+        self._pending_pbo = None
+        self.hud_list = DisplayList()  # For this capture's GL context
+
+        self.renderbuffer = glGenRenderbuffers(1)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.renderbuffer)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, width, height)
+
+        self.framebuffer = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.framebuffer)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0,
+                                  GL_RENDERBUFFER, self.renderbuffer)
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError("Offscreen framebuffer incomplete (status {})".format(status))
+
+        self.pbos = [int(pbo) for pbo in glGenBuffers(2)]
+        for pbo in self.pbos:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self.frame_size, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+
+        init_gl()
+
+    def capture(self, game):
+        """Draw `game` offscreen and queue its pixels for writing."""
+        glBindFramebuffer(GL_FRAMEBUFFER, self.framebuffer)
+        set_viewport(self.width, self.height)
+        render(game, self.width, self.height, flip_y=True, hud_list=self.hud_list)
+
+        # Asynchronous: returns as soon as the read is queued into the PBO
+        pbo = self.pbos[self._next_pbo]
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+        glReadPixels(0, 0, self.width, self.height, GL_RGB, GL_UNSIGNED_BYTE,
+                     ctypes.c_void_p(0))
+
+        if self._pending_pbo is not None:
+            self._write_pbo(self._pending_pbo)
+        self._pending_pbo = self._next_pbo
+        self._next_pbo = 1 - self._next_pbo
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+
+    def finish(self):
+        """Write out the last queued frame."""
+        if self._pending_pbo is not None:
+            self._write_pbo(self._pending_pbo)
+            self._pending_pbo = None
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.output.flush()
+
+    def delete(self):
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        glDeleteBuffers(2, self.pbos)
+        glDeleteFramebuffers(1, [self.framebuffer])
+        glDeleteRenderbuffers(1, [self.renderbuffer])
+
+    def _write_pbo(self, index):
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.pbos[index])
+        address = glMapBuffer(GL_PIXEL_PACK_BUFFER, GL_READ_ONLY)
+        if not address:
+            raise RuntimeError("Could not map pixel buffer for reading")
+        try:
+            pixels = (ctypes.c_ubyte * self.frame_size).from_address(address)
+            self.output.write(pixels)
+        finally:
+            glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        self.frames_written += 1
+
+
+def record(game, keyboard, frame_capture, n_frames, fps=50):
+    """
+    Step `game` at a fixed `1/fps` timestep, capturing every frame.
+
+    The simulation runs as fast as the frames can be drawn, not in real time,
+    so the output plays back at `fps` regardless of how long it took.
+    """
+    dt = 1 / fps
+    for i in range(n_frames):
+        keyboard.before_update(game)
+        game_finished = game.update(dt, keyboard)
+        if game_finished:
+            game = Game(game.detail, game.gc_control)
+        keyboard.tick(dt)
+        frame_capture.capture(game)
+    frame_capture.finish()
+    return game
+
+
+def create_context(backend, width, height):
+    """
+    Make a GL context current without showing a window.
+
+    backend:
+        "glut" - A hidden GLUT window. Needs an X server, which can be a
+                 virtual one such as Xvfb.
+        "osmesa" - Mesa's off-screen software renderer. No display needed.
+        "egl" - A surfaceless EGL context. No display needed.
+    """
+    if backend == "glut":
+        return _create_glut_context(width, height)
+    elif backend == "osmesa":
+        return _create_osmesa_context(width, height)
+    elif backend == "egl":
+        return _create_egl_context()
+    raise ValueError('Unknown GL context backend "{}"'.format(backend))
+
+def _create_glut_context(width, height):
+    from OpenGL.GLUT import glutInit, glutInitDisplayMode, glutInitWindowSize, \
+        glutCreateWindow, glutHideWindow, GLUT_RGB
+    glutInit(sys.argv)
+    glutInitDisplayMode(GLUT_RGB)
+    glutInitWindowSize(width, height)
+    window = glutCreateWindow(b"Masteroids Capture")
+    glutHideWindow()
+    return window
+
+def _create_osmesa_context(width, height):
+    from OpenGL import arrays
+    from OpenGL import osmesa
+    context = osmesa.OSMesaCreateContextExt(osmesa.OSMESA_RGBA, 0, 0, 0, None)
+    if not context:
+        raise RuntimeError("Could not create OSMesa context")
+
+    # OSMesa always needs a default buffer, even though we draw into our own
+    # framebuffer. It is kept tiny since it's never read.
+    buf = arrays.GLubyteArray.zeros((1, 1, 4))
+    if not osmesa.OSMesaMakeCurrent(context, buf, GL_UNSIGNED_BYTE, 1, 1):
+        raise RuntimeError("Could not make OSMesa context current")
+    return (context, buf)
+
+EGL_PLATFORM_SURFACELESS_MESA = 0x31DD  # Not in PyOpenGL's EGL constants
+
+def _create_egl_context():
+    from OpenGL import EGL
+    # The default display needs an X or Wayland server, unless EGL_PLATFORM
+    # is set to "surfaceless" in the environment
+    extensions = EGL.eglQueryString(EGL.EGL_NO_DISPLAY, EGL.EGL_EXTENSIONS) or b""
+    if b"EGL_MESA_platform_surfaceless" in extensions.split():
+        from OpenGL.raw.EGL.EXT.platform_base import eglGetPlatformDisplayEXT
+        display = eglGetPlatformDisplayEXT(EGL_PLATFORM_SURFACELESS_MESA, None, None)
+    else:
+        display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    if not EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor)):
+        raise RuntimeError("Could not initialize EGL display")
+
+    config = EGL.EGLConfig()
+    n_configs = EGL.EGLint()
+    attributes = (EGL.EGLint * 5)(
+        EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+        EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+        EGL.EGL_NONE
+    )
+    EGL.eglChooseConfig(display, attributes, ctypes.pointer(config), 1,
+                        ctypes.pointer(n_configs))
+    if n_configs.value < 1:
+        raise RuntimeError("No suitable EGL config")
+
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+    if not EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, context):
+        raise RuntimeError("Could not make EGL context current")
+    return (display, context)
@@ -0,0 +1,108 @@
+import random
+from collections import deque
+
+
+class DetailController():
+    """
+    Trades particle detail for frame time.
+
+    The game reports how long each update and draw took. Once a window of
+    frames has been measured, the detail level goes up (less detail) if the
+    average frame is over the target, or down (more detail) if there is
+    plenty of headroom. Level 0 is full detail.
+
+    With `adaptive=False` the level stays where it is put, which keeps runs
+    that need to be reproducible independent of machine speed.
+
+    Time spent in the garbage collector is recorded with each frame too, in
+    `gc_pauses`. It is already part of the frame times, so it is only for
+    reporting.
+    """
+    TARGET_FRAME_TIME = 0.015  # Seconds of update + draw, out of a 20ms tick
+    HEADROOM = 0.5  # Regain detail when frames take less than this * target
+    WINDOW = 30  # Frames to average before each decision
+
+    # (particle cap, emission scale, particle collision interval in frames)
+    LEVELS = (
+        (1000, 1.0, 10),
+        (600, 0.75, 15),
+        (300, 0.5, 20),
+        (150, 0.25, 30),
+        (50, 0.1, 60),
+    )
+
+    def __init__(self, target_frame_time=None, adaptive=True, level=0):
+        if target_frame_time is not None:
+            self.TARGET_FRAME_TIME = target_frame_time
+        self.adaptive = adaptive
+        self.level = level
+        self.frame_times = deque(maxlen=self.WINDOW)
+        self.gc_pauses = deque(maxlen=self.WINDOW)
+        self.longest_gc_pause = 0
+        self.draw_time = 0
+
+        # Separate from the game's random state, which snapshots capture
+        self.random = random.Random()
+
+    @property
+    def particle_cap(self):
+        return self.LEVELS[self.level][0]
+
+    @property
+    def emission_scale(self):
+        return self.LEVELS[self.level][1]
+
+    @property
+    def particle_collision_interval(self):
+        return self.LEVELS[self.level][2]
+
+    @property
+    def average_frame_time(self):
+        if not self.frame_times:
+            return 0
+        return sum(self.frame_times) / len(self.frame_times)
+
+    def scale_emission(self, number):
+        """
+        Return how many of `number` particles should actually be emitted.
+
+        Fractions are rounded up or down at random, so that e.g. 2 particles
+        a frame at scale 0.1 still averages out to 0.2 a frame.
+        """
+        return int(number * self.emission_scale + self.random.random())
+
+    def record_draw(self, seconds):
+        self.draw_time = seconds
+
+    def record_update(self, seconds, gc_pause=0):
+        """
+        Record an update's duration, completing a frame with the last draw,
+        and `gc_pause` seconds spent collecting garbage during the frame.
+        """
+        self.frame_times.append(seconds + self.draw_time)
+        self.draw_time = 0
+        self.gc_pauses.append(gc_pause)
+        self.longest_gc_pause = max(self.longest_gc_pause, gc_pause)
+        if not self.adaptive or len(self.frame_times) < self.WINDOW:
+            return
+
+        average = self.average_frame_time
+        if average > self.TARGET_FRAME_TIME and self.level < len(self.LEVELS) - 1:
+            self.set_level(self.level + 1)
+        elif average < self.TARGET_FRAME_TIME * self.HEADROOM and self.level > 0:
+            self.set_level(self.level - 1)
+
+    def set_level(self, level):
+        self.level = level
+        self.frame_times.clear()
+
+    def describe(self):
+        return "detail level {} ({:.1f}ms/frame, {} particles max)".format(
+            self.level, self.average_frame_time*1000, self.particle_cap
+        )
+
+    def describe_gc_pauses(self):
+        return "GC {:.2f}ms/frame, {:.1f}ms longest pause".format(
+            sum(self.gc_pauses) / max(1, len(self.gc_pauses)) * 1000,
+            self.longest_gc_pause * 1000
+        )
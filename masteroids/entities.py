@@ -1,15 +1,37 @@
 
 import random
-from time import time
 from math import sqrt, radians, sin, cos
 
-from OpenGL.GL import *
-from OpenGL.GLUT import *
+from masteroids import shapes, fracture
+from masteroids.shapes import DX, DY, DYAW
+from masteroids.gl import GL
+from masteroids.inputstate import KEY_LEFT, KEY_RIGHT, KEY_UP
 
-from masteroids import shapes
+# Collision layers, as bits of Entity.layer and Entity.mask
+LAYER_PLAYER = 1
+LAYER_ASTEROID = 2
+LAYER_BULLET = 4
+LAYER_PARTICLE = 8
+LAYER_ALL = ~0
 
 
 class Entity():
+    """
+    Something on a screen with a shape.
+
+    Motion is not done by `update()`. The velocity (`dx`, `dy`) and spin
+    (`dyaw`) are kept with the shape's position, and the screen integrates
+    all of its entities at once before updating them (see kinematics.py).
+
+    Two entities are only tested for collision if one's `layer` is in the
+    other's `mask`. What happens when they collide is looked up in
+    COLLISION_HANDLERS by `on_collision()`.
+    """
+    __slots__ = ("shape",)
+    color = (1, 1, 1)
+    ballistic = False  # True if the velocity never changes once added
+    layer = LAYER_ALL
+    mask = LAYER_ALL
 
     def __init__(self):
         self.shape = None
@@ -18,7 +40,9 @@ class Entity():
         pass
 
     def on_collision(self, other, point, dt, screen):
-        pass
+        handler = collision_handler(type(self), type(other))
+        if handler is not None:
+            handler(self, other, point, dt, screen)
 
     def update(self, dt, keyboard, screen):
         pass
@@ -26,6 +50,9 @@ class Entity():
     def draw(self):
         raise NotImplementedError()
 
+    def add_to_scene(self, scene):
+        self.shape.add_to_scene(scene, self.color)
+
     @property
     def x(self):
         return self.shape.x
@@ -34,14 +61,44 @@ class Entity():
     def y(self):
         return self.shape.y
 
+    @property
+    def dx(self):
+        return self.shape.state[DX]
+
+    @dx.setter
+    def dx(self, value):
+        self.shape.state[DX] = value
+
+    @property
+    def dy(self):
+        return self.shape.state[DY]
+
+    @dy.setter
+    def dy(self, value):
+        self.shape.state[DY] = value
+
+    @property
+    def dyaw(self):
+        """Degrees per update."""
+        return self.shape.state[DYAW]
+
+    @dyaw.setter
+    def dyaw(self, value):
+        self.shape.state[DYAW] = value
+
 
 class BulletEntity(Entity):
+    __slots__ = ("owner", "age")
+    color = (0, 1, 0)
+    ballistic = True
+    layer = LAYER_BULLET
+    mask = LAYER_ASTEROID
     VELOCITY = 1  # Units / Second
     LIFETIME = 1  # Seconds
 
     def __init__(self, owner):
         self.owner = owner
-        self.start_time = time()
+        self.age = 0
 
         self.shape = shapes.PointShape(owner.x, owner.y)
 
@@ -52,21 +109,23 @@ class BulletEntity(Entity):
         self.dy = dir_y*self.VELOCITY + owner.dy
 
     def update(self, dt, keyboard, screen):
-        self.shape.translate(self.dx * dt, self.dy * dt)
-
-        if time() - self.start_time > self.LIFETIME:
+        self.age += dt
+        if self.age > self.LIFETIME:
             screen.remove_entity(self)
 
     def draw(self):
-        glColor(0, 1, 0)
+        GL.glColor(*self.color)
         self.shape.draw()
 
-    def on_collision(self, other, point, dt, screen):
-        if isinstance(other, AsteroidEntity):
-            screen.remove_entity(self)
+    def hit_asteroid(self, other, point, dt, screen):
+        screen.remove_entity(self)
 
 
 class PlayerEntity(Entity):
+    __slots__ = ("lives", "score", "controls", "cooldown")
+    color = (0, 1, 0)
+    layer = LAYER_PLAYER
+    mask = LAYER_ASTEROID
     TURN_RATE = 200
     THRUST_RATE = 0.02
     RECOIL_RATE = 0.008
@@ -89,35 +148,39 @@ class PlayerEntity(Entity):
         self.lives = 3
         self.score = 0
 
+        # Input used instead of the screen's keyboard, when there are several
+        # players each with their own controls.
+        self.controls = None
+
     def setup(self, screen):
+        self.shape = shapes.PolygonShape(self.SHIP_VERTEXES)
         self.dx = 0
         self.dy = 0
         self.cooldown = 0
 
-        self.shape = shapes.PolygonShape(self.SHIP_VERTEXES)
-
     @property
     def yaw(self):
         return self.shape.yaw
 
     def update(self, dt, keyboard, screen):
-        self.shape.translate(self.dx * dt, self.dy * dt)
+        if self.controls is not None:
+            keyboard = self.controls
 
         if self.can_fire() and keyboard.key_just_pressed(b' ', repeat=0.4):
             self.fire(dt, screen)
-        if keyboard.is_key_down(GLUT_KEY_LEFT):
+        if keyboard.is_key_down(KEY_LEFT):
             self.shape.rotate(self.TURN_RATE * dt)
-        if keyboard.is_key_down(GLUT_KEY_RIGHT):
+        if keyboard.is_key_down(KEY_RIGHT):
             self.shape.rotate(-self.TURN_RATE * dt)
-        if keyboard.is_key_down(GLUT_KEY_UP):
+        if keyboard.is_key_down(KEY_UP):
             self.dx += -sin(radians(self.yaw)) * self.THRUST_RATE
             self.dy += cos(radians(self.yaw)) * self.THRUST_RATE
 
             # Thruster Particles
-            for i in range(2):
+            for i in range(screen.detail.scale_emission(2)):
                 theta = self.yaw + random.uniform(-10, 10)
-                x = sin(radians(theta))*0.03 + self.x - self.dx*dt
-                y = -cos(radians(theta))*0.03 + self.y - self.dy*dt
+                x = sin(radians(theta))*0.03 + self.x
+                y = -cos(radians(theta))*0.03 + self.y
                 dx = sin(radians(theta))*0.18 + self.dx
                 dy = -cos(radians(theta))*0.18 + self.dy
                 particle = ParticleEntity(x, y, dx, dy, (0.5, 0, 0))
@@ -153,25 +216,32 @@ class PlayerEntity(Entity):
         self.dy -= cos(radians(self.yaw)) * self.RECOIL_RATE
 
     def draw(self):
-        glColor(0, 1, 0)
+        GL.glColor(*self.color)
         self.shape.draw()
 
-    def on_collision(self, other, point, dt, screen):
-        if isinstance(other, AsteroidEntity):
-            screen.remove_entity(self)
-            particles = ParticleEntity.create_from_entity(self, (0, 1, 0), 20)
-            screen.add_entities(particles)
-            self.cooldown = 0
+    def hit_asteroid(self, other, point, dt, screen):
+        screen.remove_entity(self)
+        n_particles = screen.detail.scale_emission(20)
+        particles = ParticleEntity.create_from_entity(self, (0, 1, 0), n_particles)
+        screen.add_entities(particles)
+        self.cooldown = 0
 
 
 class AsteroidEntity(Entity):
-
-    def __init__(self, size=1, x=None, y=None, dx=None, dy=None, dyaw=None, polygon=None):
+    __slots__ = ("size", "fracture")
+    ballistic = True
+    layer = LAYER_ASTEROID
+    mask = LAYER_PLAYER | LAYER_BULLET
+    CIRCLE_SIZE = 0.25  # Smaller fragments try their inner circle first
+
+    def __init__(self, size=1, x=None, y=None, dx=None, dy=None, dyaw=None, polygon=None,
+                 fracture=None):
         super().__init__()
-        self.dx = dx if dx is not None else random.uniform(-0.2, 0.2)
-        self.dy = dy if dy is not None else random.uniform(-0.2, 0.2)
-        self.dyaw = dyaw if dyaw is not None else random.uniform(-2, 2)
+        dx = dx if dx is not None else random.uniform(-0.2, 0.2)
+        dy = dy if dy is not None else random.uniform(-0.2, 0.2)
+        dyaw = dyaw if dyaw is not None else random.uniform(-2, 2)
         self.size = size
+        self.fracture = fracture  # Of `polygon`, or made on first use
 
         scale = size*0.05
         if polygon is None:
@@ -195,58 +265,85 @@ class AsteroidEntity(Entity):
         x = random.uniform(-1, 1) if x is None else x
         y = random.uniform(-1, 1) if y is None else y
         self.shape.translate(x, y)
+        self.shape.circle = size < self.CIRCLE_SIZE
+        self.dx = dx
+        self.dy = dy
+        self.dyaw = dyaw
 
     def draw(self):
-        glColor(1, 1, 1)
+        GL.glColor(*self.color)
         self.shape.draw()
 
-    def update(self, dt, keyboard, screen):
-        self.shape.translate(self.dx * dt, self.dy * dt)
-        self.shape.rotate(self.dyaw)
+    def hit_by_bullet(self, other, point, dt, screen):
+        self.shatter(other, screen)
+        other.owner.add_score(25 / self.size)
 
-    def on_collision(self, other, point, dt, screen):
-        if isinstance(other, (PlayerEntity, BulletEntity)):
-            screen.remove_entity(self)
-            screen.add_entities(self.split(other))
-            if isinstance(other, BulletEntity):
-                other.owner.add_score(25 / self.size)
-            elif isinstance(other, PlayerEntity):
-                other.add_score(25 / self.size)
+    def hit_by_player(self, other, point, dt, screen):
+        self.shatter(other, screen)
+        other.add_score(25 / self.size)
+
+    def shatter(self, other, screen):
+        screen.remove_entity(self)
+        screen.add_entities(self.split(other, screen.detail.scale_emission(10)))
 
-    def split(self, entity):
+    def split(self, entity, n_particles=10):
 
         if self.size < 0.25:
-            return ParticleEntity.create_from_entity(self, (1, 1, 1))
+            return ParticleEntity.create_from_entity(self, (1, 1, 1), n_particles)
 
-        poly1, poly2 = self.shape.split(
-            #(self.x, self.y),
-            #(random.uniform(-0.1, 0.1), random.uniform(-0.1, 0.1))
-        )
-        if poly1 is None or poly2 is None:
+        pieces = self.get_fracture().pieces
+        if not pieces:
             return []
 
-        d_impulse = poly1.center - self.shape.center
-        d_impulse /= sqrt(d_impulse[0]**2 + d_impulse[1]**2)
-        d_impulse *= 0.1
+        # Pieces are placed in the asteroid's unrotated frame
+        yaw = self.shape.yaw
+        theta = radians(yaw)
+        offsets = [
+            (x*cos(theta) - y*sin(theta), x*sin(theta) + y*cos(theta))
+            for x, y, area, piece in pieces
+        ]
+
+        d_impulse = offsets[0]
+        scale = 0.1 / sqrt(d_impulse[0]**2 + d_impulse[1]**2)
+        d_impulse = (d_impulse[0] * scale, d_impulse[1] * scale)
         dx1 = d_impulse[0] + self.dx
         dy1 = d_impulse[1] + self.dy
         dx2 = -d_impulse[0] + self.dx
         dy2 = -d_impulse[1] + self.dy
         dyaw1 = self.dyaw
         dyaw2 = -self.dyaw
-        a1 = AsteroidEntity(self.size / 2, 0, 0, dx1, dy1, dyaw1, poly1)
-        a2 = AsteroidEntity(self.size / 2, 0, 0, dx2, dy2, dyaw2, poly2)
+        velocities = ((dx1, dy1, dyaw1), (dx2, dy2, dyaw2))
 
         entities = []
         MIN_AREA = 0.001
-        for a in (a1, a2):
-            if a.shape.area >= MIN_AREA:
-                entities.append(a)
+        for (x, y, area, piece), offset, velocity in zip(pieces, offsets, velocities):
+            if area < MIN_AREA:
+                continue
+            polygon = shapes.PolygonShape.from_local(
+                piece.raw_points, self.x + offset[0], self.y + offset[1], yaw
+            )
+            entities.append(AsteroidEntity(self.size / 2, 0, 0, *velocity, polygon, piece))
 
         return entities
 
+    def prepare_split(self):
+        """Work out every split this asteroid can go through, ahead of hits."""
+        depth, size = 0, self.size
+        while size >= 0.25:
+            depth += 1
+            size /= 2
+        self.get_fracture().prepare(depth)
+
+    def get_fracture(self):
+        if self.fracture is None:
+            self.fracture = fracture.Fracture(self.shape.raw_points)
+        return self.fracture
+
 
 class ParticleEntity(Entity):
+    __slots__ = ("color",)
+    layer = LAYER_PARTICLE
+    mask = LAYER_ASTEROID | LAYER_PLAYER
 
     @classmethod
     def create_from_entity(cls, entity, color, number=10):
@@ -267,7 +364,6 @@ class ParticleEntity(Entity):
         self.color = color
 
     def update(self, dt, keyboard, screen):
-        self.shape.translate(self.dx * dt, self.dy * dt)
         self.color = (
             max(0, self.color[0] - 0.4*dt),
             max(0, self.color[1] - 0.4*dt),
@@ -277,9 +373,37 @@ class ParticleEntity(Entity):
             screen.remove_entity(self)
 
     def draw(self):
-        glColor(*self.color)
+        GL.glColor(*self.color)
         self.shape.draw()
 
-    def on_collision(self, other, point, dt, screen):
-        if isinstance(other, (AsteroidEntity, PlayerEntity)):
-            screen.remove_entity(self)
+    def hit_solid(self, other, point, dt, screen):
+        screen.remove_entity(self)
+
+
+# (type of entity, type of entity it collided with) -> handler. Subclasses
+# use the entry of their nearest base classes, see collision_handler().
+COLLISION_HANDLERS = {
+    (PlayerEntity, AsteroidEntity): PlayerEntity.hit_asteroid,
+    (BulletEntity, AsteroidEntity): BulletEntity.hit_asteroid,
+    (AsteroidEntity, PlayerEntity): AsteroidEntity.hit_by_player,
+    (AsteroidEntity, BulletEntity): AsteroidEntity.hit_by_bullet,
+    (ParticleEntity, AsteroidEntity): ParticleEntity.hit_solid,
+    (ParticleEntity, PlayerEntity): ParticleEntity.hit_solid,
+}
+
+_resolved_handlers = {}
+
+def collision_handler(type1, type2):
+    """
+    The handler for an entity of `type1` colliding with one of `type2`, or
+    None. Resolved once per pair of types, then looked up.
+    """
+    key = (type1, type2)
+    if key not in _resolved_handlers:
+        _resolved_handlers[key] = next((
+            COLLISION_HANDLERS[base1, base2]
+            for base1 in type1.__mro__
+            for base2 in type2.__mro__
+            if (base1, base2) in COLLISION_HANDLERS
+        ), None)
+    return _resolved_handlers[key]
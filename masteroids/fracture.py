@@ -0,0 +1,51 @@
+"""
+Asteroid splits worked out once, in local space, ahead of any hits.
+
+How a polygon splits depends only on its centered vertexes (`raw_points`)
+once the split is done in the polygon's own frame, before rotating and
+placing it. So each asteroid holds a `Fracture` for its shape, whose pieces
+hold the `Fracture` of each half in turn, down to the smallest fragments.
+Splitting an asteroid that was hit is then placing its fracture's pieces at
+the asteroid's pose, and each fragment takes its piece's fracture along.
+
+The tree is only referenced by the asteroids it was made for, so it goes
+away with them, at the end of a level or game.
+"""
+
+from masteroids.shapes import PolygonShape
+
+
+class Fracture():
+    """
+    The split of one polygon, given by its centered vertexes.
+
+    `pieces` is a tuple of `(x, y, area, fracture)` for each half, where
+    (x, y) is the half's center in the unrotated frame of this polygon, or
+    empty if the polygon can't be split.
+    """
+    __slots__ = ("raw_points", "_pieces")
+
+    def __init__(self, raw_points):
+        self.raw_points = raw_points
+        self._pieces = None
+
+    @property
+    def pieces(self):
+        if self._pieces is None:
+            shape = PolygonShape.from_local(self.raw_points, 0, 0)
+            poly1, poly2 = shape.split()
+            if poly1 is None or poly2 is None:
+                self._pieces = ()
+            else:
+                self._pieces = tuple(
+                    (poly.x, poly.y, poly.area, Fracture(poly.raw_points))
+                    for poly in (poly1, poly2)
+                )
+        return self._pieces
+
+    def prepare(self, depth):
+        """Work out the splits `depth` levels down, ahead of any hits."""
+        if depth > 0:
+            for x, y, area, fracture in self.pieces:
+                fracture.prepare(depth - 1)
+
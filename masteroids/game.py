@@ -1,13 +1,21 @@
 import sys
-
-from OpenGL.GL import *
+from time import perf_counter
 
 from masteroids import screens
 from masteroids import entities
+from masteroids import snapshot
+from masteroids.detail import DetailController
 
 class Game():
+    """
+    `gc_control` is a `gccontrol.GCController`, which is told when levels
+    start and after every update and times collections, or None to leave
+    the collector alone. Pass it on to the next game along with `detail`.
+    """
 
-    def __init__(self):
+    def __init__(self, detail=None, gc_control=None):
+        self.detail = detail if detail is not None else DetailController()
+        self.gc_control = gc_control
         self.player = None
         self.current_screen = None
         self._init_title_screen()
@@ -15,11 +23,13 @@ class Game():
     def _init_title_screen(self):
         self.level_number = 0
         self.player = entities.PlayerEntity()
-        self.starting_asteroids = [entities.AsteroidEntity() for i in range(3)]
-        self.current_screen = screens.TitleScreen(self.starting_asteroids)
+        self.current_screen = screens.TitleScreen(None, self.detail)
 
     def update(self, dt, keyboard):
+        start = perf_counter()
         result = self.current_screen.update(dt, keyboard)
+        gc_pause = self.gc_control.take_pause_time() if self.gc_control is not None else 0
+        self.detail.record_update(perf_counter() - start, gc_pause)
 
         if isinstance(result, screens.Screen):
             self.current_screen = result
@@ -28,13 +38,19 @@ class Game():
             self._init_title_screen()
 
         elif result == "next_level":
+            # The title screen's asteroids carry over into the first level
+            carried_asteroids = None
+            if isinstance(self.current_screen, screens.TitleScreen):
+                carried_asteroids = self.current_screen.entities
             self.level_number += 1
             self.current_screen = screens.GameplayScreen(
                 self.player,
                 self.level_number,
-                self.starting_asteroids
+                carried_asteroids,
+                self.detail
             )
-            self.starting_asteroids = None
+            if self.gc_control is not None:
+                self.gc_control.level_started()
 
         elif result == "reset_game":
             return True
@@ -45,5 +61,25 @@ class Game():
         elif result is not None:
             raise RuntimeError('Invalid result "{}" returned from a screen object.'.format(result))
 
+        if self.gc_control is not None:
+            self.gc_control.after_update(self.current_screen)
+
+    def snapshot(self, particles=True):
+        """
+        Return the full game state as a flat `array('d')`, which can be
+        passed to `restore()` later, or converted with `.tobytes()`.
+
+        This includes the current screen, entities, player, timers and the
+        state of the `random` module. Pass `particles=False` to leave out
+        particles, which are purely cosmetic.
+        """
+        return snapshot.pack_game(self, particles)
+
+    def restore(self, state):
+        """Return to the state from a previous `snapshot()`."""
+        snapshot.unpack_game(self, state)
+
     def draw(self):
+        start = perf_counter()
         self.current_screen.draw()
+        self.detail.record_draw(perf_counter() - start)
@@ -0,0 +1,98 @@
+"""
+Garbage collector pauses: timing them, and keeping them out of gameplay.
+
+A `GCController` times every collection from when it is made until
+`close()`, and its `take_pause_time()` gives the seconds spent collecting
+since it was last called. `Game` records that with each frame.
+
+An explosion allocates a burst of particles, fragments and tuples, which
+can set off a collection of the oldest generation in the middle of play.
+Those look at every object the game has, so they are the longest pauses. A
+`GCController` with `freeze=True` keeps them for when nothing is going on:
+
+ * After each level is set up, everything alive is moved out of the
+   collector's reach with `gc.freeze()`, so later collections don't keep
+   looking at the screen, the player and the precomputed fractures.
+ * Oldest generation collections are never started automatically. Once
+   one is due, it runs on the next update of a quiet screen (see
+   `Screen.is_quiet()`), such as while waiting to respawn, or on the title
+   screen. Younger generations are still collected as usual.
+ * If none comes for MAX_DEFERRED times longer than normal, one is forced
+   anyway, so games with no breaks don't grow without limit.
+"""
+
+import gc
+from time import perf_counter
+
+
+class GCController():
+    """
+    Defers the collector's longest pauses to natural breaks in the game, as
+    described above, if `freeze` is set. Otherwise it only counts.
+
+    The collector's thresholds are process wide, so only one controller
+    should freeze at a time. `close()` puts them back and stops timing.
+    """
+    MAX_DEFERRED = 50  # Times the normal gap between oldest generation collections
+    DEFERRED_THRESHOLD = 1 << 30  # Never reached
+
+    def __init__(self, freeze=False):
+        self.freeze = freeze
+        self.threshold = gc.get_threshold()
+        self.full_collections = 0  # At breaks and level starts
+        self.forced_collections = 0  # In play, after MAX_DEFERRED
+        self.pause_start = None
+        self.pause_time = 0
+        self._callback = self._time_pause
+        gc.callbacks.append(self._callback)
+        if freeze:
+            t0, t1, t2 = self.threshold
+            gc.set_threshold(t0, t1, self.DEFERRED_THRESHOLD)
+
+    def close(self):
+        if self._callback in gc.callbacks:
+            gc.callbacks.remove(self._callback)
+        if self.freeze:
+            gc.set_threshold(*self.threshold)
+            gc.unfreeze()
+            self.freeze = False
+
+    def _time_pause(self, phase, info):
+        if phase == "start":
+            self.pause_start = perf_counter()
+        elif self.pause_start is not None:
+            self.pause_time += perf_counter() - self.pause_start
+            self.pause_start = None
+
+    def take_pause_time(self):
+        """Seconds spent collecting garbage since the last call."""
+        seconds, self.pause_time = self.pause_time, 0
+        return seconds
+
+    def level_started(self):
+        """Collect everything, then freeze what's left. Call after setup."""
+        if not self.freeze:
+            return
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+        self.full_collections += 1
+
+    def after_update(self, screen):
+        """Run an oldest generation collection if one is due and it's time."""
+        if not self.freeze:
+            return
+        owed = gc.get_count()[2]
+        if owed <= self.threshold[2]:
+            return
+        if screen.is_quiet():
+            gc.collect()
+            self.full_collections += 1
+        elif owed > self.threshold[2] * self.MAX_DEFERRED:
+            gc.collect()
+            self.forced_collections += 1
+
+    def describe(self):
+        return "{} full collections at breaks, {} forced, {} objects frozen".format(
+            self.full_collections, self.forced_collections, gc.get_freeze_count()
+        )
@@ -0,0 +1,29 @@
+"""
+Lazily imported PyOpenGL namespaces.
+
+Importing `OpenGL.GL` takes a large part of a second, which every headless
+worker would pay without ever drawing. Modules use these stand-ins instead,
+e.g. `GL.glBegin(GL.GL_LINES)`, and the real module is imported the first
+time any name is looked up on it.
+"""
+
+import importlib
+
+
+class LazyModule():
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        # Only called for names not found normally. After the first lookup
+        # the module's namespace is copied in, so this isn't called again.
+        module = importlib.import_module(self._name)
+        for key, value in vars(module).items():
+            if not key.startswith("__"):
+                self.__dict__[key] = value
+        return getattr(module, attr)
+
+
+GL = LazyModule("OpenGL.GL")
+GLUT = LazyModule("OpenGL.GLUT")
@@ -0,0 +1,195 @@
+"""
+Collision tests scheduled by predicted time of impact, for big sparse fields.
+
+Between collisions, entities move in straight lines at constant velocity
+(see kinematics.py), so the time two bounding circles first touch can be
+solved for directly. `ImpactScheduler` keeps a heap of those times, and each
+update only tests the pairs whose time has come, with `check_collision` as
+usual. A pair whose circles still overlap after the test is due again the
+next update, so it is tested every update that `EntityScreen` would test it
+and gives the same contacts.
+
+Predictions only look HORIZON seconds ahead. An entity is predicted against
+all others it can collide with when it is added, whenever its velocity or
+radius changes (thrust, recoil) and every HORIZON seconds after that, so
+each pair is always covered by its entities' latest predictions. Pairs
+predicted with a velocity that has since changed are dropped when they come
+up. Entities are assumed to only move by their velocity while on the
+screen; one that jumps should be removed and added again.
+
+    screen.collision_backend = ImpactScheduler()
+"""
+
+import heapq
+from itertools import count
+
+import numpy
+
+from masteroids.shapes import X, Y, DX, DY
+
+
+class _Motion():
+    """What an entity's latest prediction was made with."""
+    __slots__ = ("version", "dx", "dy", "radius")
+
+    def __init__(self, version, dx, dy, radius):
+        self.version = version
+        self.dx = dx
+        self.dy = dy
+        self.radius = radius
+
+
+class ImpactScheduler():
+    HORIZON = 0.5  # Seconds ahead to predict
+    MARGIN = 1e-6  # Added to every radius, to stay conservative despite rounding
+
+    def __init__(self):
+        self.motions = {}  # Entity -> _Motion
+        # (time, sequence, e1, e2, version1, version2), e2 None for an
+        # entity's next prediction
+        self.events = []
+        self.sequence = count()  # Orders events, and numbers versions
+        # (e1, e2) -> (time, version1, version2) of the pair's earliest event
+        self.scheduled = {}
+        self.predictions = 0  # Entities predicted against all others
+        self.tests = 0
+
+    def find_contacts(self, entities, time):
+        """
+        Return `(e1, e2, point)` for each colliding pair in `entities`, in
+        the order of `itertools.combinations(entities, 2)`. `time` is the
+        time the entities have been moved to, in seconds.
+        """
+        n_entities = len(entities)
+        if n_entities == 0:
+            self.motions.clear()
+            return []
+
+        index = {entity: i for i, entity in enumerate(entities)}
+        rows = [entity.shape.row for entity in entities]
+        state = entities[0].shape.kinematics.values[rows]
+        radii = numpy.array([entity.shape.radius for entity in entities])
+        layers = numpy.array([entity.layer for entity in entities])
+        masks = numpy.array([entity.mask for entity in entities])
+        columns = (state, radii, layers, masks)
+
+        # New, moved on from their prediction, or gone
+        motions = self.motions
+        changed = []
+        for i, (dx, dy, radius) in enumerate(zip(
+            state[:, DX].tolist(), state[:, DY].tolist(), radii.tolist()
+        )):
+            motion = motions.get(entities[i])
+            if motion is None:
+                motions[entities[i]] = _Motion(next(self.sequence), dx, dy, radius)
+                changed.append(i)
+            elif motion.dx != dx or motion.dy != dy or motion.radius != radius:
+                motion.version = next(self.sequence)
+                motion.dx, motion.dy, motion.radius = dx, dy, radius
+                changed.append(i)
+        if len(motions) > n_entities:
+            for entity in [e for e in motions if e not in index]:
+                del motions[entity]
+        for i in changed:
+            self._predict_entity(entities, i, time, columns)
+
+        # Due pairs, by index. Predictions made while popping can be due
+        # right away, so they are popped in the same loop.
+        due = set()
+        events = self.events
+        while events and events[0][0] <= time:
+            t, _, e1, e2, version1, version2 = heapq.heappop(events)
+            if e2 is None:
+                motion = motions.get(e1)
+                if motion is not None and motion.version == version1:
+                    self._predict_entity(entities, index[e1], time, columns)
+                continue
+            if self.scheduled.get((e1, e2)) != (t, version1, version2):
+                continue  # Superseded by an earlier event
+            del self.scheduled[e1, e2]
+            motion1, motion2 = motions.get(e1), motions.get(e2)
+            if motion1 is None or motion2 is None or \
+                    motion1.version != version1 or motion2.version != version2:
+                continue
+            i, j = index[e1], index[e2]
+            due.add((i, j) if i < j else (j, i))
+
+        contacts = []
+        for i, j in sorted(due):
+            self.tests += 1
+            e1, e2 = entities[i], entities[j]
+            point = e1.shape.check_collision(e2.shape)
+            if point:
+                contacts.append((e1, e2, point))
+            # Overlapping circles are due again next update
+            t = self._impact_times(i, numpy.array([j]), columns)[0]
+            if t <= self.HORIZON:
+                self._schedule(e1, e2, time + t)
+        return contacts
+
+    def _predict_entity(self, entities, i, time, columns):
+        """Schedule entity `i`'s impacts with the others, and its next prediction."""
+        self.predictions += 1
+        entity = entities[i]
+        state, radii, layers, masks = columns
+        others = numpy.flatnonzero((layers[i] & masks) | (layers & masks[i]))
+        others = others[others != i]
+        if len(others):
+            times = self._impact_times(i, others, columns)
+            soon = numpy.flatnonzero(times <= self.HORIZON)
+            for j, t in zip(others[soon].tolist(), times[soon].tolist()):
+                self._schedule(entity, entities[j], time + t)
+
+        motion = self.motions[entity]
+        heapq.heappush(self.events, (
+            time + self.HORIZON, next(self.sequence), entity, None, motion.version, 0
+        ))
+
+    def _schedule(self, e1, e2, time):
+        if id(e1) > id(e2):
+            e1, e2 = e2, e1
+        event = (time, self.motions[e1].version, self.motions[e2].version)
+        scheduled = self.scheduled.get((e1, e2))
+        if scheduled is not None and scheduled[1:] == event[1:] and scheduled[0] <= time:
+            return  # Already due then or sooner
+        self.scheduled[e1, e2] = event
+        heapq.heappush(self.events, (time, next(self.sequence), e1, e2) + event[1:])
+
+    def _impact_times(self, i, others, columns):
+        """
+        Seconds until the bounding circle of entity `i` first touches that of
+        each of `others`, 0 if they already overlap, or infinity if not within
+        HORIZON seconds.
+        """
+        state, radii, layers, masks = columns
+        # Nearest copy of each, then the other copies it could reach in time
+        position = (state[others, X:Y+1] - state[i, X:Y+1] + 1) % 2 - 1
+        velocity = state[others, DX:DY+1] - state[i, DX:DY+1]
+        reach = radii[others] + radii[i] + self.MARGIN
+        speeds_squared = (velocity**2).sum(axis=1)
+        farthest = 1 + reach.max() + numpy.sqrt(speeds_squared.max())*self.HORIZON
+        n = int(numpy.ceil(farthest / 2))
+        offsets = numpy.arange(-n, n+1) * 2.0
+        copies = numpy.stack(
+            [axis.ravel() for axis in numpy.meshgrid(offsets, offsets)], axis=1
+        )
+        relative = position[:, numpy.newaxis, :] + copies
+
+        # Smallest t with |relative + velocity*t| = reach
+        a = speeds_squared[:, numpy.newaxis]
+        b = 2*(relative * velocity[:, numpy.newaxis, :]).sum(axis=2)
+        c = (relative**2).sum(axis=2) - (reach**2)[:, numpy.newaxis]
+        discriminant = b*b - 4*a*c
+        approaching = (b < 0) & (discriminant >= 0)
+        t = numpy.full(c.shape, numpy.inf)
+        t[approaching] = (-b[approaching] - numpy.sqrt(discriminant[approaching])) / \
+            (2*numpy.broadcast_to(a, c.shape)[approaching])
+        t[c <= 0] = 0
+        t = t.min(axis=1)
+        t[t > self.HORIZON] = numpy.inf
+        return t
+
+    def describe(self):
+        return "{} predictions, {} pairs tested, {} events queued".format(
+            self.predictions, self.tests, len(self.events)
+        )
@@ -1,53 +1,137 @@
-
-from collections import defaultdict
+from array import array
 from time import time
 
+# Same values as GLUT_KEY_*, so special keys from GLUT callbacks can be
+# checked without importing GLUT.
+KEY_LEFT = 100
+KEY_UP = 101
+KEY_RIGHT = 102
+KEY_DOWN = 103
+
+# Bits for AgentInputState.set_actions()
+ACTION_THRUST = 1
+ACTION_LEFT = 2
+ACTION_RIGHT = 4
+ACTION_FIRE = 8
+ACTION_KEYS = (
+    (ACTION_THRUST, KEY_UP),
+    (ACTION_LEFT, KEY_LEFT),
+    (ACTION_RIGHT, KEY_RIGHT),
+    (ACTION_FIRE, b' '),
+)
+
+# Single byte keys use slots 0-255, special (int) keys use 256 onward.
+N_KEY_SLOTS = 512
+
+def key_slot(key):
+    if isinstance(key, bytes):
+        return key[0]
+    return 256 + key
+
+
 class InputState():
+    """
+    Keyboard state, fed by key up/down callbacks.
 
-    def __init__(self):
-        self._key_time = defaultdict(lambda: -1)
-        self._key_just_pressed = defaultdict(lambda: False)
-        self._key_repeat_last_time = {}
+    State is kept in fixed size arrays indexed by `key_slot()`, so nothing is
+    allocated per frame. `tick()` must be called once after each update.
+    """
+
+    def __init__(self, clock=time):
+        self.clock = clock
+        self._key_time = array('d', [-1]) * N_KEY_SLOTS
+        self._key_repeat_last_time = array('d', [0]) * N_KEY_SLOTS
+        self._key_just_pressed = bytearray(N_KEY_SLOTS)
+        self._just_pressed_slots = []
+        self._all_keys_up = array('d', [-1]) * N_KEY_SLOTS
+
+    def before_update(self, game):
+        """
+        Called by whatever steps `game`, just before each update. Keys come
+        from callbacks, so this does nothing here. See autopilot.py.
+        """
+        pass
 
-    def tick(self):
-        self._key_just_pressed = defaultdict(lambda: False)
+    def tick(self, dt=None):
+        for slot in self._just_pressed_slots:
+            self._key_just_pressed[slot] = 0
+        del self._just_pressed_slots[:]
 
     def all_keys_up(self):
-        self._key_time = defaultdict(lambda: -1)
+        self._key_time[:] = self._all_keys_up
 
     def key_down(self, key, x=None, y=None):
-        t = time()
-        self._key_time[key] = t
-        self._key_just_pressed[key] = True
-        self._key_repeat_last_time[key] = t
+        slot = key_slot(key)
+        t = self.clock()
+        self._key_time[slot] = t
+        if not self._key_just_pressed[slot]:
+            self._key_just_pressed[slot] = 1
+            self._just_pressed_slots.append(slot)
+        self._key_repeat_last_time[slot] = t
 
     def key_just_pressed(self, key, repeat=None):
-        if self._key_just_pressed[key]:
+        slot = key_slot(key)
+        if self._key_just_pressed[slot]:
             return True
 
-        if repeat is not None and self.is_key_down(key):
-            if time() - self._key_repeat_last_time[key] >= repeat:
-                self._key_repeat_last_time[key] += repeat
+        if repeat is not None and self._key_time[slot] != -1:
+            if self.clock() - self._key_repeat_last_time[slot] >= repeat:
+                self._key_repeat_last_time[slot] += repeat
                 return True
 
         return False
 
-
     def key_up(self, key, x=None, y=None):
-        self._key_time[key] = -1
-        del self._key_repeat_last_time[key]
+        self._key_time[key_slot(key)] = -1
 
     def is_key_down(self, key):
-        return self._key_time[key] != -1
+        return self._key_time[key_slot(key)] != -1
 
     def any_key_just_pressed(self):
-        for value in self._key_just_pressed.values():
-            if value:
-                return True
-        return False
+        return len(self._just_pressed_slots) > 0
 
     def key_down_duration(self, key):
-        down_timestamp = self._key_time[key]
-        if down_timestamp <= 0:
+        down_timestamp = self._key_time[key_slot(key)]
+        if down_timestamp == -1:
             return 0
-        return time() - down_timestamp
+        return self.clock() - down_timestamp
+
+
+class AgentInputState(InputState):
+    """
+    Input for bots and scripted drivers, with no keyboard or GLUT involved.
+
+    Each tick, the driver sets a bitmask of ACTION_* flags with
+    `set_actions()` before the update, then calls `tick(dt)` after it. Bits
+    are translated to presses and releases of the keys the screens already
+    check. The clock only advances by the `dt` passed to `tick()`, so key
+    repeat works the same however fast the game is stepped.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        super().__init__(clock=self._sim_clock)
+        self.actions = 0
+
+    def _sim_clock(self):
+        return self.now
+
+    def set_actions(self, actions):
+        changed = actions ^ self.actions
+        if changed:
+            for bit, key in ACTION_KEYS:
+                if changed & bit:
+                    if actions & bit:
+                        self.key_down(key)
+                    else:
+                        self.key_up(key)
+        self.actions = actions
+
+    def all_keys_up(self):
+        super().all_keys_up()
+        self.actions = 0
+
+    def tick(self, dt=None):
+        super().tick()
+        if dt:
+            self.now += dt
@@ -1,4 +1,5 @@
 
+import sys
 from time import time
 
 from OpenGL.GL import *
@@ -6,16 +7,142 @@ from OpenGL.GLUT import *
 
 from masteroids.game import Game
 from masteroids.inputstate import InputState
+from masteroids.render import SnapshotBuffer, SimulationThread
+from masteroids.scene import Scene
+from masteroids.screens import EntityScreen, GameplayScreen, DisplayList
+
+
+def init_gl():
+    glClearColor(0.0, 0.0, 0.0, 0.0)
+    glPointSize(2)
+    glDisable(GL_DITHER)
+    glDisable(GL_MULTISAMPLE)
+
+def render(game, win_width, win_height, flip_y=False, hud_list=None):
+    """
+    Draw one frame of `game` into the current framebuffer.
+
+    `flip_y` draws upside down, which makes pixels read back with
+    `glReadPixels` come out top row first. `hud_list` is a `DisplayList`
+    made for the current GL context, see `draw_static_hud()`.
+    """
+    begin_frame(win_width, win_height, flip_y)
+    game.draw()
+    screen = game.current_screen
+    if hasattr(screen, "hud_state"):
+        draw_static_hud(screen.hud_state(), hud_list)
+
+def render_snapshot(snapshot, win_width, win_height, flip_y=False, hud_list=None):
+    """Like `render()`, for a `render.RenderSnapshot` (or None)."""
+    begin_frame(win_width, win_height, flip_y)
+    if snapshot is not None:
+        snapshot.draw()
+        if snapshot.hud is not None:
+            draw_static_hud(snapshot.hud, hud_list)
+
+def draw_static_hud(hud_state, hud_list=None):
+    """
+    Draw the gameplay HUD for `hud_state` (see `GameplayScreen.hud_state()`).
+
+    With a `hud_list`, the HUD is only rebuilt when `hud_state` changes, and
+    replayed from the list otherwise. Display lists belong to the GL context
+    they were made in, so each context needs its own.
+    """
+    def draw():
+        scene = Scene()
+        GameplayScreen.build_static_hud(scene, *hud_state)
+        scene.draw()
+    if hud_list is None:
+        draw()
+    else:
+        hud_list.draw(hud_state, draw)
+
+def begin_frame(win_width, win_height, flip_y=False):
+
+    # Default projection matrix puts the screen bounds at -1 to 1.
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
+    if flip_y:
+        glScalef(1, -1, 1)
+
+    glClear(GL_COLOR_BUFFER_BIT)
+
+    draw_bounding_box(win_width, win_height)
+
+def draw_bounding_box(win_width, win_height):
+    #TODO: Only draw lines that aren't at the edge of the screen (ex: if
+    #      width > height, draw only vertical lines to the left and right.
+    if win_width > win_height:
+        glColor3f(0.2, 0.2, 0.2)
+        glBegin(GL_LINES)
+        glVertex2f(-1.0, -1.0)
+        glVertex2f(-1.0,  1.0)
+        glVertex2f( 1.0, -1.0)
+        glVertex2f( 1.0,  1.0)
+        glEnd()
+    elif win_width < win_height:
+        glColor3f(0.2, 0.2, 0.2)
+        glBegin(GL_LINES)
+        glVertex2f(-1.0, -1.0)
+        glVertex2f( 1.0, -1.0)
+        glVertex2f(-1.0,  1.0)
+        glVertex2f( 1.0,  1.0)
+        glEnd()
+
+def set_viewport(win_width, win_height):
+    """Fit the square -1 to 1 play area, centered, into the window."""
+    if win_width > win_height:
+        width = win_height
+        height = win_height
+        x = (win_width - win_height) / 2
+        y = 0
+    else:
+        width = win_width
+        height = win_width
+        x = 0
+        y = (win_height - win_width) / 2
+    glViewport(int(x), int(y), width, height)
 
 
 class GameInterface():
+    """
+    The game in a GLUT window.
 
-    def __init__(self):
-        self.game = Game()
-        self.keyboard = InputState()
+    With `threaded`, the game is updated on a `render.SimulationThread` and
+    the window only draws the snapshots it publishes. Otherwise updates and
+    draws take turns on the GLUT thread. `print_stats` prints snapshot
+    latency, garbage collector pauses and the current screen's collision
+    test counts to stderr once a second. `keyboard` replaces the window's
+    own input, e.g. with an `autopilot.Autopilot`. `gc_control` is passed on
+    to the game, see gccontrol.py.
+
+    The game pauses while the window is hidden or fully covered, and when P
+    is pressed. While paused, nothing is updated or redrawn, and the timers
+    only fire every PAUSED_INTERVAL to check on things. Time spent paused
+    doesn't count toward the next update's `dt`.
+    """
+    STATS_INTERVAL = 1  # Seconds
+    PAUSED_INTERVAL = 250  # Milliseconds
+    PAUSE_KEYS = (b'p', b'P')  # With or without shift or caps lock
+
+    def __init__(self, threaded=True, print_stats=False, keyboard=None, gc_control=None):
+        self.game = Game(gc_control=gc_control)
+        self.keyboard = keyboard if keyboard is not None else InputState()
         self.last_update_time = None
+        self.shown_detail_level = 0
         self.win_width = 700
         self.win_height = 700
+        self.paused = False  # By the player
+        self.hidden = False
+        self.hud_list = DisplayList()
+
+        self.threaded = threaded
+        self.print_stats = print_stats
+        self.last_stats_time = time()
+        self.snapshots = SnapshotBuffer()
+        self.simulation = None
+        if threaded:
+            self.simulation = SimulationThread(self.game, self.keyboard, self.snapshots)
 
         # GLUT init
         glutInit(sys.argv)
@@ -25,91 +152,131 @@ class GameInterface():
         glutCreateWindow(b"Masteroids")
         glutSetCursor(GLUT_CURSOR_NONE)
 
-        # GL init
-        glClearColor(0.0, 0.0, 0.0, 0.0)
-        glPointSize(2)
-        glDisable(GL_DITHER)
-        glDisable(GL_MULTISAMPLE)
+        init_gl()
 
         # Callbacks
         glutDisplayFunc(self.draw)
         glutReshapeFunc(self.reshape)
-        glutTimerFunc(0, self.update, None)
+        if threaded:
+            glutTimerFunc(0, self.poll_simulation, None)
+        else:
+            glutTimerFunc(0, self.update, None)
         glutIgnoreKeyRepeat(1)
-        glutKeyboardFunc(self.keyboard.key_down)
-        glutKeyboardUpFunc(self.keyboard.key_up)
-        glutSpecialFunc(self.keyboard.key_down)
-        glutSpecialUpFunc(self.keyboard.key_up)
+        glutKeyboardFunc(self.key_down)
+        glutKeyboardUpFunc(self.key_up)
+        glutSpecialFunc(self.key_down)
+        glutSpecialUpFunc(self.key_up)
         glutWindowStatusFunc(self.on_window_status)
 
     def draw(self):
-
-        # Default projection matrix puts the screen bounds at -1 to 1.
-        glMatrixMode(GL_PROJECTION)
-        glLoadIdentity()
-
-        glClear(GL_COLOR_BUFFER_BIT)
-
-        self.draw_bounding_box()
-        self.game.draw()
-
+        if self.threaded:
+            snapshot = self.snapshots.take()
+            render_snapshot(snapshot, self.win_width, self.win_height,
+                            hud_list=self.hud_list)
+        else:
+            render(self.game, self.win_width, self.win_height, hud_list=self.hud_list)
+        if self.paused:
+            scene = Scene()
+            scene.add_text("PAUSED", (-0.4, 0))
+            scene.draw()
         glFlush()
         glutSwapBuffers()
 
-    def draw_bounding_box(self):
-        #TODO: Only draw lines that aren't at the edge of the screen (ex: if
-        #      width > height, draw only vertical lines to the left and right.
-        if self.win_width > self.win_height:
-            glColor3f(0.2, 0.2, 0.2)
-            glBegin(GL_LINES)
-            glVertex2f(-1.0, -1.0)
-            glVertex2f(-1.0,  1.0)
-            glVertex2f( 1.0, -1.0)
-            glVertex2f( 1.0,  1.0)
-            glEnd()
-        elif self.win_width < self.win_height:
-            glColor3f(0.2, 0.2, 0.2)
-            glBegin(GL_LINES)
-            glVertex2f(-1.0, -1.0)
-            glVertex2f( 1.0, -1.0)
-            glVertex2f(-1.0,  1.0)
-            glVertex2f( 1.0,  1.0)
-            glEnd()
-
     def reshape(self, win_width, win_height):
         self.win_width = win_width
         self.win_height = win_height
-        if win_width > win_height:
-            width = win_height
-            height = win_height
-            x = (win_width - win_height) / 2
-            y = 0
-        else:
-            width = win_width
-            height = win_width
-            x = 0
-            y = (win_height - win_width) / 2
-        glViewport(int(x), int(y), width, height)
+        set_viewport(win_width, win_height)
+
+    def is_paused(self):
+        return self.paused or self.hidden
+
+    def set_paused(self, paused=None, hidden=None):
+        if paused is not None:
+            self.paused = paused
+        if hidden is not None:
+            self.hidden = hidden
+        if self.simulation is not None:
+            if self.is_paused():
+                self.simulation.pause()
+            else:
+                self.simulation.resume()
+        if self.paused and not self.hidden:
+            glutPostRedisplay()  # To show that it's paused
 
     def update(self, data=None):
+        if self.is_paused():
+            glutTimerFunc(self.PAUSED_INTERVAL, self.update, None)
+            self.last_update_time = None  # So resuming doesn't catch up
+            return
         glutTimerFunc(20, self.update, None)
         t = time()
         if self.last_update_time:
             dt = t - self.last_update_time
         else:
             dt = 0
+        self.keyboard.before_update(self.game)
         game_finished = self.game.update(dt, self.keyboard)
         if game_finished:
-            self.game = Game()
+            self.game = Game(self.game.detail, self.game.gc_control)
         self.last_update_time = t
 
-        self.keyboard.tick()
+        self.update_title()
+        self.keyboard.tick(dt)
         glutPostRedisplay()
 
+    def poll_simulation(self, data=None):
+        """Redraw whenever the simulation thread has published a frame."""
+        if not self.simulation.is_alive():
+            sys.exit(self.simulation.exit_status)
+        if self.is_paused():
+            glutTimerFunc(self.PAUSED_INTERVAL, self.poll_simulation, None)
+            return
+        glutTimerFunc(5, self.poll_simulation, None)
+        self.game = self.simulation.game
+        self.update_title()
+        if self.snapshots.has_new():
+            glutPostRedisplay()
+
+        if self.print_stats and time() - self.last_stats_time >= self.STATS_INTERVAL:
+            self.last_stats_time = time()
+            print(self.snapshots.describe(), file=sys.stderr)
+            print(self.game.detail.describe_gc_pauses(), file=sys.stderr)
+            screen = self.game.current_screen
+            if isinstance(screen, EntityScreen):
+                print(screen.describe_collisions(), file=sys.stderr)
+
+    def update_title(self):
+        if self.game.detail.level != self.shown_detail_level:
+            self.shown_detail_level = self.game.detail.level
+            title = "Masteroids - {}".format(self.game.detail.describe())
+            glutSetWindowTitle(title.encode())
+
+    # Keyboard callbacks, which may run alongside the simulation thread
+
+    def send_input(self, method, *args):
+        """Call `keyboard.<method>(*args)`, on the simulation thread if there is one."""
+        if self.simulation is not None:
+            self.simulation.send_input(method, *args)
+        else:
+            getattr(self.keyboard, method)(*args)
+
+    def key_down(self, *args):
+        if args[0] in self.PAUSE_KEYS:
+            self.send_input("all_keys_up")
+            self.set_paused(paused=not self.paused)
+            return
+        self.send_input("key_down", *args)
+
+    def key_up(self, *args):
+        self.send_input("key_up", *args)
+
     def on_window_status(self, status):
-        self.keyboard.all_keys_up()
+        self.send_input("all_keys_up")
+        self.set_paused(hidden=status in (GLUT_HIDDEN, GLUT_FULLY_COVERED))
 
     def main_loop(self):
+        if self.simulation is not None:
+            self.simulation.start()
         glutMainLoop()
 
 if __name__ == "__main__":
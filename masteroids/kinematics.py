@@ -0,0 +1,86 @@
+"""
+Shared storage for the motion of every entity on a screen.
+
+Each shape's kinematic state is a row of `[x, y, yaw, dx, dy, dyaw]` (see
+the column numbers in `shapes.py`). A shape that isn't on a screen keeps its
+row in a plain list. Adding it to a screen's `Kinematics` moves the row into
+one array shared with all the other shapes, and the shape keeps a view of
+that row, so reading `shape.x` or setting `entity.dx` works the same either
+way. Once per update, `integrate()` moves, wraps and spins every shape with
+a few array operations, leaving only behaviour such as input, firing and
+lifetimes to the entities' own `update` methods.
+"""
+
+import numpy
+
+from masteroids.shapes import STATE_SIZE, X, Y, YAW, DX, DY, DYAW
+
+
+class Kinematics():
+
+    def __init__(self, capacity=64):
+        self.values = numpy.zeros((capacity, STATE_SIZE))
+        self.shapes = []  # Shape in each used row
+
+        # Incremented by each integrate(), so shapes can tell when cached
+        # values computed from their row are stale.
+        self.generation = 0
+
+    def __len__(self):
+        return len(self.shapes)
+
+    def add(self, shape):
+        if shape.kinematics is self:
+            return
+        if shape.kinematics is not None:
+            shape.kinematics.remove(shape)
+
+        row = len(self.shapes)
+        if row == len(self.values):
+            self._grow()
+        self.values[row] = shape.state
+        self.shapes.append(shape)
+        shape.kinematics = self
+        shape.row = row
+        shape.state = self.values[row]
+
+    def remove(self, shape):
+        """Move `shape`'s row back into the shape, freeing it for others."""
+        if shape.kinematics is not self:
+            return
+        row = shape.row
+        shape.state = shape.state.tolist()
+        shape.kinematics = None
+        shape.row = None
+
+        # Fill the hole with the last row
+        last = self.shapes.pop()
+        if last is not shape:
+            self.values[row] = self.values[len(self.shapes)]
+            self.shapes[row] = last
+            last.row = row
+            last.state = self.values[row]
+
+    def _grow(self):
+        values = numpy.zeros((2*len(self.values), STATE_SIZE))
+        values[:len(self.values)] = self.values
+        self.values = values
+        for row, shape in enumerate(self.shapes):
+            shape.state = values[row]
+
+    def integrate(self, dt):
+        """Move every shape by its velocity and spin it by its `dyaw`."""
+        values = self.values[:len(self.shapes)]
+        positions = values[:, X:Y+1]
+        positions += values[:, DX:DY+1] * dt
+        # Wrap around the -1 to 1 playfield
+        positions += 1
+        numpy.remainder(positions, 2, out=positions)
+        positions -= 1
+
+        # dyaw is in degrees per update, not per second
+        yaws = values[:, YAW]
+        yaws += values[:, DYAW]
+        numpy.remainder(yaws, 360, out=yaws)
+
+        self.generation += 1
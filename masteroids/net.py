@@ -0,0 +1,531 @@
+"""
+Server-authoritative multiplayer over UDP.
+
+The server owns the only simulation (a `screens.MultiplayerScreen`). Clients
+send their `inputstate.ACTION_*` bits each tick along with the sequence
+number of the newest snapshot they have received. The server replies with a
+snapshot encoded as a delta against the client's last acknowledged snapshot:
+only entities that appeared, disappeared, or whose quantized position or yaw
+changed are sent. A lost packet just means the next delta is taken against an
+older acknowledged snapshot.
+
+Each snapshot is limited to `MAX_PACKET_SIZE` bytes, so bandwidth per client
+stays flat however many asteroids there are. When not every change fits,
+the entities whose baseline state is oldest go first, so none goes stale
+for longer than it takes to cycle through all of them.
+
+The server keeps one view per client, its acknowledged baseline, and
+updates it in place. Every snapshot is a delta against that baseline, and
+acknowledging any of them moves the baseline to it, so the server never
+copies a whole view.
+
+Messages (all little endian):
+    client -> server
+        JOIN        b"J"
+        INPUT       b"I", actions (uint8), acked snapshot seq (uint32)
+        LEAVE       b"L"
+    server -> client
+        WELCOME     b"W", id of the client's player entity (uint32)
+        SNAPSHOT    b"S", seq (uint32), baseline seq (uint32), server tick
+                    (uint32), then counts (3 x uint16) and records of removed
+                    ids, spawned entities and updated entities.
+"""
+
+import random
+import socket
+import struct
+from time import time, sleep, perf_counter
+from collections import OrderedDict
+from math import atan2, degrees
+
+from masteroids import entities
+from masteroids.shapes import PolygonShape
+from masteroids.screens import MultiplayerScreen
+from masteroids.detail import DetailController
+from masteroids.inputstate import InputState, AgentInputState, \
+    ACTION_THRUST, ACTION_LEFT, ACTION_RIGHT, ACTION_FIRE
+
+MAX_PACKET_SIZE = 1200
+HISTORY_SIZE = 32  # Snapshots a client keeps to decode deltas against
+CLIENT_TIMEOUT = 5  # Seconds without input before a client is dropped
+
+KIND_PLAYER = 0
+KIND_ASTEROID = 1
+KIND_BULLET = 2
+
+INPUT = struct.Struct("<cBI")
+WELCOME = struct.Struct("<cI")
+SNAPSHOT_HEADER = struct.Struct("<cIIIHHH")
+REMOVED_RECORD = struct.Struct("<I")
+SPAWN_RECORD = struct.Struct("<IBHHHB")  # id, kind, x, y, yaw, n vertices
+VERTEX_RECORD = struct.Struct("<hh")
+UPDATE_RECORD = struct.Struct("<IHHH")  # id, x, y, yaw
+
+LOCAL_RANGE = 0.5  # Largest vertex offset from an entity's center that fits
+
+
+def quantize_position(value):
+    return int((value + 1) * 32768) & 0xFFFF
+
+def dequantize_position(q):
+    return q / 32768 - 1
+
+def quantize_yaw(yaw):
+    return int(yaw % 360 * 65536 / 360) & 0xFFFF
+
+def dequantize_yaw(q):
+    return q * 360 / 65536
+
+def quantize_local(value):
+    return max(-32767, min(32767, int(round(value * 32767 / LOCAL_RANGE))))
+
+def dequantize_local(q):
+    return q * LOCAL_RANGE / 32767
+
+
+def entity_kind(entity):
+    if isinstance(entity, entities.PlayerEntity):
+        return KIND_PLAYER
+    elif isinstance(entity, entities.AsteroidEntity):
+        return KIND_ASTEROID
+    elif isinstance(entity, entities.BulletEntity):
+        return KIND_BULLET
+    return None
+
+def entity_state(entity):
+    """Quantized (x, y, yaw), the part of an entity that deltas compare."""
+    return (
+        quantize_position(entity.x),
+        quantize_position(entity.y),
+        quantize_yaw(getattr(entity.shape, "yaw", 0)),
+    )
+
+def entity_vertexes(entity):
+    """Quantized vertexes relative to the center, sent once on spawn."""
+    if not isinstance(entity.shape, PolygonShape):
+        return ()
+    return tuple(
+        (quantize_local(x), quantize_local(y))
+        for x, y in entity.shape.local_points()
+    )
+
+
+class ClientConnection():
+
+    def __init__(self, address, player, controls):
+        self.address = address
+        self.player = player
+        self.controls = controls
+        self.last_heard = time()
+
+        # {entity id: (kind, vertexes, state, server tick it was sent)}, the
+        # client's view of the world after decoding snapshot `baseline_seq`
+        self.baseline = {}
+        self.baseline_seq = 0  # 0 is the empty view
+        self.baseline_sent = 0  # Value of `n_sent` when it was sent
+        self.n_sent = 0
+        # seq -> (n_sent, [(entity id, view entry, or None if removed)]) for
+        # each snapshot sent against the current baseline
+        self.pending = {}
+
+    def acknowledge(self, seq):
+        """Make snapshot `seq` the baseline, if it was sent against the current one."""
+        pending = self.pending.get(seq)
+        if pending is None:
+            return  # Sent against an older baseline
+        self.baseline_sent, records = pending
+        for entity_id, entry in records:
+            if entry is None:
+                del self.baseline[entity_id]
+            else:
+                self.baseline[entity_id] = entry
+        self.baseline_seq = seq
+        self.pending.clear()
+
+    def reset(self):
+        """Start over from the empty view, which the client always has."""
+        self.baseline = {}
+        self.baseline_seq = 0
+        self.baseline_sent = self.n_sent
+        self.pending.clear()
+
+
+class GameServer():
+    """
+    Runs a `MultiplayerScreen` and serves it to clients over UDP.
+
+    `tick()` does one step: read client packets, update the simulation by a
+    fixed `1/tick_rate`, and send each client its snapshot. `serve()` calls
+    it in real time.
+    """
+
+    def __init__(self, address=("127.0.0.1", 0), tick_rate=30, detail=None):
+        self.tick_rate = tick_rate
+        if detail is None:
+            detail = DetailController(adaptive=False)
+        self.screen = MultiplayerScreen(detail)
+        self.keyboard = InputState()
+        self.clients = {}  # address -> ClientConnection
+        self.tick_count = 0
+        self.seq = 0
+
+        self._entity_ids = {}
+        self._next_entity_id = 1
+
+        self.bytes_sent = 0
+        self.packets_sent = 0
+        self.tick_time = 0
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(address)
+        self.socket.setblocking(False)
+        self.address = self.socket.getsockname()
+
+    def close(self):
+        self.socket.close()
+
+    def serve(self, duration=None):
+        start = time()
+        next_tick = start
+        while duration is None or time() - start < duration:
+            self.tick()
+            next_tick += 1 / self.tick_rate
+            sleep(max(0, next_tick - time()))
+
+    def tick(self):
+        start = perf_counter()
+        self._receive()
+        self._drop_idle_clients()
+
+        dt = 1 / self.tick_rate
+        self.screen.update(dt, self.keyboard)
+        for client in self.clients.values():
+            client.controls.tick(dt)
+
+        world = self._world_state()
+        for client in self.clients.values():
+            self._send_snapshot(client, world)
+        self.tick_count += 1
+        self.tick_time = perf_counter() - start
+
+    def _receive(self):
+        while True:
+            try:
+                data, address = self.socket.recvfrom(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionResetError:
+                continue  # ICMP unreachable from a departed client
+            if not data:
+                continue
+            message_type = data[:1]
+            client = self.clients.get(address)
+            if message_type == b"J":
+                if client is None:
+                    client = self._add_client(address)
+                self._send(WELCOME.pack(b"W", self._entity_id(client.player)), address)
+            elif message_type == b"I" and client and len(data) == INPUT.size:
+                _, actions, ack = INPUT.unpack(data)
+                client.controls.set_actions(actions)
+                client.acknowledge(ack)
+                client.last_heard = time()
+            elif message_type == b"L" and client:
+                self._remove_client(client)
+
+    def _add_client(self, address):
+        controls = AgentInputState()
+        player = self.screen.add_player(controls)
+        client = ClientConnection(address, player, controls)
+        self.clients[address] = client
+        return client
+
+    def _remove_client(self, client):
+        self.screen.remove_player(client.player)
+        del self.clients[client.address]
+
+    def _drop_idle_clients(self):
+        now = time()
+        for client in list(self.clients.values()):
+            if now - client.last_heard > CLIENT_TIMEOUT:
+                self._remove_client(client)
+
+    def _entity_id(self, entity):
+        entity_id = self._entity_ids.get(entity)
+        if entity_id is None:
+            entity_id = self._next_entity_id
+            self._next_entity_id += 1
+            self._entity_ids[entity] = entity_id
+        return entity_id
+
+    def _world_state(self):
+        """Return {entity id: (entity, kind, state)} for networked entities."""
+        world = {}
+        for entity in self.screen.entities:
+            kind = entity_kind(entity)
+            if kind is not None:
+                world[self._entity_id(entity)] = (entity, kind, entity_state(entity))
+
+        # Forget ids of entities that are gone, except players who may respawn
+        players = set(self.screen.players)
+        for entity in list(self._entity_ids):
+            if entity not in players and self._entity_ids[entity] not in world:
+                del self._entity_ids[entity]
+        return world
+
+    def _send_snapshot(self, client, world):
+        self.seq += 1
+        client.n_sent += 1
+        if client.baseline_seq and client.n_sent - client.baseline_sent >= HISTORY_SIZE:
+            client.reset()  # The client will have dropped the baseline by now
+        baseline = client.baseline
+
+        removed = [entity_id for entity_id in baseline if entity_id not in world]
+        spawned = []
+        updated = []  # (tick of the baseline state, entity id)
+        for entity_id, (entity, kind, state) in world.items():
+            known = baseline.get(entity_id)
+            if known is None:
+                spawned.append(entity_id)
+            elif known[2] != state:
+                updated.append((known[3], entity_id))
+
+        budget = MAX_PACKET_SIZE - SNAPSHOT_HEADER.size
+        parts = []
+        records = []
+        n_removed = n_spawned = n_updated = 0
+        for entity_id in removed:
+            if budget < REMOVED_RECORD.size:
+                break
+            parts.append(REMOVED_RECORD.pack(entity_id))
+            budget -= REMOVED_RECORD.size
+            records.append((entity_id, None))
+            n_removed += 1
+        for entity_id in spawned:
+            entity, kind, state = world[entity_id]
+            vertexes = entity_vertexes(entity)
+            size = SPAWN_RECORD.size + VERTEX_RECORD.size * len(vertexes)
+            if budget < size:
+                break
+            parts.append(SPAWN_RECORD.pack(entity_id, kind, state[0], state[1], state[2], len(vertexes)))
+            for vertex in vertexes:
+                parts.append(VERTEX_RECORD.pack(*vertex))
+            budget -= size
+            records.append((entity_id, (kind, vertexes, state, self.tick_count)))
+            n_spawned += 1
+
+        # The stalest in the baseline, if not all fit
+        n_fit = budget // UPDATE_RECORD.size
+        if len(updated) > n_fit:
+            updated.sort()
+            del updated[n_fit:]
+        for tick, entity_id in updated:
+            entity, kind, state = world[entity_id]
+            parts.append(UPDATE_RECORD.pack(entity_id, state[0], state[1], state[2]))
+            records.append((entity_id, (kind, baseline[entity_id][1], state, self.tick_count)))
+            n_updated += 1
+
+        header = SNAPSHOT_HEADER.pack(b"S", self.seq, client.baseline_seq, self.tick_count,
+                                      n_removed, n_spawned, n_updated)
+        self._send(header + b"".join(parts), client.address)
+        client.pending[self.seq] = (client.n_sent, records)
+
+    def _send(self, data, address):
+        try:
+            self.socket.sendto(data, address)
+        except OSError:
+            return
+        self.bytes_sent += len(data)
+        self.packets_sent += 1
+
+
+class NetEntity():
+    """
+    A client's decoded view of one server entity, as of server tick `tick`.
+    """
+
+    def __init__(self, kind, vertexes, state, tick=0):
+        self.kind = kind
+        self.points = tuple(
+            (dequantize_local(x), dequantize_local(y)) for x, y in vertexes
+        )
+        self.set_state(state, tick)
+
+    def set_state(self, state, tick=0):
+        self.state = state
+        self.tick = tick
+        self.x = dequantize_position(state[0])
+        self.y = dequantize_position(state[1])
+        self.yaw = dequantize_yaw(state[2])
+
+
+class GameClient():
+    """
+    Client side of the protocol: joins, sends actions, decodes snapshots.
+
+    `self.entities` is {entity id: NetEntity} as of the newest snapshot, and
+    `self.player_id` is the id of this client's own ship.
+    """
+
+    def __init__(self, server_address):
+        self.server_address = server_address
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(("", 0))
+        self.socket.setblocking(False)
+        self.player_id = None
+        self.latest_seq = 0
+        self.history = OrderedDict()  # seq -> {entity id: NetEntity}
+        self.entities = {}
+        self.bytes_received = 0
+        self.snapshots_received = 0
+        self.snapshots_dropped = 0
+
+    def close(self):
+        try:
+            self.socket.sendto(b"L", self.server_address)
+        except OSError:
+            pass
+        self.socket.close()
+
+    def join(self):
+        self.socket.sendto(b"J", self.server_address)
+
+    def send_actions(self, actions):
+        if self.player_id is None:
+            self.join()
+        else:
+            self.socket.sendto(INPUT.pack(b"I", actions, self.latest_seq), self.server_address)
+
+    def receive(self):
+        """Process every packet that has arrived."""
+        while True:
+            try:
+                data = self.socket.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionResetError:
+                continue
+            self.bytes_received += len(data)
+            if data[:1] == b"W":
+                self.player_id = WELCOME.unpack(data)[1]
+            elif data[:1] == b"S":
+                self._decode_snapshot(data)
+
+    def _decode_snapshot(self, data):
+        _, seq, baseline_seq, server_tick, n_removed, n_spawned, n_updated = \
+            SNAPSHOT_HEADER.unpack_from(data)
+        if seq <= self.latest_seq or \
+                (baseline_seq != 0 and baseline_seq not in self.history):
+            self.snapshots_dropped += 1
+            return
+
+        view = dict(self.history.get(baseline_seq, {}))
+        offset = SNAPSHOT_HEADER.size
+        for i in range(n_removed):
+            entity_id, = REMOVED_RECORD.unpack_from(data, offset)
+            offset += REMOVED_RECORD.size
+            view.pop(entity_id, None)
+        for i in range(n_spawned):
+            entity_id, kind, qx, qy, qyaw, n_vertexes = SPAWN_RECORD.unpack_from(data, offset)
+            offset += SPAWN_RECORD.size
+            vertexes = []
+            for j in range(n_vertexes):
+                vertexes.append(VERTEX_RECORD.unpack_from(data, offset))
+                offset += VERTEX_RECORD.size
+            view[entity_id] = NetEntity(kind, vertexes, (qx, qy, qyaw), server_tick)
+        for i in range(n_updated):
+            entity_id, qx, qy, qyaw = UPDATE_RECORD.unpack_from(data, offset)
+            offset += UPDATE_RECORD.size
+            known = view[entity_id]
+            entity = NetEntity.__new__(NetEntity)
+            entity.kind = known.kind
+            entity.points = known.points
+            entity.set_state((qx, qy, qyaw), server_tick)
+            view[entity_id] = entity
+
+        self.history[seq] = view
+        while len(self.history) > HISTORY_SIZE:
+            self.history.popitem(last=False)
+        self.latest_seq = seq
+        self.entities = view
+        self.snapshots_received += 1
+
+
+class BotClient(GameClient):
+    """
+    A client that plays by itself: it turns toward the nearest asteroid and
+    fires, with seeded random thrusting and wobble so bots behave differently.
+    """
+
+    def __init__(self, server_address, seed=None):
+        super().__init__(server_address)
+        self.random = random.Random(seed)
+
+    def step(self):
+        self.receive()
+        self.send_actions(self.choose_actions())
+
+    def choose_actions(self):
+        me = self.entities.get(self.player_id)
+        if me is None:
+            return 0
+
+        nearest = None
+        nearest_dist = float("inf")
+        for entity in self.entities.values():
+            if entity.kind != KIND_ASTEROID:
+                continue
+            dx = (entity.x - me.x + 1) % 2 - 1
+            dy = (entity.y - me.y + 1) % 2 - 1
+            dist = dx*dx + dy*dy
+            if dist < nearest_dist:
+                nearest, nearest_dist = (dx, dy), dist
+
+        actions = ACTION_FIRE
+        if nearest is not None:
+            # Yaw 0 points up (+y), increasing counterclockwise
+            target_yaw = degrees(atan2(-nearest[0], nearest[1]))
+            error = (target_yaw - me.yaw + 180) % 360 - 180
+            error += self.random.uniform(-20, 20)
+            if error > 5:
+                actions |= ACTION_LEFT
+            elif error < -5:
+                actions |= ACTION_RIGHT
+        if self.random.random() < 0.1:
+            actions |= ACTION_THRUST
+        return actions
+
+
+def run_loopback(n_bots=2, ticks=300, n_asteroids=None, seed=0):
+    """
+    Run a server and bot clients over loopback in lockstep, as fast as
+    possible, and return per-tick averages.
+    """
+    random.seed(seed)
+    server = GameServer()
+    if n_asteroids is not None:
+        server.screen.add_entities(
+            [entities.AsteroidEntity() for i in range(n_asteroids)]
+        )
+    bots = [BotClient(server.address, seed+i) for i in range(n_bots)]
+    tick_time = 0
+    try:
+        for i in range(ticks):
+            for bot in bots:
+                bot.step()
+            server.tick()
+            tick_time += server.tick_time
+        for bot in bots:
+            bot.receive()
+    finally:
+        for bot in bots:
+            bot.close()
+        server.close()
+
+    return {
+        "bytes_per_client_tick": server.bytes_sent / max(1, ticks * n_bots),
+        "server_tick_ms": tick_time / ticks * 1000,
+        "snapshots_received": sum(bot.snapshots_received for bot in bots),
+        "snapshots_dropped": sum(bot.snapshots_dropped for bot in bots),
+        "level": server.screen.level,
+        "scores": [player.score for player in server.screen.players],
+    }
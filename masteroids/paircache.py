@@ -0,0 +1,100 @@
+"""
+Skips collision tests between entities that can't have reached each other.
+
+Most pairs on a screen are far apart and drift slowly. When a pair of
+ballistic entities (ones whose velocity never changes, see
+`Entity.ballistic`) misses, the gap between their bounding circles and their
+combined speed give a time before which they can't possibly touch, and the
+pair isn't tested again until then.
+
+Only pairs closer than MAX_GAP are remembered, so the cache grows with the
+number of entities near each other rather than with every pair on the
+screen. Pairs farther apart are tested each update, which their bounding
+circles reject quickly.
+"""
+
+from math import sqrt
+
+
+class PairCache():
+    # Subtracted from every gap, to stay conservative despite rounding
+    MARGIN = 1e-6
+    MAX_GAP = 0.5  # Pairs farther apart than this aren't remembered
+
+    def __init__(self):
+        # Entity -> {later entity in the screen's list: time of next test}
+        self.next_test = {}
+        # Entity -> earlier entities with it in their next_test, if any
+        self.earlier = {}
+        self.tests = 0
+        self.skipped = 0
+
+    def __len__(self):
+        """Number of pairs remembered."""
+        return sum(len(pairs) for pairs in self.next_test.values())
+
+    def add(self, entity):
+        if entity.ballistic:
+            self.next_test[entity] = {}
+
+    def forget(self, entity):
+        """Drop all pairs with `entity`, which was removed or split."""
+        pairs = self.next_test.pop(entity, None)
+        if pairs is None:
+            return
+        for later in pairs:
+            self._unlink(entity, later)
+        for earlier in self.earlier.pop(entity, ()):
+            del self.next_test[earlier][entity]
+
+    def should_test(self, e1, e2, time):
+        pairs = self.next_test.get(e1)
+        if pairs is not None and pairs.get(e2, time) > time:
+            self.skipped += 1
+            return False
+        self.tests += 1
+        return True
+
+    def record_miss(self, e1, e2, time):
+        """Remember that the pair didn't collide at `time`."""
+        pairs = self.next_test.get(e1)
+        if pairs is None or e2 not in self.next_test:
+            return
+
+        s1, s2 = e1.shape, e2.shape
+        # Closest distance between centers, with the playfield wrapping
+        dx = (s1.x - s2.x + 1) % 2 - 1
+        dy = (s1.y - s2.y + 1) % 2 - 1
+        gap = sqrt(dx*dx + dy*dy) - s1.radius - s2.radius - self.MARGIN
+        if gap <= 0 or gap > self.MAX_GAP:
+            if pairs.pop(e2, None) is not None:
+                self._unlink(e1, e2)
+            return
+
+        speed = sqrt(e1.dx**2 + e1.dy**2) + sqrt(e2.dx**2 + e2.dy**2)
+        if speed == 0:
+            pairs[e2] = float("inf")
+        else:
+            pairs[e2] = time + gap / speed
+        self.earlier.setdefault(e2, set()).add(e1)
+
+    def _unlink(self, e1, e2):
+        """Drop `e1` from `e2`'s earlier entities."""
+        earlier = self.earlier[e2]
+        earlier.discard(e1)
+        if not earlier:
+            del self.earlier[e2]
+
+    @property
+    def hit_rate(self):
+        total = self.tests + self.skipped
+        return self.skipped / total if total else 0
+
+    def reset_stats(self):
+        self.tests = 0
+        self.skipped = 0
+
+    def describe(self):
+        return "pair cache {:.1f}% hits ({} tests, {} skipped)".format(
+            self.hit_rate*100, self.tests, self.skipped
+        )
@@ -0,0 +1,185 @@
+"""
+Collision tests spread over a pool of processes, for very large screens.
+
+The playfield is cut into vertical strips, one task each. Every entity
+belongs to the strip its center is in, and a task also sees the entities up
+to `margin` past the right edge of its strip, wrapping around. The margin is
+twice the largest radius, so any pair close enough to touch is tested by
+the task owning its left entity. Within a strip, pairs are found by
+sweeping along y.
+
+Each update, the position, yaw, vertexes and collision layers of every
+entity are written to shared memory. The tasks leave out pairs whose layers
+don't interact, build their own shapes for the rest and test them with
+`check_collision`, so they give the same answers the main process would,
+and the contacts are merged in the order `EntityScreen` tests pairs.
+
+    screen.collision_backend = CollisionPool()
+    ...
+    screen.collision_backend.close()
+"""
+
+import os
+import multiprocessing
+from array import array
+
+import numpy
+
+from masteroids.shapes import PolygonShape, PointShape
+
+# Columns of the shared entity table. Points have no vertexes.
+X, Y, YAW, RADIUS, CIRCLE, VERTEX_START, VERTEX_COUNT, LAYER, MASK = range(9)
+N_COLUMNS = 9
+
+# Set in each worker by _init_worker()
+_table = None
+_vertexes = None
+
+
+class CollisionPool():
+    """
+    Finds colliding pairs with `processes` workers, `strips` tasks per
+    update. The shared buffers start big enough for `capacity` entities of
+    8 vertexes, and the pool is restarted with bigger ones when needed.
+    """
+
+    def __init__(self, processes=None, strips=None, capacity=4096):
+        self.processes = processes or os.cpu_count()
+        self.strips = strips or self.processes
+        self.pool = None
+        self._start(capacity, capacity*16)
+
+    def _start(self, table_capacity, vertex_capacity):
+        self.close()
+        self.table_capacity = table_capacity
+        self.vertex_capacity = vertex_capacity
+        self.raw_table = multiprocessing.RawArray('d', table_capacity*N_COLUMNS)
+        self.raw_vertexes = multiprocessing.RawArray('d', vertex_capacity)
+        self.pool = multiprocessing.Pool(
+            self.processes, _init_worker, (self.raw_table, self.raw_vertexes)
+        )
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def find_contacts(self, entities, time=None):
+        """
+        Return `(e1, e2, point)` for each colliding pair in `entities`, in
+        the order of `itertools.combinations(entities, 2)`. Every pair is
+        looked at each time, so `time` isn't needed.
+        """
+        n_entities = len(entities)
+        if n_entities < 2:
+            return []
+
+        rows = []
+        vertexes = array('d')
+        for entity in entities:
+            shape = entity.shape
+            if isinstance(shape, PolygonShape):
+                rows.append((
+                    shape.x, shape.y, shape.yaw, shape.radius, shape.circle,
+                    len(vertexes), len(shape.raw_points),
+                    entity.layer, entity.mask
+                ))
+                vertexes.extend(shape.raw_points)
+            else:
+                rows.append((shape.x, shape.y, 0, 0, 0, 0, 0, entity.layer, entity.mask))
+
+        if n_entities > self.table_capacity or len(vertexes) > self.vertex_capacity:
+            self._start(
+                max(n_entities, 2*self.table_capacity),
+                max(len(vertexes), 2*self.vertex_capacity)
+            )
+        table = numpy.frombuffer(self.raw_table, dtype=numpy.float64)
+        table = table.reshape(-1, N_COLUMNS)
+        table[:n_entities] = rows
+        numpy.frombuffer(self.raw_vertexes, dtype=numpy.float64)[:len(vertexes)] = vertexes
+
+        margin = 2*float(table[:n_entities, RADIUS].max())
+        tasks = [
+            (strip, self.strips, n_entities, margin)
+            for strip in range(self.strips)
+        ]
+        # With few strips, a pair can be near enough to the edges to be seen
+        # by two of them
+        contacts = {}
+        for strip_contacts in self.pool.map(_strip_contacts, tasks):
+            for i, j, point in strip_contacts:
+                contacts[i, j] = point
+        return [
+            (entities[i], entities[j], contacts[i, j])
+            for i, j in sorted(contacts)
+        ]
+
+
+def _init_worker(raw_table, raw_vertexes):
+    global _table, _vertexes
+    _table = numpy.frombuffer(raw_table, dtype=numpy.float64).reshape(-1, N_COLUMNS)
+    _vertexes = numpy.frombuffer(raw_vertexes, dtype=numpy.float64)
+
+def _make_shape(row):
+    x, y, yaw, radius, circle, start, count, layer, mask = row.tolist()
+    if not count:
+        return PointShape(x, y)
+    start, count = int(start), int(count)
+    shape = PolygonShape.from_local(array('d', _vertexes[start:start+count]), x, y, yaw)
+    shape.circle = bool(circle)
+    return shape
+
+def _strip_contacts(task):
+    """Contacts as `(i, j, point)`, i < j, for pairs owned by one strip."""
+    strip, n_strips, n_entities, margin = task
+    table = _table[:n_entities]
+    width = 2 / n_strips
+    xs = table[:, X]
+    owned = numpy.minimum((xs + 1) // width, n_strips - 1) == strip
+    right = -1 + (strip + 1)*width
+    ghosts = ~owned & ((xs - right) % 2 < margin)
+    in_strip = owned | ghosts
+
+    # Sweep along y, with copies of those near the bottom past the top
+    indexes = numpy.flatnonzero(in_strip)
+    ys = table[indexes, Y]
+    near_bottom = ys < -1 + margin
+    sweep_ys = numpy.concatenate((ys, ys[near_bottom] + 2))
+    sweep_indexes = numpy.concatenate((indexes, indexes[near_bottom]))
+    order = numpy.argsort(sweep_ys, kind="stable")
+    sweep_ys = sweep_ys[order].tolist()
+    sweep_indexes = sweep_indexes[order].tolist()
+    owned = owned.tolist()
+    layers = table[:, LAYER].astype(numpy.int64).tolist()
+    masks = table[:, MASK].astype(numpy.int64).tolist()
+
+    pairs = set()
+    for a in range(len(sweep_ys)):
+        i, top = sweep_indexes[a], sweep_ys[a] + margin
+        for b in range(a+1, len(sweep_ys)):
+            if sweep_ys[b] > top:
+                break
+            j = sweep_indexes[b]
+            if i == j or not (owned[i] or owned[j]):
+                continue
+            if layers[i] & masks[j] or layers[j] & masks[i]:
+                pairs.add((i, j) if i < j else (j, i))
+
+    shapes = {}
+    contacts = []
+    for i, j in sorted(pairs):
+        if i not in shapes:
+            shapes[i] = _make_shape(table[i])
+        if j not in shapes:
+            shapes[j] = _make_shape(table[j])
+        point = shapes[i].check_collision(shapes[j])
+        if point:
+            contacts.append((i, j, point))
+    return contacts
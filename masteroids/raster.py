@@ -0,0 +1,93 @@
+"""
+Software rendering of screens into small NumPy images, without GL.
+
+Meant for pixel based agents running where there is no display. The picture
+is the same vector scene the GL draw methods make (see `scene.py`), drawn
+with one pass of vectorized line stepping per frame.
+"""
+
+import numpy
+
+from masteroids.scene import Scene, LINE_ROW_SIZE, POINT_ROW_SIZE
+
+# Weights to convert RGB colors to a single intensity
+LUMA = numpy.array((0.299, 0.587, 0.114))
+
+
+class Rasterizer():
+    """
+    Draws screens into a reused uint8 image.
+
+    The image is `(height, width)` when `grayscale`, otherwise
+    `(height, width, 3)`, with the top row first. The -1 to 1 playfield
+    fills the whole image.
+    """
+
+    def __init__(self, width=84, height=84, grayscale=True):
+        self.width = width
+        self.height = height
+        self.grayscale = grayscale
+        if grayscale:
+            self.frame = numpy.zeros((height, width), numpy.uint8)
+        else:
+            self.frame = numpy.zeros((height, width, 3), numpy.uint8)
+        self.scene = Scene()
+
+    def render(self, screen):
+        """Draw `screen` into `self.frame` and return it."""
+        self.scene.clear()
+        screen.build_scene(self.scene)
+        return self.render_scene(self.scene)
+
+    def render_scene(self, scene):
+        self.frame.fill(0)
+        if scene.lines:
+            lines = numpy.array(scene.lines).reshape(-1, LINE_ROW_SIZE)
+            self._draw_lines(lines)
+        if scene.points:
+            points = numpy.array(scene.points).reshape(-1, POINT_ROW_SIZE)
+            xs, ys = self._to_pixels(points[:, 0], points[:, 1])
+            self._plot(numpy.rint(xs).astype(int), numpy.rint(ys).astype(int),
+                       points[:, 2:5], numpy.zeros(len(points), bool))
+        return self.frame
+
+    def _to_pixels(self, x, y):
+        """Screen coordinates to (fractional) pixel coordinates."""
+        return (
+            (x + 1) * (self.width / 2) - 0.5,
+            (1 - y) * (self.height / 2) - 0.5,
+        )
+
+    def _draw_lines(self, lines):
+        x1, y1 = self._to_pixels(lines[:, 0], lines[:, 1])
+        x2, y2 = self._to_pixels(lines[:, 2], lines[:, 3])
+        dx = x2 - x1
+        dy = y2 - y1
+
+        # One sample per pixel along the major axis of each segment. Every
+        # sample of every segment is then computed in one go, with `segment`
+        # mapping each sample back to the segment it belongs to.
+        n_samples = numpy.ceil(numpy.maximum(abs(dx), abs(dy))).astype(int) + 1
+        segment = numpy.repeat(numpy.arange(len(lines)), n_samples)
+        first_sample = numpy.cumsum(n_samples) - n_samples
+        step = numpy.arange(len(segment)) - first_sample[segment]
+        t = step / numpy.maximum(n_samples - 1, 1)[segment]
+
+        xs = numpy.rint(x1[segment] + t*dx[segment]).astype(int)
+        ys = numpy.rint(y1[segment] + t*dy[segment]).astype(int)
+        self._plot(xs, ys, lines[segment, 4:7], lines[segment, 7] != 0)
+
+    def _plot(self, xs, ys, colors, wrap):
+        """Set pixels, wrapping the ones marked in `wrap` and clipping the rest."""
+        xs = numpy.where(wrap, xs % self.width, xs)
+        ys = numpy.where(wrap, ys % self.height, ys)
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        xs = xs[inside]
+        ys = ys[inside]
+        colors = colors[inside]
+
+        if self.grayscale:
+            values = colors.dot(LUMA)
+        else:
+            values = colors
+        self.frame[ys, xs] = numpy.clip(values * 255, 0, 255).astype(numpy.uint8)
@@ -0,0 +1,248 @@
+"""
+Running the simulation on its own thread, apart from drawing.
+
+The simulation thread updates the game on a fixed tick and, after each
+update, publishes a `RenderSnapshot`: the frame's scene as flat NumPy arrays
+of vertexes and colors, which are never changed once made. The GL thread
+only ever draws the latest published snapshot, so a slow update no longer
+holds up the next redraw, and the two can overlap wherever the simulation
+or the GL calls release the GIL.
+"""
+
+import threading
+from collections import deque
+from time import perf_counter, sleep
+
+import numpy
+
+from masteroids.game import Game
+from masteroids.gl import GL
+from masteroids.scene import Scene, LINE_ROW_SIZE, POINT_ROW_SIZE
+
+
+class RenderSnapshot():
+    """
+    Everything needed to draw one frame, in arrays ready for glDrawArrays.
+
+    Playfield lines, which are drawn again at each wraparound offset, come
+    before the rest in `line_vertexes` and `line_colors`. On gameplay
+    screens, the static HUD is left out of the arrays and `hud` holds the
+    values of `GameplayScreen.hud_state()` instead, for the GL thread to
+    draw from its display list (see `interface.render_snapshot()`).
+    """
+
+    def __init__(self, scene, hud=None, sequence=0):
+        lines = numpy.array(scene.lines, dtype=numpy.float32)
+        lines = lines.reshape(-1, LINE_ROW_SIZE)
+        lines = lines[numpy.argsort(lines[:, 7] == 0, kind="stable")]
+        self.n_lines = len(lines)
+        self.n_wrapped_lines = int(numpy.count_nonzero(lines[:, 7]))
+        self.line_vertexes = lines[:, 0:4].reshape(-1, 2).copy()
+        self.line_colors = numpy.repeat(lines[:, 4:7], 2, axis=0)
+
+        points = numpy.array(scene.points, dtype=numpy.float32)
+        points = points.reshape(-1, POINT_ROW_SIZE)
+        self.n_points = len(points)
+        self.point_vertexes = points[:, 0:2].copy()
+        self.point_colors = points[:, 2:5].copy()
+
+        for array in (self.line_vertexes, self.line_colors,
+                      self.point_vertexes, self.point_colors):
+            array.flags.writeable = False
+
+        self.hud = hud
+        self.sequence = sequence
+        self.created = perf_counter()
+
+    @classmethod
+    def from_game(cls, game, scene=None, sequence=0):
+        """Snapshot `game`'s current screen, building into `scene` if given."""
+        if scene is None:
+            scene = Scene()
+        scene.clear()
+        screen = game.current_screen
+        if hasattr(screen, "hud_state"):
+            screen.build_scene(scene, static_hud=False)
+            hud = screen.hud_state()
+        else:
+            screen.build_scene(scene)
+            hud = None
+        return cls(scene, hud, sequence)
+
+    def draw(self):
+        GL.glEnableClientState(GL.GL_VERTEX_ARRAY)
+        GL.glEnableClientState(GL.GL_COLOR_ARRAY)
+
+        if self.n_lines:
+            GL.glVertexPointer(2, GL.GL_FLOAT, 0, self.line_vertexes)
+            GL.glColorPointer(3, GL.GL_FLOAT, 0, self.line_colors)
+
+            # Playfield lines 9 times for the wraparound effect
+            if self.n_wrapped_lines:
+                GL.glMatrixMode(GL.GL_MODELVIEW)
+                for x in range(-2, 4, 2):
+                    for y in range(-2, 4, 2):
+                        GL.glPushMatrix()
+                        GL.glTranslate(x, y, 0)
+                        GL.glDrawArrays(GL.GL_LINES, 0, 2*self.n_wrapped_lines)
+                        GL.glPopMatrix()
+
+            n_other = self.n_lines - self.n_wrapped_lines
+            if n_other:
+                GL.glDrawArrays(GL.GL_LINES, 2*self.n_wrapped_lines, 2*n_other)
+
+        if self.n_points:
+            GL.glVertexPointer(2, GL.GL_FLOAT, 0, self.point_vertexes)
+            GL.glColorPointer(3, GL.GL_FLOAT, 0, self.point_colors)
+            GL.glDrawArrays(GL.GL_POINTS, 0, self.n_points)
+
+        GL.glDisableClientState(GL.GL_COLOR_ARRAY)
+        GL.glDisableClientState(GL.GL_VERTEX_ARRAY)
+
+
+class SnapshotBuffer():
+    """
+    The front (latest) and back (previous) snapshot, swapped on publish.
+
+    Snapshots are immutable, so a reader can keep drawing one after taking
+    it while the next is published. Also measures snapshot latency: the time
+    from a snapshot being published to it starting to be drawn.
+    """
+    WINDOW = 100  # Draws to keep latencies for
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.front = None
+        self.back = None
+
+        self.latencies = deque(maxlen=self.WINDOW)
+        self.published = 0
+        self.drawn = 0
+        self.last_drawn = None
+        self.skipped = 0  # Published but replaced before ever being drawn
+
+    def publish(self, snapshot):
+        with self.lock:
+            if self.front is not None and self.front is not self.last_drawn:
+                self.skipped += 1
+            self.back, self.front = self.front, snapshot
+            self.published += 1
+
+    def take(self):
+        """Return the latest snapshot, recording its latency, or None."""
+        with self.lock:
+            snapshot = self.front
+            if snapshot is None or snapshot is self.last_drawn:
+                return snapshot
+            self.last_drawn = snapshot
+            self.drawn += 1
+        self.latencies.append(perf_counter() - snapshot.created)
+        return snapshot
+
+    def has_new(self):
+        return self.front is not None and self.front is not self.last_drawn
+
+    def latency_stats(self):
+        """(min, median, max) latency in seconds over the recent draws."""
+        if not self.latencies:
+            return (0, 0, 0)
+        latencies = sorted(self.latencies)
+        return (latencies[0], latencies[len(latencies) // 2], latencies[-1])
+
+    def describe(self):
+        low, median, high = self.latency_stats()
+        return (
+            "snapshot latency {:.1f}/{:.1f}/{:.1f}ms min/median/max, "
+            "{} published, {} drawn, {} skipped"
+        ).format(
+            low*1000, median*1000, high*1000,
+            self.published, self.drawn, self.skipped
+        )
+
+
+class SimulationThread(threading.Thread):
+    """
+    Updates `game` every `tick` seconds and publishes snapshots to `buffer`.
+
+    Only this thread touches `keyboard`. Other threads pass key events with
+    `send_input()`, which queues them to be applied just before the next
+    update, so input never waits for an update to finish. When the game
+    quits or fails, the thread stops and `exit_status` is set, for the
+    GL thread to act on.
+
+    While paused, the thread only wakes every PAUSED_WAKEUP seconds to see
+    if it should stop, and the first update after resuming has a `dt` of 0
+    instead of the whole time paused.
+    """
+    PAUSED_WAKEUP = 0.25  # Seconds
+
+    def __init__(self, game, keyboard, buffer, tick=0.02):
+        super().__init__(name="simulation", daemon=True)
+        self.game = game
+        self.keyboard = keyboard
+        self.buffer = buffer
+        self.input_events = deque()  # (method name, args), appended atomically
+        self.tick = tick
+        self.exit_status = None
+        self.stopping = threading.Event()
+        self.running = threading.Event()  # Cleared while paused
+        self.running.set()
+
+    def stop(self):
+        self.stopping.set()
+        self.running.set()
+
+    def pause(self):
+        self.running.clear()
+
+    def resume(self):
+        self.running.set()
+
+    def send_input(self, method, *args):
+        """Call `keyboard.<method>(*args)` on this thread, before the next update."""
+        self.input_events.append((method, args))
+
+    def apply_input(self):
+        events = self.input_events
+        while events:
+            method, args = events.popleft()
+            getattr(self.keyboard, method)(*args)
+
+    def run(self):
+        # Scenes are only read while making a snapshot, so one is enough
+        scene = Scene()
+        sequence = 0
+        last_update_time = None
+        try:
+            while not self.stopping.is_set():
+                if not self.running.is_set():
+                    self.running.wait(self.PAUSED_WAKEUP)
+                    last_update_time = None
+                    continue
+
+                start = perf_counter()
+                dt = start - last_update_time if last_update_time else 0
+                last_update_time = start
+
+                self.apply_input()
+                self.keyboard.before_update(self.game)
+                game_finished = self.game.update(dt, self.keyboard)
+                self.keyboard.tick(dt)
+                if game_finished:
+                    self.game = Game(self.game.detail, self.game.gc_control)
+
+                # Counted as the frame's draw time by the detail controller
+                build_start = perf_counter()
+                sequence += 1
+                self.buffer.publish(RenderSnapshot.from_game(self.game, scene, sequence))
+                self.game.detail.record_draw(perf_counter() - build_start)
+
+                sleep(max(0, self.tick - (perf_counter() - start)))
+        except SystemExit as e:
+            self.exit_status = e.code or 0
+        except BaseException:
+            self.exit_status = 1
+            raise
+        finally:
+            if self.exit_status is None:
+                self.exit_status = 0
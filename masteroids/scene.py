@@ -0,0 +1,67 @@
+from masteroids import text
+from masteroids.gl import GL
+
+# Columns of each row in Scene.lines and Scene.points
+LINE_ROW_SIZE = 8  # x1, y1, x2, y2, r, g, b, wrap
+POINT_ROW_SIZE = 5  # x, y, r, g, b
+
+
+class Scene():
+    """
+    A frame described as flat lists of colored line segments and points.
+
+    This is the same picture the GL draw methods make, in a form that can be
+    drawn by something other than GL (see `raster.py`). Segments marked with
+    `wrap` belong to the playfield and wrap around the screen edges, others
+    (text, HUD) are clipped instead.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.points = []
+
+    def clear(self):
+        del self.lines[:]
+        del self.points[:]
+
+    @property
+    def n_lines(self):
+        return len(self.lines) // LINE_ROW_SIZE
+
+    @property
+    def n_points(self):
+        return len(self.points) // POINT_ROW_SIZE
+
+    def add_line(self, x1, y1, x2, y2, color, wrap=False):
+        self.lines.extend((x1, y1, x2, y2, color[0], color[1], color[2], wrap))
+
+    def add_polygon(self, points, color, wrap=True):
+        """Add a closed loop through `points`, like GL_LINE_LOOP."""
+        x1, y1 = points[-1]
+        for x2, y2 in points:
+            self.add_line(x1, y1, x2, y2, color, wrap)
+            x1, y1 = x2, y2
+
+    def add_point(self, x, y, color):
+        self.points.extend((x, y, color[0], color[1], color[2]))
+
+    def add_text(self, string, pos=(0, 0), scale=1, color=(1, 1, 1)):
+        for x1, y1, x2, y2 in text.str_lines(string, pos, scale):
+            self.add_line(x1, y1, x2, y2, color)
+
+    def draw(self):
+        """Draw with GL, once, without any wraparound copies."""
+        lines = self.lines
+        GL.glBegin(GL.GL_LINES)
+        for i in range(0, len(lines), LINE_ROW_SIZE):
+            GL.glColor3f(lines[i+4], lines[i+5], lines[i+6])
+            GL.glVertex2f(lines[i], lines[i+1])
+            GL.glVertex2f(lines[i+2], lines[i+3])
+        GL.glEnd()
+
+        points = self.points
+        GL.glBegin(GL.GL_POINTS)
+        for i in range(0, len(points), POINT_ROW_SIZE):
+            GL.glColor3f(points[i+2], points[i+3], points[i+4])
+            GL.glVertex2f(points[i], points[i+1])
+        GL.glEnd()
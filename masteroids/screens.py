@@ -1,27 +1,50 @@
 
 from collections import deque
-from itertools import combinations, product, chain
-from math import sqrt
-from time import time
+from itertools import combinations, product
+from math import sqrt, radians, sin, cos, ceil
 from copy import copy
 
-from OpenGL.GL import *
-from OpenGL.GLUT import *
+import numpy
 
 from masteroids import text
 from masteroids import shapes
 from masteroids import entities
-
-
-def draw_bar(x, y, width, percent=1):
-    glColor(1, 0, 0)
-    glBegin(GL_LINES)
-    glVertex2f(x, y)
-    glVertex2f(x+width*min(1, percent), y)
-    glColor(0, 1, 0)
-    glVertex2f(x+width*min(1, percent), y)
-    glVertex2f(x+width, y)
-    glEnd()
+from masteroids.detail import DetailController
+from masteroids.gl import GL
+from masteroids.inputstate import KEY_DOWN, KEY_UP
+from masteroids.kinematics import Kinematics
+from masteroids.paircache import PairCache
+from masteroids.scene import Scene
+from masteroids.shapes import X, Y, DX, DY
+from masteroids.spatial import SpatialGrid
+
+
+class DisplayList():
+    """
+    A GL display list that is only recompiled when its key changes.
+
+    Geometry that rarely changes can be drawn with `draw(key, func)` every
+    frame. `func` is only called (and compiled into the list) when `key`
+    differs from the key of the last compile, otherwise the cached list is
+    replayed with a single call.
+    """
+
+    def __init__(self):
+        self.list_id = None
+        self.key = None
+
+    def draw(self, key, draw_func):
+        if self.list_id is None:
+            self.list_id = GL.glGenLists(1)
+        if key != self.key:
+            GL.glNewList(self.list_id, GL.GL_COMPILE)
+            draw_func()
+            GL.glEndList()
+            self.key = key
+        GL.glCallList(self.list_id)
+
+    def invalidate(self):
+        self.key = None
 
 
 class Screen():
@@ -32,20 +55,52 @@ class Screen():
     def draw(self):
         pass
 
+    def build_scene(self, scene):
+        """Add what `draw()` would draw to a `scene.Scene`."""
+        pass
+
+    def is_quiet(self):
+        """
+        True if a pause wouldn't be noticed right now, such as a long
+        garbage collection (see gccontrol.py).
+        """
+        return True
+
 
 class EntityScreen(Screen):
 
-    def __init__(self, entities=None):
+    def __init__(self, entities=None, detail=None):
+        self.detail = detail if detail is not None else DetailController()
         self.frame_count = 0
+        self.time = 0  # Simulated seconds, advanced by each update's dt
         self.entities = []
-        self.particles = deque(maxlen=1000)
-        self.add_entities(entities)
-
-        for entity in self.entities:
+        self.particles = deque(maxlen=self.detail.particle_cap)
+        self.kinematics = Kinematics()
+        self.pair_cache = PairCache()
+        self.spatial = SpatialGrid(self.entities)
+        # Finds collisions instead of find_contacts() if set, see parallel.py
+        # and impacts.py
+        self.collision_backend = None
+        self.pairs_tested = 0
+        self.pairs_masked = 0  # Skipped by their collision layers
+
+        # Set up first, since setup can replace an entity's shape
+        entities = list(entities) if entities is not None else []
+        for entity in entities:
             entity.setup(self)
+        self.add_entities(entities)
 
     def update(self, dt, keyboard):
 
+        if self.particles.maxlen != self.detail.particle_cap:
+            # Keeps the newest particles if the cap went down
+            for i in range(len(self.particles) - self.detail.particle_cap):
+                self.kinematics.remove(self.particles[i].shape)
+            self.particles = deque(self.particles, maxlen=self.detail.particle_cap)
+
+        self.kinematics.integrate(dt)
+        self.spatial.invalidate()
+
         for entity in copy(self.entities):
             entity.update(dt, keyboard, self)
 
@@ -53,40 +108,91 @@ class EntityScreen(Screen):
             particle.update(dt, keyboard, self)
 
         # Collision Checking
-        to_check = combinations(self.entities, 2)
-        if self.frame_count % 10 == 0:
-            to_check = chain(to_check, product(self.entities, self.particles))
-        for e1, e2 in to_check:
+        if self.collision_backend is not None:
+            # The entities have already been moved by this update's dt
+            contacts = self.collision_backend.find_contacts(self.entities, self.time + dt)
+        else:
+            contacts = self.find_contacts()
+        for e1, e2, point in contacts:
+            e1.on_collision(e2, point, dt, self)
+            e2.on_collision(e1, point, dt, self)
+
+        if self.frame_count % self.detail.particle_collision_interval == 0:
+            for e1, e2 in product(self.entities, self.particles):
+                if not (e1.layer & e2.mask or e2.layer & e1.mask):
+                    self.pairs_masked += 1
+                    continue
+                self.pairs_tested += 1
+                point = e1.shape.check_collision(e2.shape)
+                if point:
+                    e1.on_collision(e2, point, dt, self)
+                    e2.on_collision(e1, point, dt, self)
+
+        self.frame_count += 1
+        self.time += dt
+
+    def find_contacts(self):
+        """
+        Yield `(e1, e2, point)` for each colliding pair of entities. Pairs
+        are taken from the entity list as it was when this started.
+        """
+        pair_cache = self.pair_cache
+        for e1, e2 in combinations(self.entities, 2):
+            if not (e1.layer & e2.mask or e2.layer & e1.mask):
+                self.pairs_masked += 1
+                continue
+            if not pair_cache.should_test(e1, e2, self.time):
+                continue
+            self.pairs_tested += 1
             point = e1.shape.check_collision(e2.shape)
             if point:
-                e1.on_collision(e2, point, dt, self)
-                e2.on_collision(e1, point, dt, self)
+                yield e1, e2, point
+            else:
+                pair_cache.record_miss(e1, e2, self.time)
 
-        self.frame_count += 1
+    def describe_collisions(self):
+        return "{} pairs tested, {} skipped by layer, {} by the pair cache".format(
+            self.pairs_tested, self.pairs_masked, self.pair_cache.skipped
+        )
+
+    def is_quiet(self):
+        return False
 
     def draw(self):
 
         # Draw each entity 9 times for wraparound effect
-        glMatrixMode(GL_MODELVIEW)
+        GL.glMatrixMode(GL.GL_MODELVIEW)
         for x in range(-2, 4, 2):
             for y in range(-2, 4, 2):
-                glPushMatrix()
-                glTranslate(x, y, 0)
+                GL.glPushMatrix()
+                GL.glTranslate(x, y, 0)
                 for entity in self.entities:
                     entity.draw()
-                glPopMatrix()
+                GL.glPopMatrix()
 
-        glBegin(GL_POINTS)
+        GL.glBegin(GL.GL_POINTS)
         for particle in self.particles:
-            glColor(*particle.color)
-            glVertex2f(particle.x, particle.y)
-        glEnd()
+            GL.glColor(*particle.color)
+            GL.glVertex2f(particle.x, particle.y)
+        GL.glEnd()
+
+    def build_scene(self, scene):
+        for entity in self.entities:
+            entity.add_to_scene(scene)
+        for particle in self.particles:
+            scene.add_point(particle.x, particle.y, particle.color)
 
     def add_entity(self, entity):
         if isinstance(entity, entities.ParticleEntity):
+            if len(self.particles) == self.particles.maxlen:
+                # The oldest particle is about to be pushed out
+                self.kinematics.remove(self.particles[0].shape)
             self.particles.append(entity)
         else:
             self.entities.append(entity)
+            self.pair_cache.add(entity)
+            self.spatial.insert(entity)
+        self.kinematics.add(entity.shape)
 
     def add_entities(self, entities):
         for entity in entities:
@@ -101,16 +207,41 @@ class EntityScreen(Screen):
             list_to_remove_from.remove(entity)
         except ValueError:
             pass  # Must already be removed
+        self.kinematics.remove(entity.shape)
+        self.pair_cache.forget(entity)
+        self.spatial.remove(entity)
 
+    # Spatial queries, see spatial.py. Particles aren't included.
 
-class TitleScreen(EntityScreen):
+    def entities_within(self, x, y, radius, kind=None, ignore=None):
+        return self.spatial.within(x, y, radius, kind, ignore)
+
+    def nearest_entity(self, x, y, kind=None, ignore=None, max_distance=float("inf")):
+        return self.spatial.nearest(x, y, kind, ignore, max_distance)
+
+    def ray_cast(self, x, y, dx, dy, max_distance=2, kind=None, ignore=None):
+        return self.spatial.ray_cast(x, y, dx, dy, max_distance, kind, ignore)
 
-    def __init__(self, entities, *args):
-        super().__init__(entities, *args)
+
+class TitleScreen(EntityScreen):
+    N_ASTEROIDS = 3
+
+    def __init__(self, entities=None, *args):
+        """
+        With `entities` of None, the background asteroids are generated
+        on the first update instead of up front, to get to it sooner.
+        """
+        super().__init__(entities or (), *args)
         self.selected = 0
         self.title_color = (0, 0, 0)
+        self.asteroids_pending = entities is None
 
     def update(self, dt, keyboard):
+        if self.asteroids_pending:
+            self.asteroids_pending = False
+            self.add_entities(
+                [entities.AsteroidEntity() for i in range(self.N_ASTEROIDS)]
+            )
         super().update(dt, keyboard)
 
         if keyboard.key_just_pressed(b'\r') or keyboard.key_just_pressed(b' '):
@@ -120,37 +251,47 @@ class TitleScreen(EntityScreen):
                 return HighScoreScreen()
             elif self.selected == 2:
                 return "quit"
-        if keyboard.key_just_pressed(GLUT_KEY_DOWN):
+        if keyboard.key_just_pressed(KEY_DOWN):
             self.selected = (self.selected + 1) % 3
-        if keyboard.key_just_pressed(GLUT_KEY_UP):
+        if keyboard.key_just_pressed(KEY_UP):
             self.selected = (self.selected - 1) % 3
 
+    def is_quiet(self):
+        return True
 
     def draw(self):
         super().draw()
+        scene = Scene()
+        self.build_menu(scene)
+        scene.draw()
+
+    def build_scene(self, scene):
+        super().build_scene(scene)
+        self.build_menu(scene)
+
+    def build_menu(self, scene):
 
         # RGB bouncing between 0 and 1 at rates that are relatively prime
-        t = time()
+        t = self.time
         triangle_func = lambda x: 1 - abs(x % 2 - 1)  # width=2, height=1
-        glColor(
+        title_color = (
             triangle_func(t*0.77),
             triangle_func(t*0.39),
             triangle_func(t*0.53)
         )
-        text.draw_str("MASTEROIDS", (-0.925, 0.6), 1.4)
+        scene.add_text("MASTEROIDS", (-0.925, 0.6), 1.4, title_color)
 
         color = (0, 1, 0) if self.selected == 0 else (1, 1, 1)
-        text.draw_str(" NEW GAME  ", (-0.65, 0.2), color=color)
+        scene.add_text(" NEW GAME  ", (-0.65, 0.2), color=color)
 
         color = (0, 1, 0) if self.selected == 1 else (1, 1, 1)
-        text.draw_str("HIGH SCORES", (-0.73, 0.0), color=color)
+        scene.add_text("HIGH SCORES", (-0.73, 0.0), color=color)
 
         color = (0, 1, 0) if self.selected == 2 else (1, 1, 1)
-        text.draw_str("   QUIT    ", (-0.65, -0.2), color=color)
+        scene.add_text("   QUIT    ", (-0.65, -0.2), color=color)
 
-        glColor(0, 1, 0)
-        text.draw_str(">", (-0.9, (1-self.selected)*0.2))
-        text.draw_str("<", (0.78, (1-self.selected)*0.2))
+        scene.add_text(">", (-0.9, (1-self.selected)*0.2), color=(0, 1, 0))
+        scene.add_text("<", (0.78, (1-self.selected)*0.2), color=(0, 1, 0))
 
 
 class HighScoreScreen(Screen):
@@ -162,18 +303,35 @@ class HighScoreScreen(Screen):
     def draw(self):
         text.draw_sample_str()
 
+    def build_scene(self, scene):
+        scene.add_text(text.SAMPLE_STR, (-0.9, 0))
+
 
 class GameplayScreen(EntityScreen):
     RESPAWN_DELAY = 2
+    SPAWN_RADIUS = 0.3  # Clearance needed around the spawn point
+    SPAWN_HORIZON = 4  # Seconds ahead to check for asteroids, at first
+
+    # Observation layout, see fill_observation()
+    OBS_PLAYER_SIZE = 8  # alive, x, y, dx, dy, sin(yaw), cos(yaw), cooldown
+    OBS_ASTEROIDS = 8
+    OBS_ASTEROID_SIZE = 6  # present, offset x, offset y, dx, dy, size
+    OBS_BULLETS = 8
+    OBS_BULLET_SIZE = 5  # present, offset x, offset y, dx, dy
 
-    def __init__(self, player, level, extra_entities=None):
+    def __init__(self, player, level, extra_entities=None, detail=None):
 
         start_entities = []
         if level > 1:
             start_entities.extend([entities.AsteroidEntity() for i in range(4)])
         if extra_entities:
             start_entities.extend(extra_entities)
-        super().__init__(start_entities)
+        super().__init__(start_entities, detail)
+
+        # Splitting is a lookup once this is done, so do it before play starts
+        for entity in start_entities:
+            if isinstance(entity, entities.AsteroidEntity):
+                entity.prepare_split()
 
         self.player = player
         self.level = level
@@ -182,19 +340,26 @@ class GameplayScreen(EntityScreen):
         self.level_complete_time = -1
         self.first_spawn = True
 
+        # Scratch space for fill_observation(), grown as needed
+        self._obs_capacity = 0
+        self._obs_asteroids = None
+        self._obs_bullets = None
+        self._obs_squares = None
+        self._obs_distances = None
+
     def update(self, dt, keyboard):
         super().update(dt, keyboard)
 
         # Handle death and game over
         if self.death_time == -1 and self.player not in self.entities:
-            self.death_time = time()
-        elif self.death_time != -1 and time() > self.death_time + self.RESPAWN_DELAY:
+            self.death_time = self.time
+        elif self.death_time != -1 and self.time > self.death_time + self.RESPAWN_DELAY:
             if self.player.lives <= 0 and not self.first_spawn:
                 if not self.game_over_time:
-                    self.game_over_time = time()
-                if time() - self.game_over_time > 1.75 and keyboard.any_key_just_pressed():
+                    self.game_over_time = self.time
+                if self.time - self.game_over_time > 1.75 and keyboard.any_key_just_pressed():
                     return "title_screen"
-            elif self.is_safe_to_spawn():
+            elif self.is_safe_to_spawn(self.spawn_horizon(self.death_time)):
                 self.player.setup(self)
                 if not self.first_spawn:
                     self.player.lives -= 1
@@ -216,63 +381,310 @@ class GameplayScreen(EntityScreen):
                 return False
 
         if self.level_complete_time == -1:
-            self.level_complete_time = time()
-        elif time() - self.level_complete_time > 3:
+            self.level_complete_time = self.time
+        elif self.time - self.level_complete_time > 3:
             return True
         
         return False
 
-    def is_safe_to_spawn(self):
+    def is_quiet(self):
+        # Waiting to respawn, game over, or waiting for the next level
+        return self.death_time != -1 or self.level_complete_time != -1
+
+    def spawn_horizon(self, death_time):
+        """
+        How far ahead to check before respawning. Shrinks to nothing the
+        longer the player waits, so a busy field can't hold them off forever.
+        """
+        waited = self.time - (death_time + self.RESPAWN_DELAY)
+        return max(0, self.SPAWN_HORIZON - waited)
+
+    def is_safe_to_spawn(self, horizon=0):
+        """
+        True if no asteroid comes within SPAWN_RADIUS of the center of the
+        screen in the next `horizon` seconds.
+
+        Asteroids move in straight lines on the wrapping playfield, so the
+        closest approach of each one's bounding circle to each wraparound
+        copy of the center is solved for directly, for all of them at once.
+        """
+        asteroids = [e for e in self.entities if isinstance(e, entities.AsteroidEntity)]
+        if not asteroids:
+            return True
+        state = self.kinematics.values[[a.shape.row for a in asteroids]]
+        positions = state[:, X:Y+1]
+        velocities = state[:, DX:DY+1]
+        reach = numpy.array([a.shape.radius for a in asteroids]) + self.SPAWN_RADIUS
+
+        # Copies of the center that any asteroid could reach
+        speeds_squared = (velocities**2).sum(axis=1)
+        farthest = 1 + sqrt(speeds_squared.max())*horizon + reach.max()
+        n = int(ceil(farthest / 2))
+        offsets = numpy.arange(-n, n+1) * 2.0
+        centers = numpy.stack(
+            [numpy.tile(offsets, len(offsets)), numpy.repeat(offsets, len(offsets))], axis=1
+        )
+
+        # Time of closest approach to each copy, where the derivative of
+        # |relative + velocity*t|^2 is zero, limited to 0..horizon
+        relative = positions[:, numpy.newaxis, :] - centers
+        velocities = velocities[:, numpy.newaxis, :]
+        t = numpy.zeros(relative.shape[:2])
+        moving = speeds_squared > 0
+        t[moving] = -(relative[moving] * velocities[moving]).sum(axis=2) / \
+            speeds_squared[moving, numpy.newaxis]
+        numpy.clip(t, 0, horizon, out=t)
+
+        closest = relative + velocities * t[..., numpy.newaxis]
+        distances_squared = (closest**2).sum(axis=2)
+        return not (distances_squared < reach[:, numpy.newaxis]**2).any()
+
+    @classmethod
+    def observation_size(cls):
+        return (cls.OBS_PLAYER_SIZE +
+                cls.OBS_ASTEROIDS * cls.OBS_ASTEROID_SIZE +
+                cls.OBS_BULLETS * cls.OBS_BULLET_SIZE)
+
+    def fill_observation(self, out):
+        """
+        Write a fixed-size observation of the game state into `out`.
+
+        `out` must be a float64 array of length `observation_size()`, which
+        is meant to be allocated once and reused. The layout is the player
+        block, then the `OBS_ASTEROIDS` nearest asteroids, then the
+        `OBS_BULLETS` nearest bullets, each described by the OBS_*_SIZE
+        comments. Offsets are taken from the player to the nearest
+        wraparound image of each entity. Unused slots are all zero.
+        """
+        out.fill(0)
+        player = self.player
+        px = player.x
+        py = player.y
+        out[0] = player in self.entities
+        out[1] = px
+        out[2] = py
+        out[3] = player.dx
+        out[4] = player.dy
+        yaw = radians(player.yaw)
+        out[5] = sin(yaw)
+        out[6] = cos(yaw)
+        out[7] = player.cooldown / player.COOLDOWN_MAX
+
+        if self._obs_capacity < len(self.entities):
+            self._obs_capacity = max(64, 2*len(self.entities))
+            self._obs_asteroids = numpy.empty((self._obs_capacity, 5))
+            self._obs_bullets = numpy.empty((self._obs_capacity, 4))
+            self._obs_squares = numpy.empty((self._obs_capacity, 2))
+            self._obs_distances = numpy.empty(self._obs_capacity)
+
+        asteroids = self._obs_asteroids
+        bullets = self._obs_bullets
+        n_asteroids = 0
+        n_bullets = 0
         for entity in self.entities:
             if isinstance(entity, entities.AsteroidEntity):
-                if sqrt(entity.x**2 + entity.y**2) < 0.3:
-                    return False
-        return True
+                row = asteroids[n_asteroids]
+                row[0] = entity.x
+                row[1] = entity.y
+                row[2] = entity.dx
+                row[3] = entity.dy
+                row[4] = entity.size
+                n_asteroids += 1
+            elif isinstance(entity, entities.BulletEntity):
+                row = bullets[n_bullets]
+                row[0] = entity.x
+                row[1] = entity.y
+                row[2] = entity.dx
+                row[3] = entity.dy
+                n_bullets += 1
+
+        start = self.OBS_PLAYER_SIZE
+        end = start + self.OBS_ASTEROIDS * self.OBS_ASTEROID_SIZE
+        self._fill_nearest(asteroids[:n_asteroids], px, py,
+                           out[start:end], self.OBS_ASTEROID_SIZE)
+        self._fill_nearest(bullets[:n_bullets], px, py,
+                           out[end:], self.OBS_BULLET_SIZE)
+        return out
+
+    def _fill_nearest(self, rows, px, py, out, row_size):
+        """
+        Turn the positions in `rows` into wraparound offsets from (px, py),
+        in place, then copy the nearest rows into `out` with a leading
+        presence flag.
+        """
+        positions = rows[:, :2]
+        positions[:, 0] -= px
+        positions[:, 1] -= py
+        positions += 1
+        numpy.mod(positions, 2, out=positions)
+        positions -= 1
+
+        squares = self._obs_squares[:len(rows)]
+        distances = self._obs_distances[:len(rows)]
+        numpy.multiply(positions, positions, out=squares)
+        numpy.add(squares[:, 0], squares[:, 1], out=distances)
+
+        # Repeated argmin instead of a sort, which would allocate
+        for i in range(min(len(rows), len(out) // row_size)):
+            nearest = distances.argmin()
+            out[i*row_size] = 1
+            out[i*row_size+1:(i+1)*row_size] = rows[nearest]
+            distances[nearest] = float("inf")
 
     def draw(self):
-        self.draw_hud()
+        """Everything but the static HUD, see `build_static_hud()`."""
+        self.draw_cooldown_bar()
         super().draw()
 
         if self.game_over_time:
-            blink = ( (time()-self.game_over_time)*2 % 2 <= 1 )
+            scene = Scene()
+            self.build_game_over(scene)
+            scene.draw()
+
+    def build_scene(self, scene, static_hud=True):
+        self.build_cooldown_bar(scene)
+        if static_hud:
+            self.build_static_hud(scene, *self.hud_state())
+        super().build_scene(scene)
+        self.build_game_over(scene)
+
+    def build_game_over(self, scene):
+        if self.game_over_time:
+            blink = ( (self.time-self.game_over_time)*2 % 2 <= 1 )
             if blink:
-                glColor(1, 0, 0)
-                text.draw_str("GAME OVER", (-0.6, 0))
-            if time() - self.game_over_time > 1.75:
-                glColor(1, 1, 1)
-                text.draw_str("PRESS ANY KEY TO CONTINUE", (-0.3, -0.1), 0.2)
+                scene.add_text("GAME OVER", (-0.6, 0), color=(1, 0, 0))
+            if self.time - self.game_over_time > 1.75:
+                scene.add_text("PRESS ANY KEY TO CONTINUE", (-0.3, -0.1), 0.2)
 
-    def draw_hud(self):
-        #TODO: Cleanup
+    def draw_cooldown_bar(self):
+        scene = Scene()
+        self.build_cooldown_bar(scene)
+        scene.draw()
 
-        # Weapon Cooldown
-        draw_bar(.22, .95, 0.7, self.player.cooldown / self.player.COOLDOWN_MAX)
-
-        # Lives
+    def hud_state(self):
+        """Return what the HUD depends on, other than the cooldown bar."""
         blink_active = False
         if self.death_time != -1 and not self.first_spawn:
-            blink_active = ( time()*5 % 2 <= 1 )
-        glColor(0, 1, 0)
-        text.draw_str("LIVES", (-0.9, 0.9), 0.25)
+            blink_active = ( self.time*5 % 2 <= 1 )
+        return (self.player.lives, self.level, int(self.player.score), blink_active)
+
+    def build_cooldown_bar(self, scene):
+        x, y, width = .22, .95, 0.7
+        split = x + width*min(1, self.player.cooldown / self.player.COOLDOWN_MAX)
+        scene.add_line(x, y, split, y, (1, 0, 0))
+        scene.add_line(split, y, x+width, y, (0, 1, 0))
+
+    @staticmethod
+    def build_static_hud(scene, lives, level, score, blink_active):
+        """
+        Lives, level and score, from the values of `hud_state()`. They only
+        change every so often, so `draw()` leaves them to whoever owns the GL
+        context, which can keep them in a `DisplayList` keyed by those values
+        (see `interface.draw_static_hud()`).
+        """
+        color = (0, 1, 0)
+
+        # Lives
+        scene.add_text("LIVES", (-0.9, 0.9), 0.25, color)
         player_shape = shapes.PolygonShape(entities.PlayerEntity.SHIP_VERTEXES)
         player_shape.translate(-0.88, 0.82)
-        if self.player.lives <= 0:
-            text.draw_str("-", (-0.83, 0.83), 0.25)
-        elif self.player.lives > 3:
+        if lives <= 0:
+            scene.add_text("-", (-0.83, 0.83), 0.25, color)
+        elif lives > 3:
             if not blink_active:
-                player_shape.draw()
-            text.draw_str("X {}".format(self.player.lives), (-0.83, 0.83), 0.25)
+                scene.add_polygon(player_shape.points, color, wrap=False)
+            scene.add_text("X {}".format(lives), (-0.83, 0.83), 0.25, color)
         else:
-            n_lives_to_show = self.player.lives
+            n_lives_to_show = lives
             if blink_active:
                 n_lives_to_show -= 1
             if n_lives_to_show > 0:
                 for i in range(n_lives_to_show):
-                    player_shape.draw()
+                    scene.add_polygon(player_shape.points, color, wrap=False)
                     player_shape.translate(0.058, 0)
 
         # Level
-        text.draw_str("LEVEL {}".format(self.level), (-0.65, 0.9), 0.25)
+        scene.add_text("LEVEL {}".format(level), (-0.65, 0.9), 0.25, color)
 
         # Score
-        text.draw_str("SCORE {}".format(int(self.player.score)), (-0.3, 0.9), 0.25)
+        scene.add_text("SCORE {}".format(score), (-0.3, 0.9), 0.25, color)
+
+
+class MultiplayerScreen(GameplayScreen):
+    """
+    Gameplay with any number of players, each with their own controls.
+
+    Players join and leave at any time and respawn on their own timers. There
+    is no game over: a player who runs out of lives starts over with a fresh
+    set and no score. Clearing the asteroids immediately starts the next
+    level's wave. `self.player` is just the first player, for the benefit of
+    single player methods such as `fill_observation()`.
+    """
+    WAVE_SIZE = 4
+
+    def __init__(self, detail=None):
+        super().__init__(None, 1, None, detail)
+        self.players = []
+        # Time of death, -1 while alive, None until a player's first spawn
+        self.death_times = {}
+        self.spawn_wave()
+
+    def spawn_wave(self):
+        wave = [entities.AsteroidEntity() for i in range(self.WAVE_SIZE)]
+        for asteroid in wave:
+            asteroid.prepare_split()
+        self.add_entities(wave)
+
+    def add_player(self, controls):
+        player = entities.PlayerEntity()
+        player.controls = controls
+        self.players.append(player)
+        self.death_times[player] = None
+        if self.player is None:
+            self.player = player
+        return player
+
+    def remove_player(self, player):
+        self.players.remove(player)
+        del self.death_times[player]
+        self.remove_entity(player)
+        if self.player is player:
+            self.player = self.players[0] if self.players else None
+
+    def update(self, dt, keyboard):
+        # Skips GameplayScreen.update(), which handles a single player
+        EntityScreen.update(self, dt, keyboard)
+
+        alive = set(self.entities)
+        for player in self.players:
+            if player in alive:
+                continue
+            death_time = self.death_times[player]
+            if death_time == -1:
+                self.death_times[player] = self.time  # Just died
+            elif death_time is None or self.time > death_time + self.RESPAWN_DELAY:
+                # Players joining spawn as soon as the center is clear
+                horizon = 0 if death_time is None else self.spawn_horizon(death_time)
+                if self.is_safe_to_spawn(horizon):
+                    self.respawn(player, death_time is None)
+
+        for entity in self.entities:
+            if isinstance(entity, entities.AsteroidEntity):
+                break
+        else:
+            self.level += 1
+            self.spawn_wave()
+
+    def respawn(self, player, first_spawn):
+        if not first_spawn:
+            player.lives -= 1
+            if player.lives < 0:
+                player.lives = 3
+                player.score = 0
+        player.setup(self)
+        self.add_entity(player)
+        self.death_times[player] = -1
+
+    def is_quiet(self):
+        # Someone is always playing
+        return False
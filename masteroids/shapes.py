@@ -1,12 +1,44 @@
 
+from array import array
 from math import radians, sin, cos, sqrt
-from itertools import product
+from itertools import product, chain
 
-import numpy
+from masteroids.gl import GL
+
+# Columns of a shape's kinematic state, see kinematics.py
+STATE_SIZE = 6
+X, Y, YAW, DX, DY, DYAW = range(STATE_SIZE)
 
-from OpenGL.GL import *
 
 class Shape():
+    # Thousands of shapes can be alive at once, so no per-shape __dict__
+    __slots__ = ("state", "kinematics", "row")
+
+    def __init__(self, x=0.0, y=0.0, yaw=0.0):
+        # [x, y, yaw, dx, dy, dyaw], a view into `kinematics.values` while
+        # the shape is on a screen
+        self.state = [x, y, yaw, 0.0, 0.0, 0.0]
+        self.kinematics = None
+        self.row = None
+
+    # Converted from NumPy scalars, which are slow in plain Python math
+
+    @property
+    def x(self):
+        return float(self.state[X])
+
+    @property
+    def y(self):
+        return float(self.state[Y])
+
+    @property
+    def yaw(self):
+        return float(self.state[YAW])
+
+    @property
+    def radius(self):
+        """Distance from the center to the farthest point of the shape."""
+        return 0
 
     def draw(self):
         raise NotImplementedError()
@@ -15,82 +47,126 @@ class Shape():
         raise NotImplementedError()
 
     def translate(self, dx, dy):
+        state = self.state
+        state[X] = (state[X] + dx + 1)%2 - 1
+        state[Y] = (state[Y] + dy + 1)%2 - 1
+
+    def add_to_scene(self, scene, color):
         raise NotImplementedError()
 
 
 class PointShape(Shape):
-
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
+    __slots__ = ()
 
     def check_collision(self, other):
-        #TODO: Use bounding box for quick rejection
         if isinstance(other, PolygonShape):
-            return _collision_polygon_point(other, self)
+            return other.check_collision(self)
         elif isinstance(other, PointShape):
             return False
         raise NotImplementedError()
 
-    def translate(self, dx, dy):
-        self.x += dx
-        self.y += dy
-        self._wrap_around()
-
-    def _wrap_around(self):
-        self.x = (self.x + 1)%2 - 1
-        self.y = (self.y + 1)%2 - 1
-
     def draw(self):
-        glBegin(GL_POINTS)
-        glVertex2f(self.x, self.y)
-        glEnd()
+        GL.glBegin(GL.GL_POINTS)
+        GL.glVertex2f(self.x, self.y)
+        GL.glEnd()
+
+    def add_to_scene(self, scene, color):
+        scene.add_point(self.x, self.y, color)
 
 
 class PolygonShape(Shape):
+    __slots__ = (
+        "raw_points", "circle", "_points_cache", "_points_generation", "_radius",
+        "_inner_radius",
+    )
 
     def __init__(self, points):
-        self.raw_points = tuple(tuple(p) for p in points)
+        super().__init__()
+        # Vertexes relative to the center, flattened to x0, y0, x1, y1, ...
+        self.raw_points = array('d', chain.from_iterable(points))
+        self.circle = False  # Try the inner circles before the exact test
         self._points_cache = None
-        self.yaw = 0
-        self.center = numpy.array([0.0, 0.0])
+        self._points_generation = None
+        self._radius = None
+        self._inner_radius = None
 
         # Shift self.center to center of points
         #TODO: Change this to center of gravity
         center = self.get_center()
-        self.center += center
-        self.raw_points = tuple(
-            (x - center[0], y - center[1]) for x, y in self.raw_points
-        )
+        self.state[X], self.state[Y] = center
+        self.raw_points = array('d', (
+            value - center[i % 2] for i, value in enumerate(self.raw_points)
+        ))
+
+    @classmethod
+    def from_local(cls, raw_points, x, y, yaw=0):
+        """
+        Make a polygon from points that are already centered, placed at
+        (x, y) and rotated by `yaw`. Skips the recentering done by __init__.
+
+        `raw_points` is a flat `array('d')`, like `self.raw_points`, and may
+        be shared between shapes since it is never changed.
+        """
+        shape = cls.__new__(cls)
+        Shape.__init__(shape, float(x), float(y), float(yaw))
+        shape.raw_points = raw_points
+        shape.circle = False
+        shape._points_cache = None
+        shape._points_generation = None
+        shape._radius = None
+        shape._inner_radius = None
+        return shape
 
     @property
     def points(self):
-        if self._points_cache is not None:
+        # Moving shapes go stale every time their screen integrates
+        kinematics = self.kinematics
+        generation = kinematics.generation if kinematics is not None else None
+        if self._points_cache is not None and self._points_generation == generation:
             return self._points_cache
+        center_x, center_y = self.x, self.y
         theta = radians(self.yaw)
         points = []
-        for x, y in self.raw_points:
+        for x, y in self.local_points():
             points.append((
-                x*cos(theta) - y*sin(theta) + self.center[0],
-                x*sin(theta) + y*cos(theta) + self.center[1]
+                x*cos(theta) - y*sin(theta) + center_x,
+                x*sin(theta) + y*cos(theta) + center_y
             ))
         self._points_cache = tuple(points)
+        self._points_generation = generation
         return self._points_cache
 
     @property
-    def x(self):
-        return self.center[0]
+    def center(self):
+        return (self.x, self.y)
 
     @property
-    def y(self):
-        return self.center[1]
+    def radius(self):
+        if self._radius is None:
+            self._radius = max(sqrt(x*x + y*y) for x, y in self.local_points())
+        return self._radius
+
+    @property
+    def inner_radius(self):
+        """
+        Radius of the largest circle around the center that is inside the
+        polygon, or 0 if the center isn't inside it.
+        """
+        if self._inner_radius is None:
+            self._inner_radius = _inner_radius(self)
+        return self._inner_radius
+
+    def local_points(self):
+        """The (x, y) pairs of `raw_points`."""
+        coords = iter(self.raw_points)
+        return zip(coords, coords)
 
     def get_center(self):
         bb = self.get_bounding_box()
-        return numpy.array((
+        return (
             (bb[0][0] + bb[1][0]) / 2,
             (bb[0][1] + bb[1][1]) / 2
-        ))
+        )
 
     def get_bounding_box(self):
         xs = [x for x, y in self.points]
@@ -109,26 +185,41 @@ class PolygonShape(Shape):
         yield (points[-1], points[0])
 
     def check_collision(self, other):
+        # The radius doesn't change as the polygon turns, unlike the
+        # bounding box, so this is the cheapest test to rule out a collision
+        if not _collision_circle_circle(self, other):
+            return None
         if isinstance(other, PolygonShape):
+            # Overlapping inner circles are a hit without the exact test
+            if self.circle or other.circle:
+                r1, r2 = self.inner_radius, other.inner_radius
+                point = r1 and r2 and _collision_circles(self, r1, other, r2)
+                if point:
+                    return point
             return _collision_polygon_polygon(self, other)
         elif isinstance(other, PointShape):
+            r = self.circle and self.inner_radius
+            if r and _collision_circles(self, r, other, 0):
+                return (other.x, other.y)
             return _collision_polygon_point(self, other)
         return NotImplementedError()
 
     def rotate(self, dyaw):
-        self.yaw = (self.yaw + dyaw) % 360
+        self.state[YAW] = (self.state[YAW] + dyaw) % 360
         self._points_cache = None
 
     def translate(self, dx, dy):
-        self.center[0] = (self.center[0] + dx + 1)%2 - 1
-        self.center[1] = (self.center[1] + dy + 1)%2 - 1
+        super().translate(dx, dy)
         self._points_cache = None
 
     def draw(self):
-        glBegin(GL_LINE_LOOP)
+        GL.glBegin(GL.GL_LINE_LOOP)
         for x, y in self.points:
-            glVertex2f(x, y)
-        glEnd()
+            GL.glVertex2f(x, y)
+        GL.glEnd()
+
+    def add_to_scene(self, scene, color):
+        scene.add_polygon(self.points, color)
 
     def split(self):
         """Split polygon into two along a line."""
@@ -141,30 +232,33 @@ class PolygonShape(Shape):
             """
             closest_t = float("inf")
             closest_line = None
+            end = (start[0] + direction[0], start[1] + direction[1])
             for line in lines:
-                t1, t2 = _find_t_intersects(line, (start, start+direction))
+                t1, t2 = _find_t_intersects(line, (start, end))
                 if t1 != None and t1 >= 0 and t1 <= 1:
                     if t2 is not None and t2 >= 0 and t2 < closest_t:
                         closest_t = t2
                         closest_line = line
-            return closest_line, start + closest_t*direction
+            return closest_line, (
+                start[0] + closest_t*direction[0],
+                start[1] + closest_t*direction[1]
+            )
 
         best_dir = None
         best_dist = float("inf")
         for theta in range(0, 180, 10):
-            direction = numpy.array([
+            direction = (
                 sin(radians(theta)),
                 cos(radians(theta))
-            ])
+            )
             l1, p1 = find_closest_intersection(self.center, direction, lines)
-            l2, p2 = find_closest_intersection(self.center, -direction, lines)
-            vec = p1 - p2
+            l2, p2 = find_closest_intersection(self.center, _negate(direction), lines)
             dist = sqrt((p2[0]-p1[0])**2 + (p2[1]-p1[1])**2)
             if dist < best_dist:
                 best_dist = dist
                 best_dir = direction
         l1, p1 = find_closest_intersection(self.center, best_dir, lines)
-        l2, p2 = find_closest_intersection(self.center, -best_dir, lines)
+        l2, p2 = find_closest_intersection(self.center, _negate(best_dir), lines)
 
         if not l1 or not l2:
             return (None, None)
@@ -190,8 +284,10 @@ class PolygonShape(Shape):
         return abs(0.5 * summation)
 
 
+def _negate(vector):
+    return (-vector[0], -vector[1])
+
 def _collision_polygon_polygon(poly1, poly2):
-    #TODO: Collide if one polygon is inside another
     #TODO: Cleanup
 
     # Fail fast if bounding boxes don't overlap
@@ -216,6 +312,13 @@ def _collision_polygon_polygon(poly1, poly2):
                         (result[0] + 1)%2 - 1,
                         (result[1] + 1)%2 - 1,
                     )
+
+    # With no edges crossing, either polygon could still be entirely inside
+    # the other, in which case so is any one of its vertexes.
+    if _point_in_polygon(poly2, box2, *poly1.points[0]):
+        return poly1.center
+    if _point_in_polygon(poly1, box1, *poly2.points[0]):
+        return poly2.center
     return None
 
 def _collision_bb_bb(box1, box2):
@@ -227,24 +330,65 @@ def _collision_bb_bb(box1, box2):
             return True
     return False
 
+def _collision_circle_circle(shape1, shape2):
+    """
+    Collision between the bounding circles of two shapes, with the point
+    between their centers as the contact.
+    """
+    return _collision_circles(shape1, shape1.radius, shape2, shape2.radius)
+
+def _collision_circles(shape1, r1, shape2, r2):
+    """Like `_collision_circle_circle()`, for circles of radius r1 and r2."""
+    x, y = shape1.x, shape1.y
+    dx = (shape2.x - x + 1)%2 - 1
+    dy = (shape2.y - y + 1)%2 - 1
+    if dx*dx + dy*dy > (r1 + r2)**2:
+        return None
+    t = r1 / (r1 + r2) if r1 + r2 else 0
+    return (
+        (x + t*dx + 1)%2 - 1,
+        (y + t*dy + 1)%2 - 1,
+    )
+
+def _inner_radius(poly):
+    """See `PolygonShape.inner_radius`. Worked out in the polygon's own frame."""
+    points = list(poly.local_points())
+    inside = False
+    nearest = float("inf")
+    for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]):
+        # Crossings of a ray from the center along +x
+        if (y1 > 0) != (y2 > 0) and x1 - y1*(x2 - x1)/(y2 - y1) > 0:
+            inside = not inside
+        ex, ey = x2 - x1, y2 - y1
+        length_squared = ex*ex + ey*ey
+        t = -(x1*ex + y1*ey) / length_squared if length_squared else 0
+        t = min(1, max(0, t))
+        nearest = min(nearest, sqrt((x1 + t*ex)**2 + (y1 + t*ey)**2))
+    return nearest if inside else 0
+
 def _collision_polygon_point(poly, point):
+    x, y = point.x, point.y
+    if _point_in_polygon(poly, poly.get_bounding_box(), x, y):
+        return (x, y)
+    return None
 
-    bb = poly.get_bounding_box()
+def _point_in_polygon(poly, bb, x, y):
+    """True if (x, y) or one of its wraparound copies is inside `poly`."""
     for dx, dy in product((-2, 0, 2), repeat=2):
 
         # Bounding box rejection
-        if point.x + dx < bb[0][0] or point.x + dx > bb[1][0] or \
-           point.y + dy < bb[0][1] or point.y + dy > bb[1][1]:
+        if x + dx < bb[0][0] or x + dx > bb[1][0] or \
+           y + dy < bb[0][1] or y + dy > bb[1][1]:
             continue
 
         n_lines_hit = 0
         for line in poly.get_lines():
-            if _collision_line_line(line, ((-4, -4), (point.x+dx, point.y+dy))):
+            if _collision_line_line(line, ((-4, -4), (x+dx, y+dy))):
                 n_lines_hit += 1
         if n_lines_hit % 2 == 1:
-            return (point.x, point.y)
+            return True
 
-    return None
+    return False
 
 def _find_t_intersects(line1, line2):
     ax = line1[1][0] - line1[0][0]
@@ -0,0 +1,250 @@
+"""
+Packing of a whole game's state into a flat array of doubles.
+
+Used by `Game.snapshot()` and `Game.restore()`. Restoring builds fresh
+entity and shape objects directly from the stored values, without running
+the constructors' random generation or polygon recentering, so it is cheap
+enough to do thousands of times per decision in a search.
+
+Layout, in order:
+    header: format version, screen type, level number
+    player: lives, score, cooldown, dx, dy, x, y, yaw
+    screen: fields for the screen type (see _pack_screen)
+    entities: count, then one record per entity, in collision order
+    particles: count, then one record per particle
+    rng: Python's `random` state
+"""
+
+import random
+from array import array
+
+from masteroids import shapes
+from masteroids import screens
+from masteroids import entities
+
+FORMAT_VERSION = 2
+
+SCREEN_TITLE = 0
+SCREEN_HIGH_SCORES = 1
+SCREEN_GAMEPLAY = 2
+
+ENTITY_PLAYER = 0
+ENTITY_ASTEROID = 1
+ENTITY_BULLET = 2
+
+PARTICLE_RECORD_SIZE = 7  # x, y, dx, dy, r, g, b
+
+
+def pack_game(game, particles=True):
+    """
+    Return the state of `game` as an `array('d')`.
+
+    With `particles=False`, the purely cosmetic particles are left out.
+    """
+    buf = array('d')
+    screen = game.current_screen
+    if isinstance(screen, screens.MultiplayerScreen):
+        # Only one player and their bullets would be kept
+        raise ValueError("Can't snapshot screen of type {}".format(type(screen)))
+    elif isinstance(screen, screens.GameplayScreen):
+        screen_type = SCREEN_GAMEPLAY
+    elif isinstance(screen, screens.TitleScreen):
+        screen_type = SCREEN_TITLE
+    elif isinstance(screen, screens.HighScoreScreen):
+        screen_type = SCREEN_HIGH_SCORES
+    else:
+        raise ValueError("Can't snapshot screen of type {}".format(type(screen)))
+    buf.extend((FORMAT_VERSION, screen_type, game.level_number))
+
+    player = game.player
+    buf.extend((
+        player.lives, player.score, player.cooldown,
+        player.dx, player.dy,
+        player.x, player.y, player.shape.yaw
+    ))
+
+    _pack_screen(buf, screen_type, screen)
+    if isinstance(screen, screens.EntityScreen):
+        _pack_entities(buf, screen.entities)
+        if particles:
+            buf.append(len(screen.particles))
+            for particle in screen.particles:
+                buf.extend((particle.x, particle.y, particle.dx, particle.dy))
+                buf.extend(particle.color)
+        else:
+            buf.append(0)
+
+    version, internal_state, gauss_next = random.getstate()
+    buf.append(version)
+    buf.append(len(internal_state))
+    buf.extend(internal_state)
+    buf.append(float("nan") if gauss_next is None else gauss_next)
+    return buf
+
+def unpack_game(game, buf):
+    """
+    Replace the state of `game` with the state in `buf`, which is an array
+    from `pack_game()` or its bytes.
+    """
+    reader = _Reader(buf)
+    version, screen_type, level_number = reader.take(3)
+    if version != FORMAT_VERSION:
+        raise ValueError("Unsupported snapshot version {}".format(version))
+
+    lives, score, cooldown, dx, dy, x, y, yaw = reader.take(8)
+    player = entities.PlayerEntity.__new__(entities.PlayerEntity)
+    player.lives = int(lives)
+    player.score = score
+    player.cooldown = cooldown
+    player.controls = None
+    player.shape = shapes.PolygonShape.from_local(_ship_points(), x, y, yaw)
+    player.dx = dx
+    player.dy = dy
+
+    game.level_number = int(level_number)
+    game.player = player
+    screen = _unpack_screen(reader, int(screen_type), game)
+    if isinstance(screen, screens.EntityScreen):
+        screen.add_entities(_unpack_entities(reader, player))
+        n_particles = int(reader.take_one())
+        for i in range(n_particles):
+            x, y, dx, dy, r, g, b = reader.take(PARTICLE_RECORD_SIZE)
+            screen.add_entity(entities.ParticleEntity(x, y, dx, dy, (r, g, b)))
+    game.current_screen = screen
+
+    rng_version = int(reader.take_one())
+    n_internal = int(reader.take_one())
+    internal_state = tuple(int(value) for value in reader.take(n_internal))
+    gauss_next = reader.take_one()
+    if gauss_next != gauss_next:  # NaN
+        gauss_next = None
+    random.setstate((rng_version, internal_state, gauss_next))
+
+def _pack_screen(buf, screen_type, screen):
+    if screen_type == SCREEN_HIGH_SCORES:
+        return
+    buf.extend((screen.frame_count, screen.time))
+    if screen_type == SCREEN_TITLE:
+        buf.extend((screen.selected, screen.asteroids_pending))
+    elif screen_type == SCREEN_GAMEPLAY:
+        buf.extend((
+            screen.level,
+            screen.death_time,
+            screen.game_over_time,
+            screen.level_complete_time,
+            screen.first_spawn,
+        ))
+
+def _unpack_screen(reader, screen_type, game):
+    if screen_type == SCREEN_HIGH_SCORES:
+        return screens.HighScoreScreen()
+
+    frame_count, time = reader.take(2)
+    if screen_type == SCREEN_TITLE:
+        screen = screens.TitleScreen([], game.detail)
+        selected, asteroids_pending = reader.take(2)
+        screen.selected = int(selected)
+        # Generated by the next update, from the restored `random` state
+        screen.asteroids_pending = bool(asteroids_pending)
+    elif screen_type == SCREEN_GAMEPLAY:
+        # Constructed as level 1 since higher levels generate new asteroids
+        screen = screens.GameplayScreen(game.player, 1, None, game.detail)
+        level, death_time, game_over_time, level_complete_time, first_spawn = reader.take(5)
+        screen.level = int(level)
+        screen.death_time = death_time
+        screen.game_over_time = game_over_time
+        screen.level_complete_time = level_complete_time
+        screen.first_spawn = bool(first_spawn)
+    else:
+        raise ValueError("Unknown screen type {} in snapshot".format(screen_type))
+    screen.frame_count = int(frame_count)
+    screen.time = time
+    return screen
+
+def _pack_entities(buf, entity_list):
+    buf.append(len(entity_list))
+    for entity in entity_list:
+        if isinstance(entity, entities.PlayerEntity):
+            buf.append(ENTITY_PLAYER)
+        elif isinstance(entity, entities.AsteroidEntity):
+            shape = entity.shape
+            buf.extend((
+                ENTITY_ASTEROID, entity.size,
+                entity.dx, entity.dy, entity.dyaw,
+                shape.x, shape.y, shape.yaw,
+                len(shape.raw_points) // 2
+            ))
+            buf.extend(shape.raw_points)
+        elif isinstance(entity, entities.BulletEntity):
+            buf.extend((
+                ENTITY_BULLET,
+                entity.x, entity.y, entity.dx, entity.dy, entity.age
+            ))
+        else:
+            raise ValueError("Can't snapshot entity of type {}".format(type(entity)))
+
+def _unpack_entities(reader, player):
+    n_entities = int(reader.take_one())
+    result = []
+    for i in range(n_entities):
+        entity_type = reader.take_one()
+        if entity_type == ENTITY_PLAYER:
+            result.append(player)
+
+        elif entity_type == ENTITY_ASTEROID:
+            size, dx, dy, dyaw, x, y, yaw, n_points = reader.take(8)
+            asteroid = entities.AsteroidEntity.__new__(entities.AsteroidEntity)
+            asteroid.size = size
+            asteroid.shape = shapes.PolygonShape.from_local(
+                reader.take(2*int(n_points)), x, y, yaw
+            )
+            asteroid.shape.circle = size < entities.AsteroidEntity.CIRCLE_SIZE
+            asteroid.fracture = None
+            asteroid.dx = dx
+            asteroid.dy = dy
+            asteroid.dyaw = dyaw
+            result.append(asteroid)
+
+        elif entity_type == ENTITY_BULLET:
+            x, y, dx, dy, age = reader.take(5)
+            bullet = entities.BulletEntity.__new__(entities.BulletEntity)
+            bullet.owner = player
+            bullet.shape = shapes.PointShape(x, y)
+            bullet.dx = dx
+            bullet.dy = dy
+            bullet.age = age
+            result.append(bullet)
+
+        else:
+            raise ValueError("Unknown entity type {} in snapshot".format(entity_type))
+    return result
+
+_ship_points_cache = None
+def _ship_points():
+    """The player's ship vertexes, recentered the way PolygonShape does."""
+    global _ship_points_cache
+    if _ship_points_cache is None:
+        shape = shapes.PolygonShape(entities.PlayerEntity.SHIP_VERTEXES)
+        _ship_points_cache = shape.raw_points
+    return _ship_points_cache
+
+
+class _Reader():
+
+    def __init__(self, buf):
+        if not isinstance(buf, array):
+            values = array('d')
+            values.frombytes(buf)
+            buf = values
+        self.buf = buf
+        self.pos = 0
+
+    def take_one(self):
+        value = self.buf[self.pos]
+        self.pos += 1
+        return value
+
+    def take(self, n):
+        values = self.buf[self.pos:self.pos+n]
+        self.pos += n
+        return values
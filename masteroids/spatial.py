@@ -0,0 +1,213 @@
+"""
+A uniform grid over the wrapping playfield, for finding entities by place.
+
+Each entity is listed in every cell that its bounding circle overlaps, so a
+query only has to look at the cells around it instead of every entity on
+the screen. All distances are measured the short way around the wrapping
+playfield.
+"""
+
+from math import sqrt, floor
+
+from masteroids.shapes import PolygonShape, _find_t_intersects
+
+
+def wrapped_delta(a, b):
+    """`a - b` along one axis, the short way around the playfield."""
+    return (a - b + 1) % 2 - 1
+
+
+class SpatialGrid():
+    CELL_SIZE = 0.125
+
+    def __init__(self, entities, cell_size=None):
+        """
+        `entities` is the list to index. It is read again whenever the grid
+        is rebuilt, so it should be the screen's own list, not a copy.
+        """
+        self.entities = entities
+        self.n_cells = int(round(2 / (cell_size or self.CELL_SIZE)))
+        self.cell_size = 2 / self.n_cells
+
+        # Built on the first query after each invalidate()
+        self.cells = None
+        self.entity_cells = {}
+
+    def invalidate(self):
+        """Forget everything, because entities have moved."""
+        self.cells = None
+        self.entity_cells = {}
+
+    def insert(self, entity):
+        if self.cells is not None:
+            self._insert(entity)
+
+    def remove(self, entity):
+        for cell in self.entity_cells.pop(entity, ()):
+            cell.remove(entity)
+
+    def _build(self):
+        self.cells = [[] for i in range(self.n_cells**2)]
+        for entity in self.entities:
+            self._insert(entity)
+
+    def _insert(self, entity):
+        x, y, r = entity.x, entity.y, entity.shape.radius
+        cells = []
+        for j in self._wrapped_indexes(y - r, y + r):
+            for i in self._wrapped_indexes(x - r, x + r):
+                cell = self.cells[j*self.n_cells + i]
+                cell.append(entity)
+                cells.append(cell)
+        self.entity_cells[entity] = cells
+
+    def _index(self, coordinate):
+        """Unwrapped index of the cell holding `coordinate`."""
+        return int(floor((coordinate + 1) / self.cell_size))
+
+    def _wrapped_indexes(self, low, high):
+        """Cell indexes along one axis covering `low` to `high`."""
+        first, last = self._index(low), self._index(high)
+        if last - first + 1 >= self.n_cells:
+            return range(self.n_cells)
+        return [i % self.n_cells for i in range(first, last + 1)]
+
+    def _candidates(self, cells, kind, ignore, seen):
+        """Entities in `cells` not yet in `seen`, of type `kind`."""
+        for cell in cells:
+            for entity in cell:
+                if entity in seen:
+                    continue
+                seen.add(entity)
+                if entity is ignore or (kind is not None and not isinstance(entity, kind)):
+                    continue
+                yield entity
+
+    def within(self, x, y, radius, kind=None, ignore=None):
+        """
+        Entities whose bounding circle comes within `radius` of (x, y),
+        nearest first. `kind` is a class or tuple of classes to limit the
+        search to, and `ignore` an entity to leave out.
+        """
+        if self.cells is None:
+            self._build()
+        cells = [
+            self.cells[j*self.n_cells + i]
+            for j in self._wrapped_indexes(y - radius, y + radius)
+            for i in self._wrapped_indexes(x - radius, x + radius)
+        ]
+        found = []
+        for entity in self._candidates(cells, kind, ignore, set()):
+            distance = sqrt(
+                wrapped_delta(entity.x, x)**2 + wrapped_delta(entity.y, y)**2
+            )
+            if distance < radius + entity.shape.radius:
+                found.append((distance, entity))
+        found.sort(key=lambda pair: pair[0])
+        return [entity for distance, entity in found]
+
+    def nearest(self, x, y, kind=None, ignore=None, max_distance=float("inf")):
+        """
+        The entity whose center is nearest to (x, y) and no farther than
+        `max_distance`, or None.
+
+        Searches rings of cells outward from (x, y). Anything not yet seen
+        after ring `k` lies entirely outside of it, so at least
+        `k*cell_size` away, and the search stops once the best so far is
+        closer than that.
+        """
+        if self.cells is None:
+            self._build()
+        n = self.n_cells
+        ci, cj = self._index(x), self._index(y)
+        seen = set()
+        best, best_distance = None, max_distance
+        for k in range(n // 2 + 1):
+            ring = [
+                self.cells[((cj + dj) % n)*n + (ci + di) % n]
+                for dj in range(-k, k+1)
+                for di in range(-k, k+1)
+                if max(abs(di), abs(dj)) == k
+            ]
+            for entity in self._candidates(ring, kind, ignore, seen):
+                distance = sqrt(
+                    wrapped_delta(entity.x, x)**2 + wrapped_delta(entity.y, y)**2
+                )
+                if distance < best_distance:
+                    best, best_distance = entity, distance
+            if k * self.cell_size >= best_distance:
+                break
+        return best
+
+    def ray_cast(self, x, y, dx, dy, max_distance=2, kind=None, ignore=None):
+        """
+        The first polygon hit by a ray from (x, y) in direction (dx, dy), as
+        `(entity, (hit_x, hit_y), distance)`, or None if nothing is hit
+        within `max_distance`. Points, such as bullets, can't be hit.
+
+        Walks the cells along the ray in order, wrapping around the edges,
+        until the ray has passed the nearest hit found so far.
+        """
+        if self.cells is None:
+            self._build()
+        length = sqrt(dx*dx + dy*dy)
+        if length == 0:
+            return None
+        dx, dy = dx / length, dy / length
+        end = (x + dx*max_distance, y + dy*max_distance)
+        n, size = self.n_cells, self.cell_size
+
+        # Cell walk, in unwrapped cell coordinates
+        i, j = self._index(x), self._index(y)
+        step_i = 1 if dx > 0 else -1
+        step_j = 1 if dy > 0 else -1
+        delta_i = size / abs(dx) if dx else float("inf")
+        delta_j = size / abs(dy) if dy else float("inf")
+        next_i = ((i + (dx > 0))*size - 1 - x) / dx if dx else float("inf")
+        next_j = ((j + (dy > 0))*size - 1 - y) / dy if dy else float("inf")
+
+        tested = set()
+        best = None
+        best_t = 1  # Fraction of max_distance
+        entered = 0
+        while entered <= best_t * max_distance:
+            # Where this stretch of the ray is on the unwrapped plane
+            cell_x = (i + 0.5)*size - 1
+            cell_y = (j + 0.5)*size - 1
+            for entity in self.cells[(j % n)*n + i % n]:
+                if not isinstance(entity.shape, PolygonShape) or entity is ignore:
+                    continue
+                if kind is not None and not isinstance(entity, kind):
+                    continue
+                # The copy of the entity that is around this cell
+                offset_x = cell_x - wrapped_delta(cell_x, entity.x) - entity.x
+                offset_y = cell_y - wrapped_delta(cell_y, entity.y) - entity.y
+                key = (entity, round(offset_x), round(offset_y))
+                if key in tested:
+                    continue
+                tested.add(key)
+                for (x1, y1), (x2, y2) in entity.shape.get_lines():
+                    edge = ((x1 + offset_x, y1 + offset_y), (x2 + offset_x, y2 + offset_y))
+                    t_edge, t_ray = _find_t_intersects(edge, ((x, y), end))
+                    if t_edge is None or not 0 <= t_edge <= 1:
+                        continue
+                    if 0 <= t_ray < best_t:
+                        best, best_t = entity, t_ray
+
+            if next_i < next_j:
+                i += step_i
+                entered = next_i
+                next_i += delta_i
+            else:
+                j += step_j
+                entered = next_j
+                next_j += delta_j
+
+        if best is None:
+            return None
+        distance = best_t * max_distance
+        hit = (
+            wrapped_delta(x + dx*distance, 0),
+            wrapped_delta(y + dy*distance, 0),
+        )
+        return best, hit, distance
@@ -1,5 +1,5 @@
 
-from OpenGL.GL import *
+from masteroids.gl import GL
 
 CHAR_SPACING = 2.7
 LINE_SPACING = 4
@@ -8,25 +8,25 @@ def draw_char(char):
     if char not in CHAR_LINES:
         raise ValueError("Char not supported for drawing: '{}'".format(char))
 
-    glBegin(GL_LINES)
+    GL.glBegin(GL.GL_LINES)
     for point1, point2 in CHAR_LINES[char]:
-        glVertex2f(point1, point2)
-    glEnd()
+        GL.glVertex2f(point1, point2)
+    GL.glEnd()
 
 def draw_line(string, pos, scale, color):
     if color is not None:
-        glColor(color)
+        GL.glColor(color)
 
-    glMatrixMode(GL_MODELVIEW)
-    glPushMatrix()
-    glTranslate(pos[0], pos[1], 0)
-    glScale(scale, scale, 0)
+    GL.glMatrixMode(GL.GL_MODELVIEW)
+    GL.glPushMatrix()
+    GL.glTranslate(pos[0], pos[1], 0)
+    GL.glScale(scale, scale, 0)
 
     for i, char in enumerate(string):
         draw_char(char)
-        glTranslate(CHAR_SPACING, 0, 0)
+        GL.glTranslate(CHAR_SPACING, 0, 0)
 
-    glPopMatrix()
+    GL.glPopMatrix()
 
 def draw_str(string, pos=(0, 0), scale=1, color=None):
     scale = scale * 0.05
@@ -35,7 +35,26 @@ def draw_str(string, pos=(0, 0), scale=1, color=None):
         draw_line(line, line_pos, scale, color)
 
 def draw_sample_str():
-    draw_str("ABCDEFGHIJKLM\nNOPQRSTUVWXYZ\n1234567890", pos=(-0.9, 0))
+    draw_str(SAMPLE_STR, pos=(-0.9, 0))
+
+def str_lines(string, pos=(0, 0), scale=1):
+    """
+    Yield the segments `draw_str()` would draw, as (x1, y1, x2, y2) tuples in
+    screen coordinates.
+    """
+    scale = scale * 0.05
+    for i, line in enumerate(string.split("\n")):
+        y = pos[1] - i*LINE_SPACING*scale
+        for j, char in enumerate(line):
+            if char not in CHAR_LINES:
+                raise ValueError("Char not supported for drawing: '{}'".format(char))
+            x = pos[0] + j*CHAR_SPACING*scale
+            points = CHAR_LINES[char]
+            for k in range(0, len(points), 2):
+                (x1, y1), (x2, y2) = points[k], points[k+1]
+                yield (x + x1*scale, y + y1*scale, x + x2*scale, y + y2*scale)
+
+SAMPLE_STR = "ABCDEFGHIJKLM\nNOPQRSTUVWXYZ\n1234567890"
 
 CHAR_LINES = {
     ' ': (),
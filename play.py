@@ -1,11 +1,44 @@
 #!/usr/bin/python3
+"""
+Play Masteroids in a window.
+"""
 
 import sys
+import argparse
 if sys.version_info < (3, 2):
     raise RuntimeError("Python version 3.2 or greater is required")
 
 import masteroids.interface
+from masteroids.gccontrol import GCController
 
 if __name__ == "__main__":
-    interface = masteroids.interface.GameInterface()
-    interface.main_loop()
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--single-thread", action="store_true",
+        help="Update and draw on the same thread, taking turns.")
+    parser.add_argument("--stats", action="store_true",
+        help="Print snapshot latency, garbage collector pauses and collision "
+             "test counts once a second.")
+    parser.add_argument("--autopilot", type=int, nargs="?", const=0, metavar="SEED",
+        help="Let a scripted player play, with its choices seeded by SEED.")
+    parser.add_argument("--freeze-gc", action="store_true",
+        help="Freeze objects after each level's setup and only run full garbage "
+             "collections during breaks in play.")
+    args = parser.parse_args()
+
+    keyboard = None
+    if args.autopilot is not None:
+        from masteroids.autopilot import Autopilot
+        keyboard = Autopilot(args.autopilot)
+
+    # Times collections for --stats, and only freezes with --freeze-gc
+    gc_control = GCController(freeze=args.freeze_gc)
+    try:
+        interface = masteroids.interface.GameInterface(
+            threaded=not args.single_thread,
+            print_stats=args.stats,
+            keyboard=keyboard,
+            gc_control=gc_control
+        )
+        interface.main_loop()
+    finally:
+        gc_control.close()
@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+"""
+Render the game offscreen and stream raw RGB24 frames to a file or pipe.
+
+Example, encoding a video with ffmpeg:
+
+    $ python3 record.py - --frames 500 --size 640x480 | \\
+        ffmpeg -f rawvideo -pix_fmt rgb24 -s 640x480 -r 50 -i - out.mp4
+"""
+
+import os
+import sys
+import random
+import argparse
+if sys.version_info < (3, 2):
+    raise RuntimeError("Python version 3.2 or greater is required")
+
+
+def parse_size(value):
+    try:
+        width, height = value.lower().split("x")
+        return int(width), int(height)
+    except ValueError:
+        raise argparse.ArgumentTypeError('Size must look like "640x480"')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("output", help='File or pipe to write frames to, or "-" for stdout')
+    parser.add_argument("--size", type=parse_size, default=(700, 700), help="WIDTHxHEIGHT")
+    parser.add_argument("--fps", type=int, default=50)
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--backend", choices=("glut", "osmesa", "egl"), default="glut",
+        help="How to create the GL context. Use glut with a (virtual) X "
+             "display, osmesa or egl without one.")
+    parser.add_argument("--autopilot", type=int, nargs="?", const=0, metavar="SEED",
+        help="Record a scripted player, with its choices and the game seeded "
+             "by SEED, so the same SEED always records the same frames.")
+    args = parser.parse_args()
+
+    # Must happen before OpenGL is imported anywhere
+    if args.backend != "glut":
+        os.environ["PYOPENGL_PLATFORM"] = args.backend
+
+    from masteroids import capture
+    from masteroids.game import Game
+    from masteroids.detail import DetailController
+    from masteroids.inputstate import InputState
+    from masteroids.autopilot import Autopilot
+
+    width, height = args.size
+    capture.create_context(args.backend, width, height)
+    if args.output == "-":
+        output = sys.stdout.buffer
+    else:
+        output = open(args.output, "wb")
+    try:
+        frame_capture = capture.FrameCapture(width, height, output)
+        if args.autopilot is not None:
+            random.seed(args.autopilot)
+            keyboard = Autopilot(args.autopilot)
+        else:
+            keyboard = InputState()
+        # Frames are stepped at a fixed rate, so the slow readback mustn't
+        # change the detail level and with it what gets recorded
+        game = Game(DetailController(adaptive=False))
+        capture.record(game, keyboard, frame_capture, args.frames, args.fps)
+        frame_capture.delete()
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+"""
+Run a multiplayer server, optionally with local bot clients.
+
+    $ python3 server.py --port 7777 --bots 3
+    $ python3 server.py --loopback-test --bots 4 --ticks 600
+"""
+
+import sys
+import time
+import argparse
+import threading
+if sys.version_info < (3, 2):
+    raise RuntimeError("Python version 3.2 or greater is required")
+
+from masteroids import net
+
+
+def run_bot(address, seed, tick_rate, stop):
+    bot = net.BotClient(address, seed)
+    try:
+        while not stop.is_set():
+            bot.step()
+            time.sleep(1 / tick_rate)
+    finally:
+        bot.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7777)
+    parser.add_argument("--tick-rate", type=int, default=30)
+    parser.add_argument("--bots", type=int, default=0, help="Local bot clients to start")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds to run for")
+    parser.add_argument("--loopback-test", action="store_true",
+        help="Run server and bots in lockstep as fast as possible and print stats")
+    parser.add_argument("--ticks", type=int, default=300, help="Ticks for --loopback-test")
+    args = parser.parse_args()
+
+    if args.loopback_test:
+        stats = net.run_loopback(max(1, args.bots), args.ticks)
+        for name, value in sorted(stats.items()):
+            print("{}: {}".format(name, value))
+        return
+
+    server = net.GameServer((args.host, args.port), args.tick_rate)
+    stop = threading.Event()
+    for i in range(args.bots):
+        thread = threading.Thread(target=run_bot,
+                                  args=(server.address, i, args.tick_rate, stop))
+        thread.daemon = True
+        thread.start()
+    print("Serving on {}:{}".format(*server.address))
+    try:
+        server.serve(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.close()
+
+if __name__ == "__main__":
+    main()
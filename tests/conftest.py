@@ -0,0 +1,20 @@
+"""
+Tests marked `slow` take a minute or more, and only run with --run-slow.
+"""
+
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption("--run-slow", action="store_true", help="Also run tests marked slow")
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: takes a minute or more, run with --run-slow")
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-slow"):
+        return
+    skip = pytest.mark.skip(reason="slow, run with --run-slow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip)
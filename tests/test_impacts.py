@@ -0,0 +1,113 @@
+"""
+An ImpactScheduler finds the same contacts on every update as
+EntityScreen's own per-update tests.
+"""
+
+import os
+import sys
+import random
+from math import radians, sin, cos
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.impact_scheduler import ContactRecorder
+from masteroids import screens, entities, shapes
+from masteroids.detail import DetailController
+from masteroids.impacts import ImpactScheduler
+from masteroids.inputstate import AgentInputState
+
+N_UPDATES = 150
+SCRIPTED = 40  # Updates before random bullets in the wraparound test
+
+
+def thin_asteroid(x, y, yaw, dx=0, dy=0):
+    """A sliver much narrower than a fast bullet moves in one update."""
+    polygon = shapes.PolygonShape(
+        ((-0.005, -0.15), (0.005, -0.15), (0.005, 0.15), (-0.005, 0.15))
+    )
+    polygon.rotate(yaw)
+    return entities.AsteroidEntity(0.5, x, y, dx, dy, 0, polygon)
+
+def bullet(shooter, x, y, dx, dy):
+    bullet = entities.BulletEntity(shooter)
+    bullet.shape.translate(x - bullet.x, y - bullet.y)
+    bullet.dx = dx
+    bullet.dy = dy
+    return bullet
+
+def run(seed, scenario, scheduler):
+    """Each update's contacts, with `scenario(screen, i)` called before update i."""
+    random.seed(seed)
+    screen = screens.EntityScreen((), DetailController(adaptive=False))
+    if scheduler is None:
+        recorder = ContactRecorder(lambda entities, time: screen.find_contacts())
+    else:
+        recorder = ContactRecorder(scheduler.find_contacts)
+    screen.collision_backend = recorder
+    keyboard = AgentInputState()
+    for i in range(N_UPDATES):
+        scenario(screen, i)
+        screen.update(0.02, keyboard)
+        keyboard.tick(0.02)
+    return recorder.contacts
+
+def assert_same_contacts(scenario, seed=0):
+    contacts = run(seed, scenario, None)
+    assert sum(map(len, contacts)) > 0
+    assert run(seed, scenario, ImpactScheduler()) == contacts
+
+
+def test_fast_bullets_through_thin_asteroids():
+    shooter = entities.PlayerEntity()
+    def scenario(screen, i):
+        if i == 0:
+            screen.add_entities([
+                thin_asteroid(random.uniform(-1, 1), random.uniform(-1, 1),
+                              random.uniform(0, 360), random.uniform(-0.2, 0.2),
+                              random.uniform(-0.2, 0.2))
+                for j in range(20)
+            ])
+        if i % 2 == 0:
+            # Up to 0.1 per update, ten times an asteroid's width
+            speed = random.uniform(1, 5)
+            direction = random.uniform(0, 360)
+            screen.add_entity(bullet(
+                shooter, random.uniform(-1, 1), random.uniform(-1, 1),
+                speed*cos(radians(direction)),
+                speed*sin(radians(direction)),
+            ))
+    assert_same_contacts(scenario)
+
+def test_bullets_reentering_after_wraparound():
+    shooter = entities.PlayerEntity()
+    def scenario(screen, i):
+        if i == 0:
+            # Only reachable by wrapping around: across the right edge,
+            # across the top edge, an asteroid drifting over the seam, and
+            # one whose nearest copy is behind the bullet to begin with.
+            # Lengthways, so these can't pass through between updates.
+            screen.add_entities([
+                thin_asteroid(-0.6, 0, 90),
+                thin_asteroid(0, -0.6, 0),
+                thin_asteroid(0.95, 0.5, 90, dx=0.3),
+                thin_asteroid(-0.98, 0.3, 90),
+            ])
+            screen.add_entities([
+                bullet(shooter, 0.95, 0, 1.5, 0),
+                bullet(shooter, 0, 0.95, 0, 1.5),
+                bullet(shooter, -0.7, 0.5, -1.5, 0),
+                bullet(shooter, -0.1, 0.3, 4, 0),
+            ])
+        elif i >= SCRIPTED and i % 3 == 0:
+            # Fired just inside an edge, outwards, to come back in on the other side
+            edge = random.choice((-0.99, 0.99))
+            along = random.uniform(-1, 1)
+            speed = edge * random.uniform(1, 4)
+            if random.random() < 0.5:
+                screen.add_entity(bullet(shooter, edge, along, speed, random.uniform(-0.5, 0.5)))
+            else:
+                screen.add_entity(bullet(shooter, along, edge, random.uniform(-0.5, 0.5), speed))
+    # All four of the first bullets hit after wrapping around
+    contacts = run(0, scenario, None)
+    assert sum(map(len, contacts[:SCRIPTED])) == 4
+    assert_same_contacts(scenario)
@@ -0,0 +1,126 @@
+"""
+Key state, and agent actions standing in for the keyboard.
+"""
+
+import os
+import sys
+import random
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from masteroids.game import Game
+from masteroids.detail import DetailController
+from masteroids.inputstate import InputState, AgentInputState, ACTION_KEYS, KEY_UP, KEY_LEFT
+
+DT = 0.02
+
+
+class Clock():
+    """Stands in for `time.time`, only moving when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_just_pressed_and_held():
+    clock = Clock()
+    keyboard = InputState(clock)
+    keyboard.key_down(b' ')
+    keyboard.key_down(KEY_UP)
+    assert keyboard.key_just_pressed(b' ') and keyboard.key_just_pressed(KEY_UP)
+    assert keyboard.is_key_down(b' ') and keyboard.is_key_down(KEY_UP)
+    assert keyboard.any_key_just_pressed()
+    assert not keyboard.key_just_pressed(KEY_LEFT)
+
+    # Still held on the next update, but not just pressed
+    keyboard.tick()
+    clock.now += DT
+    assert not keyboard.key_just_pressed(b' ')
+    assert not keyboard.any_key_just_pressed()
+    assert keyboard.is_key_down(b' ')
+    assert keyboard.key_down_duration(b' ') == pytest.approx(DT)
+
+    keyboard.key_up(b' ')
+    assert not keyboard.is_key_down(b' ')
+    assert keyboard.key_down_duration(b' ') == 0
+    assert keyboard.is_key_down(KEY_UP)
+
+def test_repeat_while_held():
+    clock = Clock()
+    keyboard = InputState(clock)
+    keyboard.key_down(b' ')
+    presses = []
+    for i in range(50):
+        presses.append(keyboard.key_just_pressed(b' ', repeat=0.25))
+        keyboard.tick()
+        clock.now += 1/64  # Exact in binary, unlike DT
+    # The press itself, then once every 16 updates
+    assert [i for i, pressed in enumerate(presses) if pressed] == [0, 16, 32, 48]
+
+    keyboard.key_up(b' ')
+    assert not keyboard.key_just_pressed(b' ', repeat=0.25)
+
+def test_all_keys_up():
+    keyboard = InputState(Clock())
+    keyboard.key_down(b' ')
+    keyboard.key_down(KEY_LEFT)
+    keyboard.all_keys_up()
+    assert not keyboard.is_key_down(b' ') and not keyboard.is_key_down(KEY_LEFT)
+
+
+@pytest.mark.parametrize("bit, key", ACTION_KEYS)
+def test_action_presses_key(bit, key):
+    clock = Clock()
+    keyboard = InputState(clock)
+    agent = AgentInputState()
+    for actions in (bit, bit, 0, bit):
+        if actions:
+            if not keyboard.is_key_down(key):
+                keyboard.key_down(key)
+        else:
+            keyboard.key_up(key)
+        agent.set_actions(actions)
+        for check in (keyboard, agent):
+            assert check.is_key_down(key) == bool(actions)
+        assert agent.key_just_pressed(key) == keyboard.key_just_pressed(key)
+        assert agent.any_key_just_pressed() == keyboard.any_key_just_pressed()
+        keyboard.tick()
+        agent.tick(DT)
+        clock.now += DT
+
+def test_actions_play_like_keys():
+    """The same game, played once with keys and once with the same actions."""
+    rng = random.Random(1)
+    schedule = [0, 8, 0, 8] + [rng.randrange(16) for i in range(500)]
+
+    random.seed(0)
+    agent_game = Game(DetailController(adaptive=False))
+    agent = AgentInputState()
+    for actions in schedule:
+        agent.set_actions(actions)
+        agent_game.update(DT, agent)
+        agent.tick(DT)
+
+    random.seed(0)
+    key_game = Game(DetailController(adaptive=False))
+    clock = Clock()
+    keyboard = InputState(clock)
+    held = 0
+    for actions in schedule:
+        for bit, key in ACTION_KEYS:
+            if actions & bit and not held & bit:
+                keyboard.key_down(key)
+            elif held & bit and not actions & bit:
+                keyboard.key_up(key)
+        held = actions
+        key_game.update(DT, keyboard)
+        keyboard.tick()
+        clock.now += DT
+
+    assert agent_game.player.score > 0
+    assert key_game.snapshot().tobytes() == agent_game.snapshot().tobytes()
@@ -0,0 +1,47 @@
+"""
+Memory budgets, measured by benchmarks/memory.py.
+
+    $ python3 -m pytest tests
+    $ python3 -m pytest tests --run-slow  # With the 5000 asteroid scenario
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import memory
+
+# Bytes per entity on a screen, and peak bytes for each scenario. Set about
+# 10% above the measured numbers, so that real regressions stand out from
+# differences between Python versions.
+BUDGETS = {
+    "asteroid": 1750,
+    "bullet": 460,
+    "particle": 350,
+    "player": 1100,
+    "asteroid_field_peak": 255000,
+    "particle_flood_peak": 555000,
+    "scripted_game_peak": 128000,
+    "asteroids_1000_peak": 1130000,
+    "asteroids_5000_peak": 4360000,
+    "steady_frame_peak": 1900,
+}
+# Over a minute each, so only run with --run-slow
+SLOW = {"asteroids_5000_peak"}
+
+
+def test_every_measurement_has_a_budget():
+    assert set(memory.MEASUREMENTS) == set(BUDGETS)
+
+@pytest.mark.parametrize("name", [
+    pytest.param(name, marks=pytest.mark.slow) if name in SLOW else name
+    for name in BUDGETS
+])
+def test_within_budget(name):
+    used = memory.MEASUREMENTS[name]()
+    assert used <= BUDGETS[name], "{} used {:.0f} bytes, budget {}".format(
+        name, used, BUDGETS[name]
+    )
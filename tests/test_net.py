@@ -0,0 +1,61 @@
+"""
+Multiplayer over loopback: how stale clients' views of the world get.
+"""
+
+import os
+import sys
+import random
+from collections import deque
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from masteroids import net, entities
+
+N_ASTEROIDS = 250  # More changes per tick than fit in a packet
+WARM_UP = 60  # Ticks for every asteroid to be spawned on the client
+N_TICKS = 120
+
+
+class LaggyBot(net.BotClient):
+    """A bot whose input, and so its acknowledgements, arrive `lag` ticks late."""
+
+    def __init__(self, server_address, seed, lag):
+        super().__init__(server_address, seed)
+        self.lag = lag
+        self.outbox = deque()
+
+    def send_actions(self, actions):
+        if self.player_id is None:
+            self.join()
+            return
+        self.outbox.append(net.INPUT.pack(b"I", actions, self.latest_seq))
+        if len(self.outbox) > self.lag:
+            self.socket.sendto(self.outbox.popleft(), self.server_address)
+
+
+@pytest.mark.parametrize("lag", [0, 3])
+def test_staleness_is_bounded(lag):
+    random.seed(0)
+    server = net.GameServer()
+    server.screen.add_entities([entities.AsteroidEntity() for i in range(N_ASTEROIDS)])
+    bot = LaggyBot(server.address, 0, lag)
+    per_packet = (net.MAX_PACKET_SIZE - net.SNAPSHOT_HEADER.size) // net.UPDATE_RECORD.size
+    # Ticks for the baseline to take every asteroid's newest state in turn,
+    # each turn waiting for an acknowledgement
+    bound = (N_ASTEROIDS // per_packet + 1) * (lag + 1) + lag
+    worst = 0
+    try:
+        for i in range(WARM_UP + N_TICKS):
+            bot.step()
+            server.tick()
+            if i >= WARM_UP:
+                assert len(bot.entities) > N_ASTEROIDS
+                # Snapshots from the last tick arrive in the next step()
+                worst = max([worst] + [i - 1 - e.tick for e in bot.entities.values()])
+    finally:
+        bot.close()
+        server.close()
+    assert bot.snapshots_dropped == 0
+    assert worst <= bound
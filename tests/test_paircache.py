@@ -0,0 +1,78 @@
+"""
+The pair cache only skips tests that would have missed: a screen finds the
+same contacts with it as without it.
+"""
+
+import os
+import sys
+import random
+from math import radians, sin, cos
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.impact_scheduler import ContactRecorder
+from masteroids import screens, entities
+from masteroids.detail import DetailController
+from masteroids.inputstate import AgentInputState
+from masteroids.paircache import PairCache
+
+N_ASTEROIDS = 30
+N_UPDATES = 200
+
+
+class NoPairCache(PairCache):
+    """Tests every pair, every update."""
+
+    def should_test(self, e1, e2, time):
+        self.tests += 1
+        return True
+
+    def record_miss(self, e1, e2, time):
+        pass
+
+
+def bullet(shooter, x, y, direction, speed):
+    bullet = entities.BulletEntity(shooter)
+    bullet.shape.translate(x - bullet.x, y - bullet.y)
+    bullet.dx = speed*cos(radians(direction))
+    bullet.dy = speed*sin(radians(direction))
+    return bullet
+
+def run(pair_cache):
+    random.seed(0)
+    screen = screens.EntityScreen((), DetailController(adaptive=False))
+    screen.pair_cache = pair_cache
+    recorder = ContactRecorder(lambda entities, time: screen.find_contacts())
+    screen.collision_backend = recorder
+    asteroids = [
+        entities.AsteroidEntity(random.choice((0.125, 0.25, 0.5)))
+        for i in range(N_ASTEROIDS)
+    ]
+    screen.add_entities(asteroids)
+    shooter = entities.PlayerEntity()
+    keyboard = AgentInputState()
+    for i in range(N_UPDATES):
+        if i % 2 == 0:
+            # Aimed at an asteroid from beyond MAX_GAP, some fast
+            target = random.choice([e for e in screen.entities if e in asteroids] or asteroids)
+            direction = random.uniform(0, 360)
+            distance = PairCache.MAX_GAP + target.shape.radius + random.uniform(0.05, 0.3)
+            screen.add_entity(bullet(
+                shooter,
+                (target.x - distance*cos(radians(direction)) + 1) % 2 - 1,
+                (target.y - distance*sin(radians(direction)) + 1) % 2 - 1,
+                direction + random.uniform(-5, 5),
+                random.uniform(0.5, 4),
+            ))
+        screen.update(0.02, keyboard)
+        keyboard.tick(0.02)
+    return recorder.contacts
+
+
+def test_skipping_is_conservative():
+    cache = PairCache()
+    contacts = run(cache)
+    assert cache.skipped > 0
+    uncached = run(NoPairCache())
+    assert sum(map(len, uncached)) > 0
+    assert contacts == uncached
@@ -0,0 +1,52 @@
+"""
+A CollisionPool finds the same contacts as EntityScreen's own loop.
+"""
+
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.impact_scheduler import ContactRecorder
+from masteroids import screens, entities
+from masteroids.detail import DetailController
+from masteroids.inputstate import AgentInputState
+from masteroids.parallel import CollisionPool
+
+N_ASTEROIDS = 60
+N_UPDATES = 40
+
+
+def run(pool):
+    random.seed(0)
+    screen = screens.EntityScreen((), DetailController(adaptive=False))
+    screen.add_entities([
+        entities.AsteroidEntity(random.choice((0.125, 0.25, 0.5)))
+        for i in range(N_ASTEROIDS)
+    ])
+    if pool is None:
+        recorder = ContactRecorder(lambda entities, time: screen.find_contacts())
+    else:
+        recorder = ContactRecorder(pool.find_contacts)
+    screen.collision_backend = recorder
+    shooter = entities.PlayerEntity()
+    keyboard = AgentInputState()
+    for i in range(N_UPDATES):
+        shooter.shape.rotate(37)
+        screen.add_entity(entities.BulletEntity(shooter))
+        screen.update(0.02, keyboard)
+        keyboard.tick(0.02)
+    state = [(type(e).__name__, e.x, e.y) for e in screen.entities]
+    return recorder.contacts, state
+
+
+def test_same_as_in_process():
+    # Small buffers, so the pool also has to restart with bigger ones
+    with CollisionPool(processes=2, strips=3, capacity=16) as pool:
+        pool_contacts, pool_state = run(pool)
+        assert pool.table_capacity > 16
+    contacts, state = run(None)
+    assert sum(map(len, contacts)) > 0
+    assert pool_contacts == contacts
+    assert pool_state == state
@@ -0,0 +1,50 @@
+"""
+Collisions between a polygon and one entirely inside it, where no edges
+cross.
+"""
+
+import os
+import sys
+from array import array
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from masteroids import shapes
+
+
+def square(half_width, x, y, yaw=0):
+    w = half_width
+    return shapes.PolygonShape.from_local(array('d', (-w, -w, w, -w, w, w, -w, w)), x, y, yaw)
+
+# (center of the big square, center of the small one)
+PLACEMENTS = [
+    ((0, 0), (0.05, -0.03)),
+    # The big square overlaps the right edge and the small one is in the
+    # part that wraps around to the left
+    ((0.95, 0), (-0.98, 0.05)),
+    # Over both edges, at the corner
+    ((0.95, 0.95), (-0.98, -0.98)),
+]
+
+
+@pytest.mark.parametrize("big_center, small_center", PLACEMENTS)
+@pytest.mark.parametrize("circle", [False, True])
+def test_polygon_inside_polygon(big_center, small_center, circle):
+    big = square(0.2, *big_center, yaw=30)
+    small = square(0.02, *small_center, yaw=10)
+    big.circle = small.circle = circle
+    assert big.check_collision(small)
+    assert small.check_collision(big)
+    assert shapes._collision_polygon_polygon(big, small)
+    assert shapes._collision_polygon_polygon(small, big)
+
+@pytest.mark.parametrize("big_center, small_center", PLACEMENTS)
+def test_polygon_outside_polygon(big_center, small_center):
+    # Inside the big diamond's bounding circle, but past its edge
+    big = square(0.2, *big_center, yaw=45)
+    x, y = big_center
+    small = square(0.02, (x + 0.17 + 1)%2 - 1, (y + 0.17 + 1)%2 - 1)
+    assert not big.check_collision(small)
+    assert not small.check_collision(big)
@@ -0,0 +1,74 @@
+"""
+Game.snapshot() and Game.restore(): a restored game plays on exactly like
+the one it was taken from.
+"""
+
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from masteroids import screens
+from masteroids.game import Game
+from masteroids.detail import DetailController
+from masteroids.inputstate import AgentInputState, ACTION_FIRE, ACTION_THRUST
+
+DT = 0.02
+N_TICKS = 500
+
+
+def new_game():
+    return Game(DetailController(adaptive=False))
+
+def play(game, actions):
+    inputs = AgentInputState()
+    for action in actions:
+        inputs.set_actions(action)
+        game.update(DT, inputs)
+        inputs.tick(DT)
+
+def random_actions(seed, n=N_TICKS):
+    rng = random.Random(seed)
+    return [rng.randrange(16) for i in range(n)]
+
+def assert_plays_on_the_same(game, actions):
+    """Play `game` and a restored copy of it, and check they end up the same."""
+    state = game.snapshot()
+    play(game, actions)
+    # Restored last, since it also restores the `random` module
+    copy = new_game()
+    copy.restore(state)
+    assert copy.snapshot().tobytes() == state.tobytes()
+    play(copy, actions)
+    # Compared as bytes, since the snapshot can hold a NaN
+    assert copy.snapshot().tobytes() == game.snapshot().tobytes()
+    return copy
+
+
+def test_fresh_game():
+    random.seed(0)
+    game = new_game()
+    # The title screen's asteroids are only generated on its first update
+    copy = assert_plays_on_the_same(game, [0])
+    assert len(copy.current_screen.entities) == len(game.current_screen.entities) == 3
+
+    random.seed(1)
+    assert_plays_on_the_same(new_game(), [ACTION_FIRE] + random_actions(1))
+
+def test_mid_game():
+    random.seed(2)
+    game = new_game()
+    play(game, [ACTION_FIRE] + random_actions(2))
+    assert isinstance(game.current_screen, screens.GameplayScreen)
+    assert game.current_screen.entities
+    assert_plays_on_the_same(game, random_actions(3))
+
+def test_high_score_screen():
+    random.seed(3)
+    game = new_game()
+    # Up twice from "NEW GAME" to "HIGH SCORES", then select it
+    play(game, [ACTION_THRUST, 0, ACTION_THRUST, 0, ACTION_FIRE])
+    assert isinstance(game.current_screen, screens.HighScoreScreen)
+    # Back to a new title screen, then on into a game
+    assert_plays_on_the_same(game, [0, ACTION_FIRE, 0, ACTION_FIRE] + random_actions(4))